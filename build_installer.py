@@ -215,6 +215,7 @@ def prepare_installer_files(target_dir):
             "admin_all_reports",
             "approved_reports",
             "pdf",
+            "storage",
             "user_reports"
         ]
         
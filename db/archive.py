@@ -0,0 +1,291 @@
+import json
+import logging
+import os
+import sys
+import time
+import zlib
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_db_connection, close_connection, get_db_path
+from utils.events import event_bus, REPORT_DELETED
+
+logger = logging.getLogger(__name__)
+
+# Reports in these statuses are finished and can be archived
+FINAL_STATUSES = ('approved_admin', 'approved')
+
+_REPORT_COLUMNS = ('report_id', 'user_id', 'title', 'created_at', 'status', 'version',
+                   'last_modified_at', 'last_modified_by', 'excel_file_path')
+_LOG_COLUMNS = ('id', 'report_id', 'action_by', 'action', 'comments', 'timestamp', 'report_version')
+_ARTIFACT_COLUMNS = ('id', 'report_id', 'kind', 'path', 'size', 'sha256', 'version', 'created_at')
+
+def get_archive_path():
+    """Path of the archive database, from ARCHIVE_DB_PATH (default next to logbook.db)"""
+    return os.getenv('ARCHIVE_DB_PATH') or os.path.join(os.path.dirname(get_db_path()), 'logbook_archive.db')
+
+def get_archive_days():
+    """Days after approval before a report is archived, from REPORT_ARCHIVE_DAYS (default 365, 0 disables)"""
+    try:
+        return max(0, int(os.getenv('REPORT_ARCHIVE_DAYS', '365')))
+    except ValueError:
+        logger.warning("Invalid REPORT_ARCHIVE_DAYS value, using 365")
+        return 365
+
+def attach_archive(cursor, create=False):
+    """
+    Attach the archive database to a connection as schema 'archive'.
+
+    Returns:
+        bool: True if attached, False if there is no archive yet (and create
+        is False)
+    """
+    path = get_archive_path()
+    if not create and not os.path.exists(path):
+        return False
+    cursor.execute("ATTACH DATABASE ? AS archive", (path,))
+    if create:
+        _create_archive_tables(cursor)
+    return True
+
+def _create_archive_tables(cursor):
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archive.reports (
+        report_id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        title TEXT NOT NULL,
+        created_at TIMESTAMP,
+        status TEXT,
+        version INTEGER,
+        last_modified_at TIMESTAMP,
+        last_modified_by INTEGER,
+        excel_file_path TEXT,
+        archived_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now'))
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_reports_created
+    ON reports (created_at, report_id)
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_reports_user
+    ON reports (user_id, created_at)
+    ''')
+    # Fields and their version history as zlib-compressed JSON
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archive.report_contents (
+        report_id INTEGER PRIMARY KEY,
+        fields BLOB NOT NULL,
+        field_versions BLOB NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archive.approval_logs (
+        id INTEGER PRIMARY KEY,
+        report_id INTEGER NOT NULL,
+        action_by INTEGER NOT NULL,
+        action TEXT NOT NULL,
+        comments TEXT,
+        timestamp TIMESTAMP,
+        report_version INTEGER
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_logs_report
+    ON approval_logs (report_id, timestamp)
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS archive.report_artifacts (
+        id INTEGER PRIMARY KEY,
+        report_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        path TEXT NOT NULL,
+        size INTEGER,
+        sha256 TEXT,
+        version INTEGER,
+        created_at TIMESTAMP
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS archive.idx_archived_artifacts_report
+    ON report_artifacts (report_id)
+    ''')
+
+def _pack(value):
+    return zlib.compress(json.dumps(value, separators=(',', ':')).encode('utf-8'), 9)
+
+def _unpack(blob):
+    return json.loads(zlib.decompress(blob).decode('utf-8'))
+
+def _archive_chunk(cursor, report_ids):
+    placeholders = ', '.join('?' for _ in report_ids)
+    columns = ', '.join(_REPORT_COLUMNS)
+    cursor.execute(f'''
+    INSERT OR REPLACE INTO archive.reports ({columns})
+    SELECT {columns} FROM main.reports WHERE report_id IN ({placeholders})
+    ''', report_ids)
+
+    fields = {report_id: {} for report_id in report_ids}
+    cursor.execute(f'''
+    SELECT report_id, field_name, field_value FROM main.report_data
+    WHERE report_id IN ({placeholders})
+    ''', report_ids)
+    for row in cursor.fetchall():
+        fields[row['report_id']][row['field_name']] = row['field_value']
+    versions = {report_id: [] for report_id in report_ids}
+    cursor.execute(f'''
+    SELECT report_id, version, field_name, field_value, deleted, changed_at
+    FROM main.report_field_versions
+    WHERE report_id IN ({placeholders})
+    ORDER BY report_id, version, field_name
+    ''', report_ids)
+    for row in cursor.fetchall():
+        versions[row['report_id']].append(
+            [row['version'], row['field_name'], row['field_value'], row['deleted'], row['changed_at']]
+        )
+    cursor.executemany('''
+    INSERT OR REPLACE INTO archive.report_contents (report_id, fields, field_versions)
+    VALUES (?, ?, ?)
+    ''', [(report_id, _pack(fields[report_id]), _pack(versions[report_id])) for report_id in report_ids])
+
+    for table_name, table_columns in (('approval_logs', _LOG_COLUMNS), ('report_artifacts', _ARTIFACT_COLUMNS)):
+        columns = ', '.join(table_columns)
+        cursor.execute(f'''
+        INSERT OR REPLACE INTO archive.{table_name} ({columns})
+        SELECT {columns} FROM main.{table_name} WHERE report_id IN ({placeholders})
+        ''', report_ids)
+
+    # Deleting the report also removes its artifacts and field versions (triggers)
+    cursor.execute(f"DELETE FROM main.report_data WHERE report_id IN ({placeholders})", report_ids)
+    cursor.execute(f"DELETE FROM main.approval_logs WHERE report_id IN ({placeholders})", report_ids)
+    cursor.execute(f"DELETE FROM main.reports WHERE report_id IN ({placeholders})", report_ids)
+    # Archived reports were not deleted; keep delta sync clients from dropping them
+    cursor.execute(f"DELETE FROM main.report_tombstones WHERE report_id IN ({placeholders})", report_ids)
+    return fields
+
+def _release_templates(fields):
+    """
+    Drop archived reports' references to their template blobs.
+
+    Reports with a private workbook no longer need the template; reports
+    still pointing at the shared template keep the reference, as their
+    archived workbook path is the blob itself.
+    """
+    from utils.storage import get_store
+    store = get_store()
+    for report_fields in fields.values():
+        template_key = report_fields.get('template_key')
+        if not template_key or store.key_for_path(report_fields.get('excel_file_path')) == template_key:
+            continue
+        try:
+            store.release(template_key)
+        except Exception as e:
+            logger.warning(f"Could not release template {template_key} of an archived report: {e}")
+
+def archive_reports(retention_days, chunk_size=100, pause=0.05):
+    """
+    Move reports approved more than retention_days ago to the archive database.
+
+    Each chunk is copied (fields and version history compressed) and removed
+    from the live tables in one transaction spanning both databases, so a
+    report is always in exactly one of them. The write lock is released
+    between chunks.
+
+    Returns:
+        int: Number of reports archived
+    """
+    cutoff = f"-{int(retention_days)} days"
+    status_placeholders = ', '.join('?' for _ in FINAL_STATUSES)
+    archived = 0
+    while True:
+        conn, cursor = get_db_connection()
+        try:
+            attach_archive(cursor, create=True)
+            cursor.execute(f'''
+            SELECT report_id FROM main.reports
+            WHERE status IN ({status_placeholders})
+              AND last_modified_at < strftime('%Y-%m-%d %H:%M:%f', 'now', ?)
+            ORDER BY report_id
+            LIMIT ?
+            ''', (*FINAL_STATUSES, cutoff, chunk_size))
+            report_ids = [row['report_id'] for row in cursor.fetchall()]
+            fields = {}
+            if report_ids:
+                fields = _archive_chunk(cursor, report_ids)
+                conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_connection(conn)
+        _release_templates(fields)
+        for report_id in report_ids:
+            event_bus.publish(REPORT_DELETED, report_id=report_id, archived=True)
+        archived += len(report_ids)
+        if len(report_ids) < chunk_size:
+            break
+        time.sleep(pause)
+
+    if archived:
+        logger.info(f"Archived {archived} report(s) approved more than {retention_days} days ago")
+    return archived
+
+def get_archived_report(report_id):
+    """
+    Get an archived report in the shape returned by get_report.
+
+    Returns:
+        dict: The report with 'fields', 'approval_logs' and 'archived': True,
+        or None if it is not archived
+    """
+    conn, cursor = get_db_connection()
+    try:
+        if not attach_archive(cursor):
+            return None
+        cursor.execute('''
+        SELECT r.*, u.username AS creator_name, m.username AS modifier_name, c.fields
+        FROM archive.reports r
+        JOIN users u ON r.user_id = u.id
+        LEFT JOIN users m ON r.last_modified_by = m.id
+        LEFT JOIN archive.report_contents c ON c.report_id = r.report_id
+        WHERE r.report_id = ?
+        ''', (report_id,))
+        row = cursor.fetchone()
+        if row is None:
+            return None
+        report = dict(row)
+        blob = report.pop('fields')
+        report['fields'] = _unpack(blob) if blob is not None else {}
+        cursor.execute('''
+        SELECT a.*, u.username AS actor_name
+        FROM archive.approval_logs a
+        JOIN users u ON a.action_by = u.id
+        WHERE a.report_id = ?
+        ORDER BY a.timestamp ASC, a.id ASC
+        ''', (report_id,))
+        report['approval_logs'] = [dict(log) for log in cursor.fetchall()]
+        report['archived'] = True
+        return report
+    finally:
+        close_connection(conn)
+
+def get_archived_field_versions(report_id):
+    """
+    Get an archived report's field history.
+
+    Returns:
+        list: [version, field_name, field_value, deleted, changed_at] rows
+    """
+    conn, cursor = get_db_connection()
+    try:
+        if not attach_archive(cursor):
+            return []
+        cursor.execute("SELECT field_versions FROM archive.report_contents WHERE report_id = ?", (report_id,))
+        row = cursor.fetchone()
+        return _unpack(row['field_versions']) if row else []
+    finally:
+        close_connection(conn)
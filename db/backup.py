@@ -0,0 +1,300 @@
+"""
+Online backups of logbook.db (and the report archive database).
+
+Run: python -m db.backup [create | list | verify <snapshot> | restore <snapshot>]
+"""
+import argparse
+import logging
+import os
+import re
+import sqlite3
+import sys
+import time
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_db_path
+from db.archive import get_archive_path
+
+logger = logging.getLogger(__name__)
+
+# Snapshot files are <database name>_<YYYYmmdd_HHMMSS>.db
+_SNAPSHOT_NAME = re.compile(r'^(?P<name>.+)_(?P<stamp>\d{8}_\d{6})\.db$')
+
+def get_backup_dir():
+    """Directory holding snapshots, from BACKUP_DIR (default backups/ next to logbook.db)"""
+    return os.getenv('BACKUP_DIR') or os.path.join(os.path.dirname(get_db_path()), 'backups')
+
+def get_backup_settings():
+    """
+    Get backup settings from the environment
+
+    Returns:
+        tuple: (interval_hours, keep) where interval_hours 0 disables
+            scheduled backups and keep is the number of snapshots kept
+    """
+    try:
+        interval_hours = max(0.0, float(os.getenv('BACKUP_INTERVAL_HOURS', '24')))
+    except ValueError:
+        logger.warning("Invalid BACKUP_INTERVAL_HOURS value, using 24")
+        interval_hours = 24.0
+    try:
+        keep = max(1, int(os.getenv('BACKUP_KEEP', '7')))
+    except ValueError:
+        logger.warning("Invalid BACKUP_KEEP value, using 7")
+        keep = 7
+    return interval_hours, keep
+
+def _databases():
+    """(snapshot name, path) of each database to back up"""
+    databases = [('logbook', get_db_path())]
+    archive_path = get_archive_path()
+    if os.path.exists(archive_path):
+        databases.append(('logbook_archive', archive_path))
+    return databases
+
+def check_integrity(path):
+    """
+    Run PRAGMA integrity_check on a database file.
+
+    Returns:
+        list: Problems found; empty if the database is intact
+    """
+    conn = sqlite3.connect(f"file:{Path(path).as_posix()}?mode=ro", uri=True)
+    try:
+        rows = [row[0] for row in conn.execute('PRAGMA integrity_check')]
+    except sqlite3.DatabaseError as e:
+        return [str(e)]
+    finally:
+        conn.close()
+    return [] if rows == ['ok'] else rows
+
+class _BackupRestarted(Exception):
+    """The source changed too often for a stepped copy to finish"""
+
+def _copy_online(source_path, dest_path, pages, pause, max_restarts=3):
+    """
+    Copy a live database with the SQLite online backup API.
+
+    pages are copied per step with a pause between steps, so writers only
+    wait for one step at a time; if they change the database mid-copy the
+    backup restarts from a consistent state by itself. A busy database can
+    keep a stepped copy restarting forever, so after max_restarts (seen as
+    the remaining page count going back up) the rest is copied in one step,
+    which holds the read lock until it is done.
+    """
+    progress_state = {'remaining': None, 'restarts': 0}
+
+    def progress(status, remaining, total):
+        if progress_state['remaining'] is not None and remaining > progress_state['remaining']:
+            progress_state['restarts'] += 1
+            if progress_state['restarts'] > max_restarts:
+                raise _BackupRestarted()
+        progress_state['remaining'] = remaining
+        time.sleep(pause)
+
+    source = sqlite3.connect(source_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        try:
+            source.backup(dest, pages=pages, progress=progress)
+        except _BackupRestarted:
+            logger.warning(f"Backup of {source_path} restarted {max_restarts} times while it was "
+                           f"being written to; copying it in one step")
+            source.backup(dest, pages=-1)
+    finally:
+        dest.close()
+        source.close()
+
+def create_backup(backup_dir=None, pages=256, pause=0.01):
+    """
+    Snapshot logbook.db (and the archive database, if any) into backup_dir.
+
+    Each snapshot is written to a temporary file, integrity-checked and
+    only then renamed into place, so a listed snapshot is always usable.
+
+    Returns:
+        list: Paths of the snapshots written
+    """
+    backup_dir = backup_dir or get_backup_dir()
+    os.makedirs(backup_dir, exist_ok=True)
+    stamp = datetime.now().strftime('%Y%m%d_%H%M%S')
+    written = []
+    for name, source_path in _databases():
+        snapshot_path = os.path.join(backup_dir, f"{name}_{stamp}.db")
+        tmp_path = snapshot_path + '.tmp'
+        try:
+            _copy_online(source_path, tmp_path, pages, pause)
+            problems = check_integrity(tmp_path)
+            if problems:
+                raise sqlite3.DatabaseError(f"Snapshot of {name} failed the integrity check: {problems[:3]}")
+            os.replace(tmp_path, snapshot_path)
+        finally:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+        written.append(snapshot_path)
+        logger.info(f"Backed up {source_path} to {snapshot_path}")
+    return written
+
+def list_backups(backup_dir=None):
+    """
+    List snapshots, newest first.
+
+    Returns:
+        list: Dicts with name (database), path, created (datetime) and size
+    """
+    backup_dir = backup_dir or get_backup_dir()
+    if not os.path.isdir(backup_dir):
+        return []
+    snapshots = []
+    for file_name in os.listdir(backup_dir):
+        match = _SNAPSHOT_NAME.match(file_name)
+        if not match:
+            continue
+        path = os.path.join(backup_dir, file_name)
+        snapshots.append({
+            'name': match.group('name'),
+            'path': path,
+            'created': datetime.strptime(match.group('stamp'), '%Y%m%d_%H%M%S'),
+            'size': os.path.getsize(path),
+        })
+    snapshots.sort(key=lambda snapshot: (snapshot['created'], snapshot['path']), reverse=True)
+    return snapshots
+
+def rotate_backups(keep, backup_dir=None):
+    """
+    Delete all but the newest keep snapshots of each database.
+
+    Returns:
+        int: Number of snapshots deleted
+    """
+    seen = {}
+    removed = 0
+    for snapshot in list_backups(backup_dir):
+        seen[snapshot['name']] = seen.get(snapshot['name'], 0) + 1
+        if seen[snapshot['name']] > keep:
+            os.remove(snapshot['path'])
+            removed += 1
+    if removed:
+        logger.info(f"Removed {removed} old backup snapshot(s)")
+    return removed
+
+def backup_due(interval_hours, backup_dir=None):
+    """Whether the newest snapshot of logbook.db is older than interval_hours"""
+    for snapshot in list_backups(backup_dir):
+        if snapshot['name'] == 'logbook':
+            return (datetime.now() - snapshot['created']).total_seconds() >= interval_hours * 3600
+    return True
+
+def run_scheduled_backup(backup_dir=None):
+    """
+    Back up and rotate if the configured interval has passed.
+
+    Returns:
+        list: Paths of the snapshots written (empty if no backup was due)
+    """
+    interval_hours, keep = get_backup_settings()
+    if interval_hours <= 0 or not backup_due(interval_hours, backup_dir):
+        return []
+    written = create_backup(backup_dir)
+    rotate_backups(keep, backup_dir)
+    return written
+
+def _restore_file(snapshot_path, name, db_path, pages):
+    """Save db_path as <name>_pre_restore.db, then overwrite it from snapshot_path"""
+    backup_dir = os.path.dirname(os.path.abspath(snapshot_path))
+    pre_restore_path = os.path.join(backup_dir, f"{name}_pre_restore.db")
+    if os.path.exists(db_path):
+        if os.path.exists(pre_restore_path):
+            os.remove(pre_restore_path)
+        _copy_online(db_path, pre_restore_path, pages, 0)
+
+    source = sqlite3.connect(f"file:{Path(snapshot_path).as_posix()}?mode=ro", uri=True)
+    dest = sqlite3.connect(db_path)
+    try:
+        # A single step holds the write lock for the whole restore
+        source.backup(dest, pages=-1)
+    finally:
+        dest.close()
+        source.close()
+    logger.info(f"Restored {db_path} from {snapshot_path}")
+    return pre_restore_path
+
+def restore_backup(snapshot_path, db_path=None, pages=256):
+    """
+    Restore a database from a snapshot.
+
+    The snapshot is integrity-checked first and the current database is
+    snapshotted (as <name>_pre_restore.db in the backup directory) before
+    being overwritten. The restore goes through the online backup API, so
+    other connections see either the old or the restored database, never a
+    half-written file. db_path defaults to the live database the snapshot
+    was taken from.
+
+    Restoring the live logbook.db also restores the archive database from
+    the logbook_archive snapshot taken at the same time, so reports archived
+    after the snapshot are not left in both databases (or in neither). If
+    there is no such snapshot the archive is left as it is, with a warning.
+
+    Returns:
+        str: Path of the pre-restore copy of the overwritten database
+    """
+    match = _SNAPSHOT_NAME.match(os.path.basename(snapshot_path))
+    name = match.group('name') if match else 'logbook'
+    restores = [(snapshot_path, name, db_path)]
+    if db_path is None:
+        restores[0] = (snapshot_path, name, get_archive_path() if name == 'logbook_archive' else get_db_path())
+        if name == 'logbook':
+            archive_snapshot = os.path.join(os.path.dirname(snapshot_path),
+                                            f"logbook_archive_{match.group('stamp')}.db") if match else ''
+            if os.path.exists(archive_snapshot):
+                restores.append((archive_snapshot, 'logbook_archive', get_archive_path()))
+            elif os.path.exists(get_archive_path()):
+                logger.warning(f"No archive snapshot taken with {snapshot_path}; "
+                               f"{get_archive_path()} is not restored and may not match it")
+    # Check every snapshot before overwriting anything
+    for path, _, _ in restores:
+        problems = check_integrity(path)
+        if problems:
+            raise sqlite3.DatabaseError(f"{path} failed the integrity check: {problems[:3]}")
+
+    pre_restore_paths = [_restore_file(path, restore_name, restore_path, pages)
+                         for path, restore_name, restore_path in restores]
+    return pre_restore_paths[0]
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Back up and restore the logbook database")
+    parser.add_argument('--dir', help="Backup directory (default BACKUP_DIR or backups/ next to logbook.db)")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('create', help="Snapshot the databases now and rotate old snapshots")
+    commands.add_parser('list', help="List snapshots, newest first")
+    verify = commands.add_parser('verify', help="Run an integrity check on a snapshot")
+    verify.add_argument('snapshot')
+    restore = commands.add_parser('restore', help="Restore a database from a snapshot (close the app first)")
+    restore.add_argument('snapshot')
+    args = parser.parse_args(argv)
+
+    if args.command == 'create':
+        for path in create_backup(args.dir):
+            print(path)
+        rotate_backups(get_backup_settings()[1], args.dir)
+    elif args.command == 'list':
+        for snapshot in list_backups(args.dir):
+            print(f"{snapshot['created']:%Y-%m-%d %H:%M:%S}  {snapshot['size']:>12,}  {snapshot['path']}")
+    elif args.command == 'verify':
+        problems = check_integrity(args.snapshot)
+        print("ok" if not problems else "\n".join(problems))
+        return 1 if problems else 0
+    elif args.command == 'restore':
+        pre_restore_path = restore_backup(args.snapshot)
+        print(f"Restored from {args.snapshot}; the previous database was saved to {pre_restore_path}")
+    return 0
+
+if __name__ == '__main__':
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sys.exit(main())
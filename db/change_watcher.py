@@ -0,0 +1,146 @@
+import logging
+import os
+import sqlite3
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_db_path, PROCESS_ORIGIN
+from utils.events import (
+    event_bus, REPORT_CREATED, REPORT_UPDATED, REPORT_DELETED,
+    USER_ADDED, USER_UPDATED, USER_DELETED, TEMPLATE_ADDED, TEMPLATE_DELETED
+)
+
+logger = logging.getLogger(__name__)
+
+# change_log (table_name, operation) -> (event type, ID key in the event)
+_CHANGE_EVENTS = {
+    ('reports', 'insert'): (REPORT_CREATED, 'report_id'),
+    ('reports', 'update'): (REPORT_UPDATED, 'report_id'),
+    ('reports', 'delete'): (REPORT_DELETED, 'report_id'),
+    ('users', 'insert'): (USER_ADDED, 'user_id'),
+    ('users', 'update'): (USER_UPDATED, 'user_id'),
+    ('users', 'delete'): (USER_DELETED, 'user_id'),
+    ('templates', 'insert'): (TEMPLATE_ADDED, 'template_id'),
+    ('templates', 'delete'): (TEMPLATE_DELETED, 'template_id'),
+}
+
+def get_poll_interval():
+    """Seconds between change checks from CHANGE_POLL_INTERVAL (default 1)"""
+    try:
+        return max(0.1, float(os.getenv('CHANGE_POLL_INTERVAL', '1')))
+    except ValueError:
+        logger.warning("Invalid CHANGE_POLL_INTERVAL value, using 1 second")
+        return 1.0
+
+class ChangeWatcher:
+    """
+    Publishes database writes made by other processes on the event bus.
+
+    Writes made in this process already publish events from the db helpers.
+    Writes made elsewhere (a standalone run_api.py handling an emailed
+    approval, another desktop instance) are only visible in the database, so
+    the watcher keeps one connection open and checks PRAGMA data_version,
+    which changes only when another connection has committed. When it does,
+    the rows added to change_log by the triggers in init_db are turned into
+    events, skipping the rows whose origin is this process (see
+    stamp_change_origin in db/database.py). Rows without an origin come
+    from other processes or raw connections.
+    """
+
+    # Keep change_log rows this long so briefly stopped watchers can catch up
+    RETENTION_SECONDS = 24 * 60 * 60
+    PRUNE_INTERVAL = 60 * 60
+
+    def __init__(self, db_path=None, interval=None):
+        self.db_path = db_path or get_db_path()
+        self.interval = interval or get_poll_interval()
+        self._conn = None
+        self._data_version = None
+        self._last_id = 0
+        self._last_prune = time.monotonic()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def _connect(self):
+        self._conn = sqlite3.connect(self.db_path)
+        self._data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        self._last_id = self._conn.execute('SELECT COALESCE(MAX(id), 0) FROM change_log').fetchone()[0]
+
+    def poll(self):
+        """
+        Check once for changes committed by other connections.
+
+        Returns:
+            int: Number of events published
+        """
+        if self._conn is None:
+            self._connect()
+            return 0
+        data_version = self._conn.execute('PRAGMA data_version').fetchone()[0]
+        if data_version == self._data_version:
+            return 0
+        self._data_version = data_version
+
+        rows = self._conn.execute(
+            'SELECT id, table_name, row_id, operation, origin FROM change_log WHERE id > ? ORDER BY id',
+            (self._last_id,)
+        ).fetchall()
+        published = 0
+        for change_id, table_name, row_id, operation, origin in rows:
+            self._last_id = change_id
+            mapping = _CHANGE_EVENTS.get((table_name, operation))
+            # Writes made here were already published by the db helpers
+            if mapping is None or origin == PROCESS_ORIGIN:
+                continue
+            event_type, id_key = mapping
+            event_bus.publish(event_type, external=True, **{id_key: row_id})
+            published += 1
+
+        if time.monotonic() - self._last_prune > self.PRUNE_INTERVAL:
+            self._prune()
+        if published:
+            logger.info(f"Published {published} change(s) made by other processes")
+        return published
+
+    def _prune(self):
+        self._last_prune = time.monotonic()
+        self._conn.execute(
+            "DELETE FROM change_log WHERE id <= ? AND changed_at < datetime('now', ?)",
+            (self._last_id, f'-{self.RETENTION_SECONDS} seconds')
+        )
+        self._conn.commit()
+
+    def run(self):
+        """Poll for changes on the calling thread until stop() is called"""
+        logger.info(f"Change watcher started (every {self.interval}s)")
+        while not self._stop.is_set():
+            try:
+                self.poll()
+            except sqlite3.Error as e:
+                logger.error(f"Error checking for database changes: {e}")
+            self._stop.wait(self.interval)
+        if self._conn is not None:
+            self._conn.close()
+            self._conn = None
+
+    def start(self):
+        """Poll on a background daemon thread"""
+        self._thread = threading.Thread(target=self.run, daemon=True, name="ChangeWatcher")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Stop polling and release the connection"""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        elif self._conn is not None:
+            self._conn.close()
+            self._conn = None
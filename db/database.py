@@ -1,8 +1,23 @@
 import sqlite3
 import os
+import threading
+import time
+import uuid
 from pathlib import Path
 from datetime import datetime
 
+from utils.events import (
+    event_bus, REPORT_CREATED, REPORT_UPDATED, REPORT_STATUS_CHANGED,
+    USER_ADDED, USER_UPDATED, USER_DELETED, USER_EVENTS, TEMPLATE_ADDED, TEMPLATE_DELETED
+)
+
+# UTC timestamp with milliseconds for reports.last_modified_at; delta sync
+# orders changes by (last_modified_at, report_id)
+MODIFIED_AT_SQL = "strftime('%Y-%m-%d %H:%M:%f', 'now')"
+
+# Bookkeeping fields that do not get a new report version when they change
+UNVERSIONED_FIELDS = frozenset({'excel_file_path', 'template_key'})
+
 def get_db_path():
     """Get the path to the SQLite database file"""
     # Use the local appdata directory to ensure write permissions
@@ -32,10 +47,31 @@ def get_db_path():
     
     return str(app_data_dir / 'logbook.db')
 
+# Written into change_log.origin by this process's connections, so the
+# change watcher can tell its own writes from those of other processes
+PROCESS_ORIGIN = uuid.uuid4().hex
+
+def stamp_change_origin(conn):
+    """Tag the change_log rows written through a connection with PROCESS_ORIGIN"""
+    try:
+        # A TEMP trigger belongs to this connection only; raw connections
+        # (other processes, tools) leave origin NULL
+        conn.execute(f'''
+        CREATE TEMP TRIGGER IF NOT EXISTS trg_change_log_origin
+        AFTER INSERT ON main.change_log
+        BEGIN
+            UPDATE change_log SET origin = '{PROCESS_ORIGIN}' WHERE id = NEW.id;
+        END
+        ''')
+    except sqlite3.OperationalError:
+        # Database not initialized yet; init_db stamps its own connection
+        pass
+
 def get_db_connection():
     """Create a database connection and return the connection and cursor"""
     conn = sqlite3.connect(get_db_path())
     conn.row_factory = sqlite3.Row  # Enable row factory for dict-like access
+    stamp_change_origin(conn)
     cursor = conn.cursor()
     return conn, cursor
 
@@ -45,6 +81,56 @@ def close_connection(conn):
         conn.close()
 
 # User management functions
+class UserCache:
+    """
+    Short-lived cache of user rows keyed by ID.
+
+    User lookups happen once per signature, template row and email, and
+    users rarely change, so rows are kept for TTL seconds. add_user,
+    update_user and delete_user invalidate entries directly; changes made by
+    other processes arrive as external events from the change watcher.
+    """
+
+    TTL = 300
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._users = {}
+
+    def get(self, user_id):
+        """Get a cached user row, or None if missing or expired"""
+        with self._lock:
+            cached = self._users.get(user_id)
+            if cached and time.monotonic() - cached[1] < self.TTL:
+                return cached[0]
+        return None
+
+    def put(self, user):
+        with self._lock:
+            self._users[user['id']] = (user, time.monotonic())
+
+    def invalidate(self, user_id=None):
+        """Drop one user (or everyone) from the cache"""
+        with self._lock:
+            if user_id is None:
+                self._users.clear()
+            else:
+                self._users.pop(user_id, None)
+
+    def on_user_event(self, event):
+        if event.get('external'):
+            self.invalidate(event.get('user_id'))
+
+# Shared cache behind get_user_by_id and get_users_by_ids
+user_cache = UserCache()
+event_bus.subscribe(user_cache.on_user_event, USER_EVENTS)
+
+def _user_key(user_id):
+    try:
+        return int(user_id)
+    except (TypeError, ValueError):
+        return None
+
 def add_user(username, password_hash, role, email, emp_code="", designation=""):
     """Add a new user to the database"""
     conn, cursor = get_db_connection()
@@ -55,11 +141,13 @@ def add_user(username, password_hash, role, email, emp_code="", designation=""):
         ''', (username, password_hash, role, email, emp_code, designation))
         conn.commit()
         user_id = cursor.lastrowid
-        return user_id
     except sqlite3.IntegrityError:
         return None
     finally:
         close_connection(conn)
+    user_cache.invalidate(user_id)
+    event_bus.publish(USER_ADDED, user_id=user_id)
+    return user_id
 
 def delete_user(user_id):
     """Delete a user from the database"""
@@ -73,12 +161,15 @@ def delete_user(user_id):
             
         # Delete the user
         cursor.execute('DELETE FROM users WHERE id = ?', (user_id,))
+        _revoke_user_sessions(cursor, user_id)
         conn.commit()
-        return True
     except Exception:
         return False
     finally:
         close_connection(conn)
+    user_cache.invalidate(_user_key(user_id))
+    event_bus.publish(USER_DELETED, user_id=user_id)
+    return True
 
 def get_user_by_username(username):
     """Get a user by username"""
@@ -88,13 +179,57 @@ def get_user_by_username(username):
     close_connection(conn)
     return dict(user) if user else None
 
-def get_user_by_id(user_id):
-    """Get a user by ID"""
-    conn, cursor = get_db_connection()
-    cursor.execute('SELECT * FROM users WHERE id = ?', (user_id,))
-    user = cursor.fetchone()
-    close_connection(conn)
-    return dict(user) if user else None
+def get_user_by_id(user_id, fresh=False):
+    """
+    Get a user by ID (served from user_cache when possible).
+
+    Pass fresh=True for authorization checks: the cache only learns of
+    changes made by other processes through the change watcher, which a
+    standalone API server does not run.
+    """
+    key = _user_key(user_id)
+    if key is None:
+        return None
+    user = None if fresh else user_cache.get(key)
+    if user is None:
+        conn, cursor = get_db_connection()
+        cursor.execute('SELECT * FROM users WHERE id = ?', (key,))
+        row = cursor.fetchone()
+        close_connection(conn)
+        if not row:
+            return None
+        user = dict(row)
+        user_cache.put(user)
+    return dict(user)
+
+def get_users_by_ids(user_ids):
+    """
+    Get several users at once, querying only those not already cached.
+
+    Returns:
+        dict: user ID -> user dict; unknown IDs are omitted
+    """
+    users = {}
+    missing = []
+    for key in {_user_key(user_id) for user_id in user_ids} - {None}:
+        user = user_cache.get(key)
+        if user is None:
+            missing.append(key)
+        else:
+            users[key] = dict(user)
+    if missing:
+        conn, cursor = get_db_connection()
+        # Stay well below SQLite's limit on bound parameters
+        for start in range(0, len(missing), 500):
+            chunk = missing[start:start + 500]
+            placeholders = ', '.join('?' for _ in chunk)
+            cursor.execute(f'SELECT * FROM users WHERE id IN ({placeholders})', chunk)
+            for row in cursor.fetchall():
+                user = dict(row)
+                user_cache.put(user)
+                users[user['id']] = dict(user)
+        close_connection(conn)
+    return users
 
 def get_user_name(user_id):
     """Get a user's username by ID"""
@@ -140,13 +275,19 @@ def update_user(user_id, username=None, password_hash=None, role=None, email=Non
         values.append(user_id)
         sql = f"UPDATE users SET {', '.join(fields)} WHERE id = ?"
         cursor.execute(sql, tuple(values))
+        updated = cursor.rowcount > 0
+        if updated:
+            _revoke_user_sessions(cursor, user_id)
         conn.commit()
-        return cursor.rowcount > 0
     except Exception as e:
         print(f"Error updating user: {e}")
         return False
     finally:
         close_connection(conn)
+    if updated:
+        user_cache.invalidate(_user_key(user_id))
+        event_bus.publish(USER_UPDATED, user_id=user_id)
+    return updated
 
 # Template management functions
 def add_template(name, file_path, uploaded_by):
@@ -166,6 +307,7 @@ def add_template(name, file_path, uploaded_by):
         conn.commit()
         close_connection(conn)
         
+        event_bus.publish(TEMPLATE_ADDED, template_id=template_id)
         return template_id
     except Exception as e:
         print(f"Error adding template: {e}")
@@ -192,13 +334,19 @@ def delete_template(template_id):
         conn.commit()
         close_connection(conn)
         
-        # Delete file if exists
+        # Release the stored blob (other templates may share it) or delete the file
         try:
-            if os.path.exists(template['file_path']):
+            from utils.storage import get_store
+            store = get_store()
+            template_key = store.key_for_path(template['file_path'])
+            if template_key:
+                store.release(template_key)
+            elif os.path.exists(template['file_path']):
                 os.remove(template['file_path'])
         except Exception as e:
             print(f"Error deleting template file: {e}")
         
+        event_bus.publish(TEMPLATE_DELETED, template_id=template_id)
         return True
     except Exception as e:
         print(f"Error deleting template: {e}")
@@ -238,13 +386,14 @@ def get_all_templates():
 def create_report(user_id, title):
     """Create a new report in draft status"""
     conn, cursor = get_db_connection()
-    cursor.execute('''
-    INSERT INTO reports (user_id, title, status, last_modified_by)
-    VALUES (?, ?, 'draft', ?)
+    cursor.execute(f'''
+    INSERT INTO reports (user_id, title, status, last_modified_at, last_modified_by)
+    VALUES (?, ?, 'draft', {MODIFIED_AT_SQL}, ?)
     ''', (user_id, title, user_id))
     conn.commit()
     report_id = cursor.lastrowid
     close_connection(conn)
+    event_bus.publish(REPORT_CREATED, report_id=report_id, user_id=user_id)
     return report_id
 
 def update_report_status(report_id, status, modified_by):
@@ -252,11 +401,11 @@ def update_report_status(report_id, status, modified_by):
     try:
         print(f"DEBUG: Inside update_report_status - report_id={report_id}, status={status}, modified_by={modified_by}")
         conn, cursor = get_db_connection()
-        cursor.execute('''
+        cursor.execute(f'''
         UPDATE reports 
-        SET status = ?, last_modified_at = ?, last_modified_by = ?
+        SET status = ?, last_modified_at = {MODIFIED_AT_SQL}, last_modified_by = ?
         WHERE report_id = ?
-        ''', (status, datetime.now(), modified_by, report_id))
+        ''', (status, modified_by, report_id))
         
         # Check if any rows were affected
         rows_affected = cursor.rowcount
@@ -265,6 +414,9 @@ def update_report_status(report_id, status, modified_by):
         conn.commit()
         close_connection(conn)
         
+        if rows_affected > 0:
+            event_bus.publish(REPORT_STATUS_CHANGED, report_id=report_id, status=status)
+        
         # Return True if at least one row was updated
         return rows_affected > 0
     except Exception as e:
@@ -273,13 +425,48 @@ def update_report_status(report_id, status, modified_by):
         print(traceback.format_exc())
         return False
 
+def _record_field_versions(cursor, report_id, changes):
+    """
+    Store changed fields as the delta of a new report version.
+
+    changes is a list of (field_name, field_value, deleted). The first delta
+    of a report is recorded at its current version; later ones bump
+    reports.version (which also touches the report).
+
+    Returns:
+        tuple: (version recorded, whether reports.version was bumped), or
+        (None, False) if only unversioned fields changed
+    """
+    changes = [change for change in changes if change[0] not in UNVERSIONED_FIELDS]
+    if not changes:
+        return None, False
+    cursor.execute('''
+    SELECT MAX(v.version) AS last_version, r.version
+    FROM reports r LEFT JOIN report_field_versions v ON v.report_id = r.report_id
+    WHERE r.report_id = ?
+    ''', (report_id,))
+    row = cursor.fetchone()
+    if row is None or row['version'] is None and row['last_version'] is None:
+        return None, False
+    version = row['last_version'] + 1 if row['last_version'] is not None else row['version'] or 1
+    cursor.executemany('''
+    INSERT OR REPLACE INTO report_field_versions (report_id, version, field_name, field_value, deleted)
+    VALUES (?, ?, ?, ?, ?)
+    ''', [(report_id, version, field_name, field_value, 1 if deleted else 0)
+          for field_name, field_value, deleted in changes])
+    if version == row['version']:
+        return version, False
+    cursor.execute(f'UPDATE reports SET version = ?, last_modified_at = {MODIFIED_AT_SQL} WHERE report_id = ?',
+                   (version, report_id))
+    return version, True
+
 def add_report_data(report_id, field_name, field_value):
     """Add or update a field in a report"""
     conn, cursor = get_db_connection()
     
     # Check if field already exists
     cursor.execute('''
-    SELECT id FROM report_data
+    SELECT id, field_value FROM report_data
     WHERE report_id = ? AND field_name = ?
     ''', (report_id, field_name))
     existing = cursor.fetchone()
@@ -298,8 +485,183 @@ def add_report_data(report_id, field_name, field_value):
         VALUES (?, ?, ?)
         ''', (report_id, field_name, field_value))
     
+    # Changed values are kept in the report's version history
+    version, bumped = None, False
+    if not existing or existing['field_value'] != field_value:
+        version, bumped = _record_field_versions(cursor, report_id, [(field_name, field_value, False)])
+    
     conn.commit()
     close_connection(conn)
+    event_bus.publish(REPORT_UPDATED, report_id=report_id, field_name=field_name)
+    if bumped:
+        event_bus.publish(REPORT_UPDATED, report_id=report_id, version=version)
+
+def set_report_fields(report_id, fields, removed=()):
+    """
+    Upsert several report fields (and delete others) in one transaction.
+
+    Only fields whose stored value differs are written, so saving the same
+    values again does not touch the report. The written fields make up one
+    new report version. Like add_report_data, one REPORT_UPDATED event is
+    published per written field, plus one for the version bump or deletes
+    (matching the change_log rows added by the touch triggers).
+
+    Returns:
+        list: Names of the fields that were added, changed or removed
+    """
+    conn, cursor = get_db_connection()
+    try:
+        cursor.execute('SELECT field_name, field_value FROM report_data WHERE report_id = ?', (report_id,))
+        current = {row['field_name']: row['field_value'] for row in cursor.fetchall()}
+        changed = []
+        for field_name, field_value in fields.items():
+            if field_name in current and current[field_name] == field_value:
+                continue
+            cursor.execute('''
+            UPDATE report_data SET field_value = ?
+            WHERE report_id = ? AND field_name = ?
+            ''', (field_value, report_id, field_name))
+            if cursor.rowcount == 0:
+                cursor.execute('''
+                INSERT INTO report_data (report_id, field_name, field_value)
+                VALUES (?, ?, ?)
+                ''', (report_id, field_name, field_value))
+            changed.append(field_name)
+        deleted = [field_name for field_name in removed if field_name in current and field_name not in fields]
+        for field_name in deleted:
+            cursor.execute('DELETE FROM report_data WHERE report_id = ? AND field_name = ?',
+                           (report_id, field_name))
+        version, bumped = _record_field_versions(
+            cursor, report_id,
+            [(field_name, fields[field_name], False) for field_name in changed] +
+            [(field_name, None, True) for field_name in deleted]
+        )
+        if deleted and not bumped:
+            # Deletes have no touch trigger; touch the report once for all of them
+            cursor.execute(f'UPDATE reports SET last_modified_at = {MODIFIED_AT_SQL} WHERE report_id = ?',
+                           (report_id,))
+        conn.commit()
+    finally:
+        close_connection(conn)
+    for field_name in changed:
+        event_bus.publish(REPORT_UPDATED, report_id=report_id, field_name=field_name)
+    if deleted or bumped:
+        event_bus.publish(REPORT_UPDATED, report_id=report_id, field_names=deleted, version=version)
+    return changed + deleted
+
+def get_report_versions(report_id):
+    """
+    List a report's recorded versions, oldest first.
+
+    Returns:
+        list: Dicts with version, changed_at and the names of the fields
+        changed in that version
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT version, MIN(changed_at) AS changed_at, GROUP_CONCAT(field_name, char(31)) AS field_names
+    FROM report_field_versions
+    WHERE report_id = ?
+    GROUP BY version
+    ORDER BY version
+    ''', (report_id,))
+    rows = cursor.fetchall()
+    close_connection(conn)
+    return [{
+        'version': row['version'],
+        'changed_at': row['changed_at'],
+        'fields': sorted(row['field_names'].split('\x1f')),
+    } for row in rows]
+
+def get_report_fields_at(report_id, version, field_names=None):
+    """
+    Reconstruct a report's fields as they were at a version.
+
+    Each field takes the value of its latest delta at or before the version,
+    so this is one indexed query however many versions the report has.
+    Unversioned bookkeeping fields (see UNVERSIONED_FIELDS) are not included.
+
+    Args:
+        field_names: Only reconstruct these fields (default all)
+
+    Returns:
+        dict: field name -> value
+    """
+    conn, cursor = get_db_connection()
+    params = [report_id, version]
+    name_filter = ''
+    if field_names is not None:
+        field_names = list(field_names)
+        if not field_names:
+            close_connection(conn)
+            return {}
+        name_filter = f"AND v.field_name IN ({', '.join('?' * len(field_names))})"
+        params.extend(field_names)
+    cursor.execute(f'''
+    SELECT v.field_name, v.field_value, v.deleted
+    FROM report_field_versions v
+    WHERE v.report_id = ? AND v.version = (
+        SELECT MAX(p.version) FROM report_field_versions p
+        WHERE p.report_id = v.report_id AND p.field_name = v.field_name AND p.version <= ?
+    ) {name_filter}
+    ''', params)
+    rows = cursor.fetchall()
+    close_connection(conn)
+    return {row['field_name']: row['field_value'] for row in rows if not row['deleted']}
+
+def diff_report_versions(report_id, from_version, to_version=None):
+    """
+    Compare a report's fields between two versions.
+
+    Only the fields with deltas between the versions are looked at, so a
+    diff costs the size of the change rather than of the report. to_version
+    defaults to the latest version.
+
+    Returns:
+        dict: field name -> (value at from_version, value at to_version);
+        None stands for a field that did not exist
+    """
+    conn, cursor = get_db_connection()
+    if to_version is None:
+        cursor.execute('SELECT MAX(version) AS version FROM report_field_versions WHERE report_id = ?',
+                       (report_id,))
+        to_version = cursor.fetchone()['version'] or from_version
+    low, high = sorted((from_version, to_version))
+    cursor.execute('''
+    SELECT DISTINCT field_name FROM report_field_versions
+    WHERE report_id = ? AND version > ? AND version <= ?
+    ''', (report_id, low, high))
+    field_names = [row['field_name'] for row in cursor.fetchall()]
+    close_connection(conn)
+
+    before = get_report_fields_at(report_id, from_version, field_names)
+    after = get_report_fields_at(report_id, to_version, field_names)
+    return {
+        field_name: (before.get(field_name), after.get(field_name))
+        for field_name in sorted(field_names)
+        if before.get(field_name) != after.get(field_name) or (field_name in before) != (field_name in after)
+    }
+
+def get_changes_since_review(report_id):
+    """
+    Diff a report against the version it had when it was last sent back.
+
+    Returns:
+        tuple: (reviewed version, diff as from diff_report_versions), or None
+        if the report was never sent back or has no history from then
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT report_version FROM approval_logs
+    WHERE report_id = ? AND action = 'send_back'
+    ORDER BY id DESC
+    LIMIT 1
+    ''', (report_id,))
+    row = cursor.fetchone()
+    close_connection(conn)
+    if row is None or row['report_version'] is None:
+        return None
+    return row['report_version'], diff_report_versions(report_id, row['report_version'])
 
 def get_report(report_id):
     """Get a report by ID with all its data"""
@@ -369,16 +731,25 @@ def get_reports_by_status(status, user_id=None):
     close_connection(conn)
     return [dict(report) for report in reports]
 
-def get_user_reports(user_id):
-    """Get all reports created by a user"""
+def get_user_reports(user_id, report_ids=None):
+    """Get all reports created by a user (only those in report_ids, if given)"""
     conn, cursor = get_db_connection()
-    cursor.execute('''
+    id_filter = ''
+    params = [user_id]
+    if report_ids is not None:
+        report_ids = list(report_ids)
+        if not report_ids:
+            close_connection(conn)
+            return []
+        id_filter = f"AND r.report_id IN ({', '.join('?' for _ in report_ids)})"
+        params.extend(report_ids)
+    cursor.execute(f'''
     SELECT r.*, u.username as creator_name
     FROM reports r
     JOIN users u ON r.user_id = u.id
-    WHERE r.user_id = ?
-    ORDER BY r.created_at DESC
-    ''', (user_id,))
+    WHERE r.user_id = ? {id_filter}
+    ORDER BY r.created_at DESC, r.report_id DESC
+    ''', params)
     reports = cursor.fetchall()
     close_connection(conn)
     return [dict(report) for report in reports]
@@ -396,13 +767,43 @@ def get_all_reports():
     close_connection(conn)
     return [dict(report) for report in reports]
 
+def get_report_summaries(report_ids):
+    """
+    Get the list-view rows (report columns plus creator_name) for several reports.
+
+    Returns:
+        dict: report_id -> report dict; deleted reports are omitted
+    """
+    report_ids = list(report_ids)
+    if not report_ids:
+        return {}
+    conn, cursor = get_db_connection()
+    placeholders = ', '.join('?' for _ in report_ids)
+    cursor.execute(f'''
+    SELECT r.*, u.username as creator_name
+    FROM reports r
+    JOIN users u ON r.user_id = u.id
+    WHERE r.report_id IN ({placeholders})
+    ''', report_ids)
+    reports = cursor.fetchall()
+    close_connection(conn)
+    return {report['report_id']: dict(report) for report in reports}
+
+def count_reports_by_status():
+    """Get the number of reports in each status as a dict"""
+    conn, cursor = get_db_connection()
+    cursor.execute('SELECT status, COUNT(*) AS total FROM reports GROUP BY status')
+    counts = {row['status']: row['total'] for row in cursor.fetchall()}
+    close_connection(conn)
+    return counts
+
 def add_approval_log(report_id, action_by, action, comments=None):
-    """Add an approval log entry"""
+    """Add an approval log entry (stamped with the report's current version)"""
     conn, cursor = get_db_connection()
     cursor.execute('''
-    INSERT INTO approval_logs (report_id, action_by, action, comments)
-    VALUES (?, ?, ?, ?)
-    ''', (report_id, action_by, action, comments))
+    INSERT INTO approval_logs (report_id, action_by, action, comments, report_version)
+    VALUES (?, ?, ?, ?, (SELECT version FROM reports WHERE report_id = ?))
+    ''', (report_id, action_by, action, comments, report_id))
     conn.commit()
     close_connection(conn)
 
@@ -421,6 +822,42 @@ def get_leader_approval(report_id):
     close_connection(conn)
     return dict(approval) if approval else None
 
+def bulk_review_reports(report_ids, from_status, to_status, action_by, action, comments=None):
+    """
+    Move several reports to a new status and log the action in one transaction.
+
+    Only reports currently in from_status are changed, so reports already
+    handled by someone else are skipped rather than processed twice.
+
+    Returns:
+        dict: report_id -> True if the report was updated, False if skipped
+    """
+    conn, cursor = get_db_connection()
+    results = {}
+    try:
+        for report_id in report_ids:
+            cursor.execute(f'''
+            UPDATE reports
+            SET status = ?, last_modified_at = {MODIFIED_AT_SQL}, last_modified_by = ?
+            WHERE report_id = ? AND status = ?
+            ''', (to_status, action_by, report_id, from_status))
+            results[report_id] = cursor.rowcount == 1
+            if results[report_id]:
+                cursor.execute('''
+                INSERT INTO approval_logs (report_id, action_by, action, comments, report_version)
+                VALUES (?, ?, ?, ?, (SELECT version FROM reports WHERE report_id = ?))
+                ''', (report_id, action_by, action, comments, report_id))
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    finally:
+        close_connection(conn)
+    for report_id, updated in results.items():
+        if updated:
+            event_bus.publish(REPORT_STATUS_CHANGED, report_id=report_id, status=to_status)
+    return results
+
 # Offline email queue and processing
 # Ensure email_queue table exists
 conn, cursor = get_db_connection()
@@ -468,4 +905,440 @@ def update_email_queue_status(queue_id, status, error_message=None):
     else:
         cursor.execute("UPDATE email_queue SET status = ? WHERE id = ?", (status, queue_id))
     conn.commit()
-    close_connection(conn)
\ No newline at end of file
+    close_connection(conn)
+
+# Notification digest queue
+def add_digest_entry(recipient_id, kind, report_id, report_title, author_id=None, reviewer_id=None, excel_path=None):
+    """Queue a report notification for the next digest email to a recipient"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    INSERT INTO notification_digest (recipient_id, kind, report_id, report_title, author_id, reviewer_id, excel_path)
+    VALUES (?, ?, ?, ?, ?, ?, ?)
+    ''', (recipient_id, kind, report_id, report_title, author_id, reviewer_id, excel_path))
+    conn.commit()
+    entry_id = cursor.lastrowid
+    close_connection(conn)
+    return entry_id
+
+def get_due_digest_batches(window_seconds):
+    """
+    Get pending digest entries grouped per recipient and kind.
+
+    A batch is due once its oldest pending entry has waited at least
+    window_seconds, so every recipient gets at most one email per window.
+    Returns a dict mapping (recipient_id, kind) to a list of entries.
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT d.*
+    FROM notification_digest d
+    JOIN (
+        SELECT recipient_id, kind
+        FROM notification_digest
+        WHERE status = 'pending'
+        GROUP BY recipient_id, kind
+        HAVING MIN(queued_at) <= datetime('now', ?)
+    ) due ON due.recipient_id = d.recipient_id AND due.kind = d.kind
+    WHERE d.status = 'pending'
+    ORDER BY d.recipient_id, d.kind, d.queued_at, d.id
+    ''', (f"-{int(window_seconds)} seconds",))
+    rows = cursor.fetchall()
+    close_connection(conn)
+    
+    batches = {}
+    for row in rows:
+        batches.setdefault((row['recipient_id'], row['kind']), []).append(dict(row))
+    return batches
+
+def update_digest_entries_status(entry_ids, status, error_message=None):
+    """Update the status of a set of digest entries in one statement"""
+    if not entry_ids:
+        return 0
+    conn, cursor = get_db_connection()
+    placeholders = ', '.join('?' for _ in entry_ids)
+    if status == 'sent':
+        cursor.execute(
+            f"UPDATE notification_digest SET status = ?, error_message = NULL, sent_at = CURRENT_TIMESTAMP WHERE id IN ({placeholders})",
+            (status, *entry_ids)
+        )
+    else:
+        cursor.execute(
+            f"UPDATE notification_digest SET status = ?, error_message = ? WHERE id IN ({placeholders})",
+            (status, error_message, *entry_ids)
+        )
+    conn.commit()
+    updated = cursor.rowcount
+    close_connection(conn)
+    return updated
+
+# Shared file download links
+def add_shared_file(file_path, file_name, ttl_hours):
+    """Register a file for download through the API and return its access token"""
+    import secrets
+    token = secrets.token_urlsafe(24)
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    INSERT INTO shared_files (token, file_path, file_name, expires_at)
+    VALUES (?, ?, ?, datetime('now', ?))
+    ''', (token, file_path, file_name, f"+{int(ttl_hours)} hours"))
+    conn.commit()
+    close_connection(conn)
+    return token
+
+def get_shared_file(token):
+    """Get a shared file by token, or None if it is unknown or expired"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT * FROM shared_files
+    WHERE token = ? AND expires_at > datetime('now')
+    ''', (token,))
+    shared = cursor.fetchone()
+    close_connection(conn)
+    return dict(shared) if shared else None
+
+# Background API jobs
+def add_api_job(kind, report_id, requested_by):
+    """Record a queued background job and return its ID"""
+    import uuid
+    job_id = uuid.uuid4().hex
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    INSERT INTO api_jobs (job_id, kind, report_id, requested_by, status, owner, heartbeat)
+    VALUES (?, ?, ?, ?, 'queued', ?, CURRENT_TIMESTAMP)
+    ''', (job_id, kind, report_id, requested_by, PROCESS_ORIGIN))
+    conn.commit()
+    close_connection(conn)
+    return job_id
+
+def update_api_job(job_id, status, stage=None, message=None):
+    """Update the status, current stage and message of a background job"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    UPDATE api_jobs
+    SET status = ?, stage = COALESCE(?, stage), message = COALESCE(?, message),
+        updated_at = CURRENT_TIMESTAMP, heartbeat = CURRENT_TIMESTAMP
+    WHERE job_id = ?
+    ''', (status, stage, message, job_id))
+    conn.commit()
+    close_connection(conn)
+
+def get_api_jobs(job_ids):
+    """Get several background jobs by ID as a dict keyed by job ID"""
+    if not job_ids:
+        return {}
+    conn, cursor = get_db_connection()
+    placeholders = ', '.join('?' for _ in job_ids)
+    cursor.execute(f"SELECT * FROM api_jobs WHERE job_id IN ({placeholders})", list(job_ids))
+    rows = cursor.fetchall()
+    close_connection(conn)
+    return {row['job_id']: dict(row) for row in rows}
+
+def get_api_job(job_id):
+    """Get a background job by ID"""
+    conn, cursor = get_db_connection()
+    cursor.execute("SELECT * FROM api_jobs WHERE job_id = ?", (job_id,))
+    job = cursor.fetchone()
+    close_connection(conn)
+    return dict(job) if job else None
+
+def touch_api_jobs():
+    """Refresh the heartbeat of this process's queued and running jobs"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    UPDATE api_jobs SET heartbeat = CURRENT_TIMESTAMP
+    WHERE owner = ? AND status IN ('queued', 'running')
+    ''', (PROCESS_ORIGIN,))
+    conn.commit()
+    close_connection(conn)
+
+def claim_stale_api_jobs(stale_after):
+    """
+    Take over queued or running jobs whose process has stopped.
+
+    A job is stale when its owner has not refreshed its heartbeat for
+    stale_after seconds. Each job is claimed with a conditional UPDATE, so
+    when several processes start at once every job goes to exactly one of
+    them, and jobs of a process that is still running are left alone.
+
+    Returns:
+        list: The jobs claimed by this process, queued again
+    """
+    stale = "COALESCE(heartbeat, updated_at) < datetime('now', ?)"
+    cutoff = f"-{int(stale_after)} seconds"
+    conn, cursor = get_db_connection()
+    cursor.execute(f"SELECT job_id FROM api_jobs WHERE status IN ('queued', 'running') AND {stale} ORDER BY created_at",
+                   (cutoff,))
+    claimed = []
+    for row in cursor.fetchall():
+        cursor.execute(f'''
+        UPDATE api_jobs SET status = 'queued', owner = ?, heartbeat = CURRENT_TIMESTAMP, updated_at = CURRENT_TIMESTAMP
+        WHERE job_id = ? AND status IN ('queued', 'running') AND {stale}
+        ''', (PROCESS_ORIGIN, row['job_id'], cutoff))
+        conn.commit()
+        if cursor.rowcount == 1:
+            claimed.append(row['job_id'])
+    jobs = []
+    if claimed:
+        placeholders = ', '.join('?' for _ in claimed)
+        cursor.execute(f"SELECT * FROM api_jobs WHERE job_id IN ({placeholders}) ORDER BY created_at", claimed)
+        jobs = [dict(row) for row in cursor.fetchall()]
+    close_connection(conn)
+    return jobs
+
+# Application settings
+def get_setting(key):
+    """Get an application setting value, or None if it is not set"""
+    conn, cursor = get_db_connection()
+    cursor.execute("SELECT value FROM app_settings WHERE key = ?", (key,))
+    row = cursor.fetchone()
+    close_connection(conn)
+    return row['value'] if row else None
+
+def set_setting_if_missing(key, value):
+    """Store a setting unless it already exists and return the stored value"""
+    conn, cursor = get_db_connection()
+    cursor.execute("INSERT OR IGNORE INTO app_settings (key, value) VALUES (?, ?)", (key, value))
+    conn.commit()
+    cursor.execute("SELECT value FROM app_settings WHERE key = ?", (key,))
+    stored = cursor.fetchone()['value']
+    close_connection(conn)
+    return stored
+
+# Email action token usage (idempotency records)
+def claim_action_token(nonce, action, report_id, admin_id, stale_after=300):
+    """
+    Record the first use of an action token.
+
+    A claim still 'processing' after stale_after seconds belongs to a process
+    that died mid-request; it is dropped so the link can be used again.
+
+    Returns:
+        bool: True if this call claimed the token, False if it was already used
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    DELETE FROM action_token_uses
+    WHERE nonce = ? AND status = 'processing' AND used_at < datetime('now', ?)
+    ''', (nonce, f"-{int(stale_after)} seconds"))
+    cursor.execute('''
+    INSERT OR IGNORE INTO action_token_uses (nonce, action, report_id, admin_id, status)
+    VALUES (?, ?, ?, ?, 'processing')
+    ''', (nonce, action, report_id, admin_id))
+    conn.commit()
+    claimed = cursor.rowcount == 1
+    close_connection(conn)
+    return claimed
+
+def complete_action_token(nonce, response_code, response_body):
+    """Store the response of a used action token so repeated hits can replay it"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    UPDATE action_token_uses
+    SET status = 'done', response_code = ?, response_body = ?, completed_at = CURRENT_TIMESTAMP
+    WHERE nonce = ?
+    ''', (response_code, response_body, nonce))
+    conn.commit()
+    close_connection(conn)
+
+def get_action_token_use(nonce):
+    """Get the idempotency record of an action token"""
+    conn, cursor = get_db_connection()
+    cursor.execute("SELECT * FROM action_token_uses WHERE nonce = ?", (nonce,))
+    row = cursor.fetchone()
+    close_connection(conn)
+    return dict(row) if row else None
+
+# Session token revocations (shared by the desktop app and the API server)
+def _revoke_user_sessions(cursor, user_id):
+    """Invalidate every session token issued to a user before now"""
+    cursor.execute('''
+    INSERT OR REPLACE INTO session_user_cutoffs (user_id, revoked_at) VALUES (?, ?)
+    ''', (user_id, int(time.time() * 1000)))
+
+def revoke_session(sid, expires_at):
+    """
+    Record a revoked session token until it expires.
+
+    Rows of tokens that have expired since are dropped, as expired tokens
+    fail verification anyway.
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute("DELETE FROM revoked_sessions WHERE expires_at < ?", (int(time.time()),))
+    cursor.execute("INSERT OR IGNORE INTO revoked_sessions (sid, expires_at) VALUES (?, ?)", (sid, expires_at))
+    conn.commit()
+    close_connection(conn)
+
+def is_session_revoked(sid, user_id, issued_at):
+    """Whether a session token was revoked, or issued (ms) before its user was last changed or deleted"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT EXISTS (SELECT 1 FROM revoked_sessions WHERE sid = ?)
+        OR EXISTS (SELECT 1 FROM session_user_cutoffs WHERE user_id = ? AND revoked_at > ?)
+    ''', (sid, user_id, issued_at))
+    revoked = bool(cursor.fetchone()[0])
+    close_connection(conn)
+    return revoked
+
+# Report artifacts (generated PDFs and workbooks)
+def add_report_artifact(report_id, kind, path, size, sha256, version=None, created_at=None):
+    """
+    Record a generated file for a report.
+
+    Regenerating a file at the same path replaces its previous record.
+    created_at defaults to now (UTC, 'YYYY-MM-DD HH:MM:SS.SSS').
+
+    Returns:
+        int: ID of the artifact record
+    """
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    INSERT OR REPLACE INTO report_artifacts (report_id, kind, path, size, sha256, version, created_at)
+    VALUES (?, ?, ?, ?, ?, ?, COALESCE(?, strftime('%Y-%m-%d %H:%M:%f', 'now')))
+    ''', (report_id, kind, os.path.abspath(path), size, sha256, version, created_at))
+    conn.commit()
+    artifact_id = cursor.lastrowid
+    close_connection(conn)
+    return artifact_id
+
+def get_latest_artifact(report_id, kind='pdf'):
+    """Get the most recently generated artifact of a kind for a report, or None"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT * FROM report_artifacts
+    WHERE report_id = ? AND kind = ?
+    ORDER BY created_at DESC, id DESC
+    LIMIT 1
+    ''', (report_id, kind))
+    row = cursor.fetchone()
+    close_connection(conn)
+    return dict(row) if row else None
+
+def get_artifact_by_path(path):
+    """Get the artifact recorded at a file path, or None"""
+    conn, cursor = get_db_connection()
+    cursor.execute("SELECT * FROM report_artifacts WHERE path = ?", (os.path.abspath(path),))
+    row = cursor.fetchone()
+    close_connection(conn)
+    return dict(row) if row else None
+
+def get_report_artifacts(report_id):
+    """Get every recorded artifact of a report, newest first"""
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT * FROM report_artifacts
+    WHERE report_id = ?
+    ORDER BY created_at DESC, id DESC
+    ''', (report_id,))
+    rows = cursor.fetchall()
+    close_connection(conn)
+    return [dict(row) for row in rows]
+
+def delete_report_artifact(artifact_id):
+    """Remove an artifact record (e.g. when its file no longer exists)"""
+    conn, cursor = get_db_connection()
+    cursor.execute("DELETE FROM report_artifacts WHERE id = ?", (artifact_id,))
+    conn.commit()
+    close_connection(conn)
+
+# Read-only API queries
+def get_reports_page(status=None, user_id=None, limit=50, offset=0, include_archived=False):
+    """
+    Get one page of reports, newest first.
+
+    With include_archived, reports moved to the archive database (see
+    db/archive.py) are listed too, flagged with 'archived': 1.
+
+    Returns:
+        tuple: (list of report dicts, total number of matching reports)
+    """
+    conditions = []
+    params = []
+    if status:
+        conditions.append("r.status = ?")
+        params.append(status)
+    if user_id:
+        conditions.append("r.user_id = ?")
+        params.append(user_id)
+    where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+
+    conn, cursor = get_db_connection()
+    source = "main.reports"
+    if include_archived:
+        from db.archive import attach_archive
+        if attach_archive(cursor):
+            columns = "report_id, user_id, title, status, version, created_at, last_modified_at, last_modified_by"
+            source = f'''(SELECT {columns}, 0 AS archived FROM main.reports
+                 UNION ALL
+                 SELECT {columns}, 1 AS archived FROM archive.reports)'''
+    cursor.execute(f"SELECT COUNT(*) FROM {source} r {where}", params)
+    total = cursor.fetchone()[0]
+    archived_column = ", r.archived" if source != "main.reports" else ""
+    cursor.execute(f'''
+    SELECT r.report_id, r.user_id, r.title, r.status, r.version, r.created_at,
+           r.last_modified_at, r.last_modified_by, u.username as creator_name{archived_column}
+    FROM {source} r
+    JOIN users u ON r.user_id = u.id
+    {where}
+    ORDER BY r.created_at DESC, r.report_id DESC
+    LIMIT ? OFFSET ?
+    ''', (*params, limit, offset))
+    reports = [dict(row) for row in cursor.fetchall()]
+    close_connection(conn)
+    return reports, total
+
+def get_reports_changed_since(since=None, user_id=None, limit=500):
+    """
+    Get reports modified or deleted after a sync watermark.
+
+    Changes are ordered by (last_modified_at, report_id), so a client that
+    stores the returned watermark and passes it back receives every later
+    change exactly once. Deleted reports are reported from report_tombstones.
+
+    Args:
+        since (tuple): (last_modified_at, report_id) watermark from a previous
+            call, or None for a full sync
+        user_id (int): Only include reports created by this user
+        limit (int): Maximum number of changes to return
+
+    Returns:
+        dict: 'reports' (changed report dicts), 'deleted' (report IDs),
+        'watermark' (to pass as since next time) and 'has_more'
+    """
+    since_at, since_id = since or ('', 0)
+    user_filter = "AND user_id = ?" if user_id else ""
+    user_params = (user_id,) if user_id else ()
+
+    conn, cursor = get_db_connection()
+    cursor.execute(f'''
+    SELECT report_id, last_modified_at AS changed_at, 0 AS deleted
+    FROM reports
+    WHERE (last_modified_at, report_id) > (?, ?) {user_filter}
+    UNION ALL
+    SELECT report_id, deleted_at AS changed_at, 1 AS deleted
+    FROM report_tombstones
+    WHERE (deleted_at, report_id) > (?, ?) {user_filter}
+    ORDER BY changed_at, report_id
+    LIMIT ?
+    ''', (since_at, since_id, *user_params, since_at, since_id, *user_params, limit))
+    changes = cursor.fetchall()
+    close_connection(conn)
+
+    changed_ids = [row['report_id'] for row in changes if not row['deleted']]
+    summaries = get_report_summaries(changed_ids)
+    watermark = (changes[-1]['changed_at'], changes[-1]['report_id']) if changes else (since_at, since_id)
+    return {
+        'reports': [summaries[report_id] for report_id in changed_ids if report_id in summaries],
+        'deleted': [row['report_id'] for row in changes if row['deleted']],
+        'watermark': watermark,
+        'has_more': len(changes) == limit,
+    }
+
+def get_queue_summary():
+    """Count email queue, digest and background job entries by status"""
+    conn, cursor = get_db_connection()
+    summary = {}
+    for table in ('email_queue', 'notification_digest', 'api_jobs'):
+        cursor.execute(f"SELECT status, COUNT(*) AS count FROM {table} GROUP BY status")
+        summary[table] = {row['status']: row['count'] for row in cursor.fetchall()}
+    close_connection(conn)
+    return summary
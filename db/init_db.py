@@ -127,6 +127,297 @@ def init_db():
     )
     ''')
     
+    # Create notification_digest table (pending digest notifications per recipient)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS notification_digest (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        recipient_id INTEGER NOT NULL,
+        kind TEXT NOT NULL,
+        report_id INTEGER NOT NULL,
+        report_title TEXT,
+        author_id INTEGER,
+        reviewer_id INTEGER,
+        excel_path TEXT,
+        status TEXT DEFAULT 'pending',
+        error_message TEXT,
+        queued_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        sent_at TIMESTAMP,
+        FOREIGN KEY (recipient_id) REFERENCES users (id),
+        FOREIGN KEY (report_id) REFERENCES reports (report_id)
+    )
+    ''')
+
+    # Create shared_files table (download links sent instead of large attachments)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS shared_files (
+        token TEXT PRIMARY KEY,
+        file_path TEXT NOT NULL,
+        file_name TEXT NOT NULL,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        expires_at TIMESTAMP NOT NULL
+    )
+    ''')
+
+    # Create api_jobs table (background work started from the email action API)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS api_jobs (
+        job_id TEXT PRIMARY KEY,
+        kind TEXT NOT NULL,
+        report_id INTEGER NOT NULL,
+        requested_by INTEGER,
+        status TEXT DEFAULT 'queued',
+        stage TEXT,
+        message TEXT,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        updated_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        owner TEXT,
+        heartbeat TIMESTAMP,
+        FOREIGN KEY (report_id) REFERENCES reports (report_id)
+    )
+    ''')
+    # Jobs record the process running them and when it last showed signs of
+    # life, so a restart only resumes jobs whose process has died
+    cursor.execute("PRAGMA table_info(api_jobs)")
+    job_columns = [column[1] for column in cursor.fetchall()]
+    for column in ('owner TEXT', 'heartbeat TIMESTAMP'):
+        if column.split()[0] not in job_columns:
+            cursor.execute(f"ALTER TABLE api_jobs ADD COLUMN {column}")
+
+    # Create app_settings table (key/value configuration such as signing secrets)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS app_settings (
+        key TEXT PRIMARY KEY,
+        value TEXT NOT NULL
+    )
+    ''')
+
+    # Create action_token_uses table (single-use email action tokens and their cached responses)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS action_token_uses (
+        nonce TEXT PRIMARY KEY,
+        action TEXT NOT NULL,
+        report_id INTEGER NOT NULL,
+        admin_id INTEGER NOT NULL,
+        status TEXT DEFAULT 'processing',
+        response_code INTEGER,
+        response_body TEXT,
+        used_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        completed_at TIMESTAMP
+    )
+    ''')
+
+    # Create session revocation tables (signed-out session tokens, and the
+    # time before which a changed or deleted user's tokens are invalid)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS revoked_sessions (
+        sid TEXT PRIMARY KEY,
+        expires_at INTEGER NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS session_user_cutoffs (
+        user_id INTEGER PRIMARY KEY,
+        revoked_at INTEGER NOT NULL
+    )
+    ''')
+
+    # Create notifications table (in-app notifications)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS notifications (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        user_id INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        message TEXT NOT NULL,
+        is_read BOOLEAN DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        FOREIGN KEY (user_id) REFERENCES users (id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_notifications_user_read
+    ON notifications (user_id, is_read, created_at)
+    ''')
+
+    # Create notifications_archive table (read notifications pruned by the retention job)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS notifications_archive (
+        id INTEGER PRIMARY KEY,
+        user_id INTEGER NOT NULL,
+        subject TEXT NOT NULL,
+        message TEXT NOT NULL,
+        is_read BOOLEAN DEFAULT 1,
+        created_at TIMESTAMP,
+        archived_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
+    # Create change_log table (written by triggers, read by db/change_watcher.py
+    # so running apps notice changes made by other processes)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS change_log (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        table_name TEXT NOT NULL,
+        row_id INTEGER NOT NULL,
+        operation TEXT NOT NULL,
+        changed_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+        origin TEXT
+    )
+    ''')
+    cursor.execute("PRAGMA table_info(change_log)")
+    if 'origin' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute("ALTER TABLE change_log ADD COLUMN origin TEXT")
+    from db.database import stamp_change_origin
+    stamp_change_origin(conn)
+    change_triggers = [
+        ('reports', 'report_id', ('insert', 'update', 'delete')),
+        ('users', 'id', ('insert', 'update', 'delete')),
+        ('templates', 'id', ('insert', 'delete')),
+    ]
+    for table_name, key, operations in change_triggers:
+        for operation in operations:
+            row = 'OLD' if operation == 'delete' else 'NEW'
+            cursor.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS trg_{table_name}_{operation}_log
+            AFTER {operation.upper()} ON {table_name}
+            BEGIN
+                INSERT INTO change_log (table_name, row_id, operation)
+                VALUES ('{table_name}', {row}.{key}, '{operation}');
+            END
+            ''')
+    # Field edits touch their report, which also records them in change_log
+    for operation in ('insert', 'update'):
+        cursor.execute(f'DROP TRIGGER IF EXISTS trg_report_data_{operation}_log')
+        cursor.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS trg_report_data_{operation}_touch
+        AFTER {operation.upper()} ON report_data
+        BEGIN
+            UPDATE reports SET last_modified_at = strftime('%Y-%m-%d %H:%M:%f', 'now')
+            WHERE report_id = NEW.report_id;
+        END
+        ''')
+
+    # Create report_tombstones table (deleted reports, for delta sync clients)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_tombstones (
+        report_id INTEGER PRIMARY KEY,
+        user_id INTEGER,
+        deleted_at TIMESTAMP NOT NULL
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_report_tombstones_deleted
+    ON report_tombstones (deleted_at, report_id)
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_reports_delete_tombstone
+    AFTER DELETE ON reports
+    BEGIN
+        INSERT OR REPLACE INTO report_tombstones (report_id, user_id, deleted_at)
+        VALUES (OLD.report_id, OLD.user_id, strftime('%Y-%m-%d %H:%M:%f', 'now'));
+    END
+    ''')
+
+    # Delta sync reads reports in (last_modified_at, report_id) order
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_reports_last_modified
+    ON reports (last_modified_at, report_id)
+    ''')
+    # Older versions stored last_modified_at in two formats: status changes
+    # wrote local datetime.now() values, new reports got the UTC
+    # CURRENT_TIMESTAMP default ('YYYY-MM-DD HH:MM:SS'). Rewrite both once as
+    # UTC milliseconds so they sort correctly against new timestamps.
+    cursor.execute("SELECT 1 FROM app_settings WHERE key = 'last_modified_utc_migrated'")
+    if cursor.fetchone() is None:
+        cursor.execute('''
+        UPDATE reports
+        SET last_modified_at = strftime('%Y-%m-%d %H:%M:%f', last_modified_at, 'utc')
+        WHERE last_modified_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9].[0-9][0-9][0-9][0-9][0-9][0-9]'
+        ''')
+        cursor.execute('''
+        UPDATE reports
+        SET last_modified_at = strftime('%Y-%m-%d %H:%M:%f', last_modified_at)
+        WHERE last_modified_at GLOB '[0-9][0-9][0-9][0-9]-[0-9][0-9]-[0-9][0-9] [0-9][0-9]:[0-9][0-9]:[0-9][0-9]'
+        ''')
+        cursor.execute("INSERT INTO app_settings (key, value) VALUES ('last_modified_utc_migrated', '1')")
+
+    # Create report_artifacts table (generated PDFs and the workbooks they were built from)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_artifacts (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        report_id INTEGER NOT NULL,
+        kind TEXT NOT NULL CHECK(kind IN ('pdf', 'excel')),
+        path TEXT NOT NULL UNIQUE,
+        size INTEGER,
+        sha256 TEXT,
+        version INTEGER,
+        created_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+        FOREIGN KEY (report_id) REFERENCES reports (report_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_report_artifacts_report
+    ON report_artifacts (report_id, kind, created_at)
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_reports_delete_artifacts
+    AFTER DELETE ON reports
+    BEGIN
+        DELETE FROM report_artifacts WHERE report_id = OLD.report_id;
+    END
+    ''')
+
+    # Field lookups and upserts go through (report_id, field_name)
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_report_data_report_field
+    ON report_data (report_id, field_name)
+    ''')
+
+    # Create report_field_versions table (field deltas per report version;
+    # a deleted field is stored as deleted = 1)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS report_field_versions (
+        report_id INTEGER NOT NULL,
+        field_name TEXT NOT NULL,
+        version INTEGER NOT NULL,
+        field_value TEXT,
+        deleted INTEGER NOT NULL DEFAULT 0,
+        changed_at TIMESTAMP DEFAULT (strftime('%Y-%m-%d %H:%M:%f', 'now')),
+        PRIMARY KEY (report_id, field_name, version),
+        FOREIGN KEY (report_id) REFERENCES reports (report_id)
+    )
+    ''')
+    cursor.execute('''
+    CREATE INDEX IF NOT EXISTS idx_report_field_versions_version
+    ON report_field_versions (report_id, version)
+    ''')
+    cursor.execute('''
+    CREATE TRIGGER IF NOT EXISTS trg_reports_delete_field_versions
+    AFTER DELETE ON reports
+    BEGIN
+        DELETE FROM report_field_versions WHERE report_id = OLD.report_id;
+    END
+    ''')
+    # Reports written before version history existed start from their
+    # current fields as a baseline at their current version
+    cursor.execute('''
+    INSERT INTO report_field_versions (report_id, field_name, version, field_value)
+    SELECT d.report_id, d.field_name, COALESCE(r.version, 1), d.field_value
+    FROM report_data d
+    JOIN reports r ON r.report_id = d.report_id
+    WHERE d.field_name NOT IN ('excel_file_path', 'template_key')
+      AND NOT EXISTS (SELECT 1 FROM report_field_versions v WHERE v.report_id = d.report_id)
+    ''')
+
+    # Create storage_blobs table (reference counts of utils/storage.py blobs)
+    cursor.execute('''
+    CREATE TABLE IF NOT EXISTS storage_blobs (
+        key TEXT PRIMARY KEY,
+        size INTEGER NOT NULL,
+        refcount INTEGER NOT NULL DEFAULT 0,
+        created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP
+    )
+    ''')
+
     # Add excel_file_path column to reports table if it doesn't exist
     cursor.execute('''
     PRAGMA table_info(reports)
@@ -138,6 +429,11 @@ def init_db():
         ALTER TABLE reports ADD COLUMN excel_file_path TEXT
         ''')
     
+    # Approval logs record the report version they acted on (see add_approval_log)
+    cursor.execute('PRAGMA table_info(approval_logs)')
+    if 'report_version' not in [column[1] for column in cursor.fetchall()]:
+        cursor.execute('ALTER TABLE approval_logs ADD COLUMN report_version INTEGER')
+    
     # Insert default admin user if it doesn't exist
     cursor.execute('''
     INSERT OR IGNORE INTO users (username, password_hash, role, email, emp_code, designation)
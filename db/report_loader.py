@@ -0,0 +1,197 @@
+import json
+import logging
+import sqlite3
+import sys
+import threading
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_db_connection, close_connection
+
+logger = logging.getLogger(__name__)
+
+_REPORT_COLUMNS = (
+    'report_id', 'user_id', 'title', 'status', 'version', 'created_at',
+    'last_modified_at', 'last_modified_by', 'excel_file_path', 'creator_name', 'modifier_name'
+)
+_LOG_COLUMNS = ('id', 'report_id', 'action_by', 'action', 'comments', 'timestamp', 'report_version', 'actor_name')
+
+_BASE_SELECT = '''
+SELECT r.report_id, r.user_id, r.title, r.status, r.version, r.created_at,
+       r.last_modified_at, r.last_modified_by, r.excel_file_path,
+       u.username AS creator_name, m.username AS modifier_name
+'''
+
+_FIELDS_SUBQUERY = '''
+       , (SELECT json_group_object(d.field_name, d.field_value)
+          FROM report_data d WHERE d.report_id = r.report_id) AS fields_json
+'''
+
+_LOGS_SUBQUERY = '''
+       , (SELECT json_group_array(json_object(
+                'id', l.id, 'report_id', l.report_id, 'action_by', l.action_by, 'action', l.action,
+                'comments', l.comments, 'timestamp', l.timestamp, 'report_version', l.report_version,
+                'actor_name', l.actor_name))
+          FROM (SELECT a.*, u2.username AS actor_name
+                FROM approval_logs a JOIN users u2 ON a.action_by = u2.id
+                WHERE a.report_id = r.report_id
+                ORDER BY a.timestamp ASC, a.id ASC) l) AS logs_json
+'''
+
+_FROM = '''
+FROM reports r
+JOIN users u ON r.user_id = u.id
+LEFT JOIN users m ON r.last_modified_by = m.id
+WHERE r.report_id = ?
+'''
+
+_json_supported = None
+_json_lock = threading.Lock()
+
+def _sqlite_has_json(cursor):
+    """Check once whether this SQLite build has the JSON functions"""
+    global _json_supported
+    with _json_lock:
+        if _json_supported is None:
+            try:
+                cursor.execute("SELECT json_group_array(1)")
+                _json_supported = True
+            except sqlite3.OperationalError:
+                logger.info("SQLite JSON functions unavailable; report sections load separately")
+                _json_supported = False
+        return _json_supported
+
+class _Record:
+    """Read-only dict-style access so records can stand in for get_report() dicts"""
+
+    __slots__ = ()
+
+    def __getitem__(self, key):
+        if key not in self:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def get(self, key, default=None):
+        return getattr(self, key) if key in self else default
+
+    def keys(self):
+        return list(self._keys)
+
+    def __contains__(self, key):
+        return key in self._keys
+
+class ApprovalLogRecord(_Record):
+    """One approval log entry with the name of the user who acted"""
+
+    __slots__ = _LOG_COLUMNS
+    _keys = frozenset(_LOG_COLUMNS)
+
+    def __init__(self, row):
+        for column in _LOG_COLUMNS:
+            setattr(self, column, row[column])
+
+    def to_dict(self):
+        return {column: getattr(self, column) for column in _LOG_COLUMNS}
+
+class ReportRecord(_Record):
+    """
+    Report metadata with fields and approval logs loaded on demand.
+
+    Sections requested from load_report() are filled by the same query;
+    the others are fetched the first time .fields or .approval_logs is
+    read.
+    """
+
+    __slots__ = _REPORT_COLUMNS + ('_fields', '_approval_logs')
+    _keys = frozenset(_REPORT_COLUMNS + ('fields', 'approval_logs'))
+
+    def __init__(self, row, fields=None, approval_logs=None):
+        for column in _REPORT_COLUMNS:
+            setattr(self, column, row[column])
+        self._fields = fields
+        self._approval_logs = approval_logs
+
+    @property
+    def fields(self):
+        if self._fields is None:
+            self._fields = _load_fields(self.report_id)
+        return self._fields
+
+    @property
+    def approval_logs(self):
+        if self._approval_logs is None:
+            self._approval_logs = _load_logs(self.report_id)
+        return self._approval_logs
+
+    def to_dict(self):
+        """Convert to the dict shape returned by get_report() (loads every section)"""
+        report = {column: getattr(self, column) for column in _REPORT_COLUMNS}
+        report['fields'] = dict(self.fields)
+        report['approval_logs'] = [log.to_dict() for log in self.approval_logs]
+        return report
+
+    def __repr__(self):
+        return f"ReportRecord(report_id={self.report_id!r}, title={self.title!r}, status={self.status!r})"
+
+def _load_fields(report_id):
+    conn, cursor = get_db_connection()
+    cursor.execute('SELECT field_name, field_value FROM report_data WHERE report_id = ?', (report_id,))
+    fields = {row['field_name']: row['field_value'] for row in cursor.fetchall()}
+    close_connection(conn)
+    return fields
+
+def _load_logs(report_id):
+    conn, cursor = get_db_connection()
+    cursor.execute('''
+    SELECT a.*, u.username AS actor_name
+    FROM approval_logs a
+    JOIN users u ON a.action_by = u.id
+    WHERE a.report_id = ?
+    ORDER BY a.timestamp ASC, a.id ASC
+    ''', (report_id,))
+    logs = [ApprovalLogRecord(row) for row in cursor.fetchall()]
+    close_connection(conn)
+    return logs
+
+def load_report(report_id, with_fields=False, with_logs=False):
+    """
+    Load a report's metadata, and optionally its fields and approval logs, in one query.
+
+    Sections not requested are loaded lazily on first access, so code that
+    only needs the title, status or author costs a single small query.
+
+    Returns:
+        ReportRecord, or None if the report does not exist
+    """
+    conn, cursor = get_db_connection()
+    try:
+        eager = (with_fields or with_logs) and _sqlite_has_json(cursor)
+        sql = _BASE_SELECT
+        if eager and with_fields:
+            sql += _FIELDS_SUBQUERY
+        if eager and with_logs:
+            sql += _LOGS_SUBQUERY
+        cursor.execute(sql + _FROM, (report_id,))
+        row = cursor.fetchone()
+    finally:
+        close_connection(conn)
+    if not row:
+        return None
+
+    fields = approval_logs = None
+    if eager and with_fields:
+        fields = json.loads(row['fields_json']) if row['fields_json'] else {}
+    if eager and with_logs:
+        approval_logs = [ApprovalLogRecord(log) for log in json.loads(row['logs_json'] or '[]')]
+    record = ReportRecord(row, fields, approval_logs)
+    if not eager:
+        # No JSON support: fetch requested sections now rather than on first use
+        if with_fields:
+            record.fields
+        if with_logs:
+            record.approval_logs
+    return record
@@ -0,0 +1,105 @@
+import importlib.util
+import logging
+import os
+import sys
+import threading
+
+from waitress import create_server
+from waitress import wasyncore
+
+logger = logging.getLogger(__name__)
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        logger.warning(f"Invalid {name} value, using default {default}")
+        return default
+
+def load_api_app():
+    """
+    Load the Flask app from email_module/email_action_api.py.
+
+    The module is loaded by path and registered as 'email_action_api' so it
+    never collides with the standard library 'email' package.
+
+    Returns:
+        Flask app, or None if the module could not be loaded
+    """
+    email_api_path = os.path.join(os.path.dirname(os.path.abspath(__file__)), "email_action_api.py")
+    if not os.path.exists(email_api_path):
+        logger.error(f"Email API module not found at: {email_api_path}")
+        return None
+    try:
+        spec = importlib.util.spec_from_file_location("email_action_api", email_api_path)
+        email_api = importlib.util.module_from_spec(spec)
+        sys.modules["email_action_api"] = email_api
+        spec.loader.exec_module(email_api)
+        logger.info("Successfully loaded email_action_api")
+        return email_api.app
+    except Exception as e:
+        logger.error(f"Failed to load email_action_api: {e}")
+        return None
+
+class ApiServer:
+    """
+    Waitress WSGI server for the approval API.
+
+    Settings (environment):
+        API_HOST / API_PORT: listen address (default 0.0.0.0:5050)
+        API_THREADS: request worker threads (default 8)
+        API_CONNECTION_LIMIT: maximum open connections (default 100)
+    """
+
+    def __init__(self, app, host=None, port=None, threads=None, connection_limit=None):
+        self.host = host or os.getenv('API_HOST', '0.0.0.0')
+        self.port = int(os.getenv('API_PORT', '5050') if port is None else port)
+        self.threads = threads or _env_int('API_THREADS', 8)
+        self.connection_limit = connection_limit or _env_int('API_CONNECTION_LIMIT', 100)
+        self.server = create_server(
+            app,
+            host=self.host,
+            port=self.port,
+            threads=self.threads,
+            connection_limit=self.connection_limit,
+            ident='Logbook',
+        )
+        self._thread = None
+
+    @property
+    def bound_port(self):
+        """The port actually bound (useful when port 0 was requested)"""
+        effective = getattr(self.server, 'effective_port', None)
+        if effective is None:
+            effective = self.server.effective_listen[0][1]
+        return effective
+
+    def serve_forever(self):
+        """Serve requests on the calling thread until stop() is called"""
+        logger.info(f"Serving API on {self.host}:{self.port} with {self.threads} threads")
+        self.server.run()
+
+    def start(self):
+        """Serve requests on a background daemon thread"""
+        self._thread = threading.Thread(target=self.serve_forever, daemon=True, name="ApiServer")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """
+        Shut the server down gracefully.
+
+        Requests already being handled get up to timeout seconds to finish;
+        the listening sockets and idle connections are then closed from the
+        server's own loop thread.
+        """
+        server = self.server
+        server.task_dispatcher.shutdown(cancel_pending=True, timeout=timeout)
+        socket_map = getattr(server, 'map', None) or server._map
+        trigger = next((d for d in list(socket_map.values()) if hasattr(d, 'pull_trigger')), None)
+        if trigger is not None and self._thread is not None and self._thread.is_alive():
+            trigger.pull_trigger(lambda: wasyncore.close_all(socket_map))
+            self._thread.join(timeout)
+        else:
+            wasyncore.close_all(socket_map)
+        logger.info("API server stopped")
@@ -0,0 +1,243 @@
+import base64
+import io
+import logging
+import os
+import sys
+import tempfile
+import threading
+import time
+import zipfile
+from collections import OrderedDict
+from email.mime.base import MIMEBase
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import add_shared_file
+from utils.storage import get_store
+
+logger = logging.getLogger(__name__)
+
+# 57 raw bytes encode to exactly one 76 character base64 line
+_ENCODE_CHUNK_SIZE = 57 * 1024
+
+# Formats that are already compressed gain nothing from zipping
+_COMPRESSED_EXTENSIONS = {'.xlsx', '.xlsm', '.docx', '.zip', '.gz', '.png', '.jpg', '.jpeg'}
+
+_MIME_TYPES = {
+    '.pdf': ('application', 'pdf'),
+    '.zip': ('application', 'zip'),
+    '.xlsx': ('application', 'vnd.openxmlformats-officedocument.spreadsheetml.sheet'),
+    '.xls': ('application', 'vnd.ms-excel'),
+}
+
+def _env_flag(name, default='0'):
+    return os.getenv(name, default).strip().lower() in ('1', 'true', 'yes')
+
+def _env_number(name, default):
+    try:
+        return float(os.getenv(name, default))
+    except ValueError:
+        logger.warning(f"Invalid {name} value, using default {default}")
+        return float(default)
+
+def encode_base64_stream(stream):
+    """Base64-encode a binary stream chunk by chunk into MIME-ready text"""
+    encoded = io.StringIO()
+    while True:
+        chunk = stream.read(_ENCODE_CHUNK_SIZE)
+        if not chunk:
+            break
+        encoded.write(base64.encodebytes(chunk).decode('ascii'))
+    return encoded.getvalue()
+
+class AttachmentPolicy:
+    """
+    Decide how files are delivered with an email.
+
+    Files are base64-encoded in chunks straight from disk, optionally zipped
+    (several files are bundled into one archive), and replaced by an API
+    download link when the payload exceeds the size threshold. Prepared
+    payloads and links are cached by file identity (by content key for files
+    in the content store), so sending the same file to several recipients in
+    one batch encodes it only once. The payload cache is bounded by the size
+    of the encoded text it holds, links are dropped once they are too old to
+    be reused, and both are safe to share between the worker
+    threads that send mail concurrently.
+
+    Settings (environment):
+        EMAIL_ATTACHMENT_COMPRESS: 1 to zip attachments (default 0)
+        EMAIL_ATTACHMENT_MAX_MB: largest payload attached directly (default 10)
+        EMAIL_ATTACHMENT_CACHE_MB: encoded payloads kept for reuse (default 16)
+        EMAIL_DOWNLOAD_LINK_TTL_HOURS: lifetime of download links (default 72)
+    """
+
+    def __init__(self, compress=None, max_bytes=None, link_ttl_hours=None, cache_bytes=None):
+        self.compress = _env_flag('EMAIL_ATTACHMENT_COMPRESS') if compress is None else compress
+        if max_bytes is None:
+            max_bytes = int(_env_number('EMAIL_ATTACHMENT_MAX_MB', '10') * 1024 * 1024)
+        self.max_bytes = max_bytes
+        if link_ttl_hours is None:
+            link_ttl_hours = int(_env_number('EMAIL_DOWNLOAD_LINK_TTL_HOURS', '72'))
+        self.link_ttl_hours = link_ttl_hours
+        if cache_bytes is None:
+            cache_bytes = int(_env_number('EMAIL_ATTACHMENT_CACHE_MB', '16') * 1024 * 1024)
+        self.cache_bytes = cache_bytes
+        self._lock = threading.Lock()
+        self._payloads = OrderedDict()
+        self._links = OrderedDict()      # key -> (token, created), oldest first
+
+    def prepare(self, attachment_paths, file_names=None):
+        """
+        Prepare attachments for one message.
+
+        Args:
+            attachment_paths (list): File paths to deliver; missing files are skipped
+            file_names (dict): Optional path -> name shown to the recipient, for
+                files whose own name is not meaningful (e.g. content store blobs)
+
+        Returns:
+            tuple: (list of MIME parts to attach, list of (file_name, url) download links)
+        """
+        file_names = file_names or {}
+        paths = []
+        for path in attachment_paths:
+            if path and os.path.exists(path) and path not in paths:
+                paths.append(path)
+        if not paths:
+            return [], []
+        named = tuple((path, file_names.get(path) or os.path.basename(path)) for path in paths)
+
+        if self.compress and len(paths) > 1:
+            payload = self._get_payload(named)
+            if payload['size'] <= self.max_bytes:
+                return [self._build_part(payload)], []
+
+        parts, links = [], []
+        for path, file_name in named:
+            payload = self._get_payload(((path, file_name),))
+            if payload['size'] <= self.max_bytes:
+                parts.append(self._build_part(payload))
+            else:
+                links.append((file_name, self._get_link(path, file_name)))
+        return parts, links
+
+    def _file_key(self, path):
+        # Stored blobs never change, so their content key identifies them
+        blob_key = get_store().key_for_path(path)
+        if blob_key:
+            return ('blob', blob_key)
+        stat = os.stat(path)
+        return (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+    def _get_payload(self, named_paths):
+        paths = [path for path, _ in named_paths]
+        key = (self.compress, tuple((self._file_key(path), file_name) for path, file_name in named_paths))
+        with self._lock:
+            payload = self._payloads.get(key)
+            if payload is not None:
+                self._payloads.move_to_end(key)
+                return payload
+
+        if len(paths) > 1:
+            payload = self._zip_payload(named_paths, 'reports.zip')
+        else:
+            path, file_name = named_paths[0]
+            ext = os.path.splitext(path)[1].lower()
+            if self.compress and ext not in _COMPRESSED_EXTENSIONS:
+                payload = self._zip_payload(named_paths, f"{os.path.splitext(file_name)[0]}.zip")
+            else:
+                # Encoded lazily, only if the file is small enough to attach
+                payload = {
+                    'file_name': file_name,
+                    'mime_type': _MIME_TYPES.get(ext, ('application', 'octet-stream')),
+                    'size': os.path.getsize(path),
+                    'encoded': None,
+                    'source': path,
+                }
+
+        with self._lock:
+            self._payloads[key] = payload
+            self._trim_payloads()
+        return payload
+
+    def _trim_payloads(self):
+        """Drop least recently used payloads until the encoded text fits the cache (lock held)"""
+        cached = sum(len(payload['encoded'] or '') for payload in self._payloads.values())
+        while cached > self.cache_bytes and self._payloads:
+            _, dropped = self._payloads.popitem(last=False)
+            cached -= len(dropped['encoded'] or '')
+
+    def _zip_payload(self, named_paths, file_name):
+        """Zip files into a spooled buffer and encode the archive"""
+        with tempfile.SpooledTemporaryFile(max_size=self.max_bytes) as buffer:
+            with zipfile.ZipFile(buffer, 'w', compression=zipfile.ZIP_DEFLATED) as archive:
+                for path, arcname in named_paths:
+                    archive.write(path, arcname=arcname)
+            size = buffer.tell()
+            if size > self.max_bytes:
+                encoded = None
+            else:
+                buffer.seek(0)
+                encoded = encode_base64_stream(buffer)
+        return {
+            'file_name': file_name,
+            'mime_type': _MIME_TYPES['.zip'],
+            'size': size,
+            'encoded': encoded,
+            'source': None,
+        }
+
+    def _build_part(self, payload):
+        encoded = payload['encoded']
+        if encoded is None:
+            with open(payload['source'], 'rb') as file:
+                encoded = encode_base64_stream(file)
+            with self._lock:
+                payload['encoded'] = encoded
+                self._trim_payloads()
+        maintype, subtype = payload['mime_type']
+        part = MIMEBase(maintype, subtype, name=payload['file_name'])
+        part.set_payload(encoded)
+        part['Content-Transfer-Encoding'] = 'base64'
+        part['Content-Disposition'] = f'attachment; filename="{payload["file_name"]}"'
+        return part
+
+    def _get_link(self, path, file_name):
+        key = (self._file_key(path), file_name)
+        # Reuse a link only while it has most of its lifetime left
+        reuse_seconds = self.link_ttl_hours * 1800
+        with self._lock:
+            cached = self._links.get(key)
+        if cached and time.monotonic() - cached[1] < reuse_seconds:
+            token = cached[0]
+        else:
+            token = add_shared_file(os.path.abspath(path), file_name, self.link_ttl_hours)
+            now = time.monotonic()
+            with self._lock:
+                self._links[key] = (token, now)
+                self._links.move_to_end(key)
+                # Links past their reuse window are never handed out again
+                while self._links and now - next(iter(self._links.values()))[1] >= reuse_seconds:
+                    self._links.popitem(last=False)
+        api_base_url = os.getenv('API_BASE_URL', 'http://localhost:5050')
+        return f"{api_base_url}/api/files/{token}"
+
+def report_attachment_name(report_id, path):
+    """Readable attachment name for a report file kept in the content store, else None"""
+    if not path or not get_store().key_for_path(path):
+        return None
+    return f"report_{report_id}{os.path.splitext(path)[1]}"
+
+def add_download_links(body, links):
+    """Append a download section for linked files to an HTML email body"""
+    if not links:
+        return body
+    items = ''.join(f'<li><a href="{url}">{name}</a></li>' for name, url in links)
+    section = f"<p>The following files are too large to attach and can be downloaded here:</p><ul>{items}</ul>"
+    if '</body>' in body:
+        return body.replace('</body>', f"{section}\n</body>", 1)
+    return body + section
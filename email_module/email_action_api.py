@@ -1,80 +1,224 @@
-from flask import Flask, request, jsonify
+from flask import Flask, request, jsonify, send_file
+import math
 import os
-from db.database import update_report_status, get_report, get_user_by_id, add_approval_log, add_email_queue
-from email_sender import EmailSender
-import socket
+from db.database import (
+    get_user_by_id, get_shared_file, bulk_review_reports,
+    claim_action_token, complete_action_token, get_action_token_use
+)
+from db.report_loader import load_report
+from email_module.jobs import submit_approval_job, get_job, bulk_approve_reports, bulk_send_back_reports
+from email_module.reports_api import reports_api, api_key_error
+from utils.auth import Auth, LoginThrottled
+from utils.session import issue_session_token, verify_session_token, revoke_session_token, session_user
+from utils.signing import APPROVE, SEND_BACK, verify_action_token, unsigned_actions_allowed
 
 app = Flask(__name__)
+app.register_blueprint(reports_api)
 
 def get_admin_email():
     # You should implement this to fetch the admin email from your DB/config
     admin = get_user_by_id(1)  # Example: admin user_id = 1
     return admin['email'] if admin else None
 
-def _is_online():
-    try:
-        socket.create_connection(("8.8.8.8", 53), timeout=2)
-        return True
-    except OSError:
-        return False
+def _session_admin():
+    """
+    Read the admin session sent in the X-Session-Token header.
 
-@app.route('/api/report/approve', methods=['GET'])
-def approve_report():
+    Returns (admin user, None), (None, None) when no session was sent, or
+    (None, error response). The admin comes from the token's claims, so no
+    user lookup is needed.
+    """
+    token = request.headers.get('X-Session-Token')
+    if not token:
+        return None, None
+    claims, error = verify_session_token(token)
+    if error:
+        return None, (jsonify({'success': False, 'message': error}), 401)
+    if claims['role'] != 'admin':
+        return None, (jsonify({'success': False, 'message': 'This action needs an admin session'}), 403)
+    return session_user(claims), None
+
+def _resolve_action(action):
+    """
+    Read the report and admin for an emailed action from the request.
+
+    Signed tokens are required unless the request carries an admin session
+    (the admin is then taken from the session, never the query string) or
+    ALLOW_UNSIGNED_ACTIONS permits legacy report_id/admin_id links. Returns
+    ((report_id, admin_id, admin, nonce), None) or (None, error response);
+    admin is the session user when known and nonce is None without a token.
+    """
+    admin, error = _session_admin()
+    if error:
+        return None, error
+    token = request.args.get('token')
+    if token:
+        claims, error = verify_action_token(token, action)
+        if error:
+            return None, (jsonify({'success': False, 'message': error}), 403)
+        if admin and admin['id'] != claims['u']:
+            admin = None
+        return (claims['r'], claims['u'], admin, claims['n']), None
+    if admin:
+        report_id = request.args.get('report_id')
+        if not report_id:
+            return None, (jsonify({'success': False, 'message': 'Missing report_id'}), 400)
+        return (report_id, admin['id'], admin, None), None
+    if not unsigned_actions_allowed():
+        return None, (jsonify({'success': False, 'message': 'Missing or invalid action token'}), 403)
     report_id = request.args.get('report_id')
     admin_id = request.args.get('admin_id')
-    print(f"DEBUG[approve_report] Called with report_id={report_id}, admin_id={admin_id}")
     if not report_id or not admin_id:
-        return jsonify({'success': False, 'message': 'Missing report_id or admin_id'}), 400
-    update_report_status(report_id, 'approved_admin', admin_id)
-    # Add approval log for admin to include in PDF signatures
-    add_approval_log(report_id, admin_id, 'approve_admin')
-    # Generate PDF and email to admin
+        return None, (jsonify({'success': False, 'message': 'Missing report_id or admin_id'}), 400)
+    return (report_id, admin_id, None, None), None
+
+def _not_awaiting_review():
+    return jsonify({'success': False, 'message': 'Report is not awaiting final approval'}), 409
+
+def _run_once(nonce, action, report_id, admin_id, handler):
+    """Run an action handler at most once per token, replaying the stored response on repeats"""
+    if nonce is None:
+        return handler()
+    if not claim_action_token(nonce, action, report_id, admin_id):
+        used = get_action_token_use(nonce)
+        if used and used['status'] == 'done':
+            return app.response_class(used['response_body'], status=used['response_code'], mimetype='application/json')
+        return jsonify({'success': True, 'message': 'This action is already being processed'}), 202
     try:
-        print("DEBUG[approve_report] Entering PDF generation and email send block")
-        from pdf.pdf_generator import PDFGenerator
-        report = get_report(report_id)
-        if not report:
-            return jsonify({'success': False, 'message': 'Report not found'}), 404
-        # Assume template_path can be fetched or is fixed for now
-        template_path = None
-        if hasattr(report, 'template_path'):
-            template_path = report['template_path']
-        elif 'template_path' in report:
-            template_path = report['template_path']
-        else:
-            # You may need to update this logic to fetch the template path
-            template_path = 'templates/default_template.xlsx'
-        output_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'approved_reports')
-        if not os.path.exists(output_dir):
-            os.makedirs(output_dir)
-        output_path = os.path.join(output_dir, f"report_{report_id}_final.pdf")
-        PDFGenerator.generate_report_pdf(report_id, template_path, output_path)
-        print(f"DEBUG[approve_report] PDFGenerator output_path: {output_path}, exists: {os.path.exists(output_path)}")
-        # Send PDF to admin and handle failures
-        sender = EmailSender()
-        # Attempt immediate send, else queue
-        if _is_online():
-            sent, send_msg = sender.send_final_pdf_to_admin(report_id, report['title'], admin_id, pdf_path=output_path)
-            print(f"DEBUG: send_final_pdf_to_admin result: success={sent}, message={send_msg}")
-            if not sent:
-                add_email_queue(report_id, admin_id, output_path)
-                return jsonify({'success': True, 'message': f'Email queued for later: {send_msg}'}), 200
-            return jsonify({'success': True, 'message': 'Email sent successfully'}), 200
-        else:
-            add_email_queue(report_id, admin_id, output_path)
-            print("DEBUG: Offline mode, email queued for later")
-            return jsonify({'success': True, 'message': 'Offline mode, email queued for later'}), 200
+        response, status = handler()
     except Exception as e:
-        return jsonify({'success': False, 'message': f'PDF or Email error: {str(e)}'}), 500
+        response, status = jsonify({'success': False, 'message': f'Action failed: {str(e)}'}), 500
+    complete_action_token(nonce, status, response.get_data(as_text=True))
+    return response, status
+
+@app.route('/api/report/approve', methods=['GET'])
+def approve_report():
+    resolved, error = _resolve_action(APPROVE)
+    if error:
+        return error
+    report_id, admin_id, admin, nonce = resolved
+    print(f"DEBUG[approve_report] Called with report_id={report_id}, admin_id={admin_id}")
+
+    def approve():
+        if not load_report(report_id):
+            return jsonify({'success': False, 'message': 'Report not found'}), 404
+        # Status change and the approval log (used for PDF signatures) in one
+        # transaction, and only while the report still awaits the admin
+        if not bulk_review_reports([report_id], 'approved_leader', 'approved_admin', admin_id, 'approve_admin')[report_id]:
+            return _not_awaiting_review()
+        # PDF generation and email run in the background so the request returns immediately
+        job_id = submit_approval_job(report_id, admin_id, admin)
+        return jsonify({
+            'success': True,
+            'message': 'Report approved; the final PDF will be emailed shortly',
+            'job_id': job_id,
+            'status_url': f"/api/jobs/{job_id}"
+        }), 202
+
+    return _run_once(nonce, APPROVE, report_id, admin_id, approve)
 
 @app.route('/api/report/send_back', methods=['GET'])
 def send_back_report():
-    report_id = request.args.get('report_id')
-    admin_id = request.args.get('admin_id')
-    if not report_id or not admin_id:
-        return jsonify({'success': False, 'message': 'Missing report_id or admin_id'}), 400
-    update_report_status(report_id, 'needs_revision', admin_id)
-    return jsonify({'success': True, 'message': 'Report sent back for review'}), 200
+    resolved, error = _resolve_action(SEND_BACK)
+    if error:
+        return error
+    report_id, admin_id, _, nonce = resolved
+
+    def send_back():
+        if not load_report(report_id):
+            return jsonify({'success': False, 'message': 'Report not found'}), 404
+        if not bulk_review_reports([report_id], 'approved_leader', 'needs_revision', admin_id, 'send_back')[report_id]:
+            return _not_awaiting_review()
+        return jsonify({'success': True, 'message': 'Report sent back for review'}), 200
+
+    return _run_once(nonce, SEND_BACK, report_id, admin_id, send_back)
+
+@app.route('/api/reports/bulk_review', methods=['POST'])
+def bulk_review():
+    """
+    Approve or send back several reports; body: {action, report_ids, comments}.
+
+    Authorized by an admin session (X-Session-Token) or by ADMIN_API_KEY,
+    in which case the body also names the acting admin_id.
+    """
+    admin, error = _session_admin()
+    if error:
+        return error
+    if admin is None:
+        error = api_key_error('ADMIN_API_KEY')
+        if error:
+            return error
+    data = request.get_json(silent=True) or {}
+    action = data.get('action')
+    report_ids = data.get('report_ids')
+    comments = (data.get('comments') or '').strip()
+    if action not in ('approve', 'send_back'):
+        return jsonify({'success': False, 'message': "action must be 'approve' or 'send_back'"}), 400
+    if not isinstance(report_ids, list) or not report_ids or not all(isinstance(r, int) for r in report_ids):
+        return jsonify({'success': False, 'message': 'report_ids must be a non-empty list of integers'}), 400
+    if admin is None:
+        # Read from the database, so a demoted or deleted admin is refused at once
+        admin = get_user_by_id(data.get('admin_id'), fresh=True)
+        if not admin or admin['role'] != 'admin':
+            return jsonify({'success': False, 'message': 'admin_id must identify an admin user'}), 403
+    if action == 'send_back' and not comments:
+        return jsonify({'success': False, 'message': 'Comments are required when sending reports back'}), 400
+
+    report_ids = list(dict.fromkeys(report_ids))
+    if action == 'approve':
+        results = bulk_approve_reports(report_ids, admin, comments)
+    else:
+        results = bulk_send_back_reports(report_ids, admin, comments)
+    return jsonify({
+        'success': True,
+        'results': {str(report_id): result for report_id, result in results.items()}
+    }), 202
+
+@app.route('/api/session', methods=['POST'])
+def create_session():
+    """Sign in; body: {username, password}. The token goes in the X-Session-Token header"""
+    data = request.get_json(silent=True) or {}
+    username = data.get('username')
+    password = data.get('password')
+    if not username or not password:
+        return jsonify({'success': False, 'message': 'username and password are required'}), 400
+    try:
+        user = Auth.login(username, password)
+    except LoginThrottled as e:
+        response = jsonify({'success': False, 'message': str(e)})
+        response.headers['Retry-After'] = str(math.ceil(e.retry_after))
+        return response, 429
+    if not user:
+        return jsonify({'success': False, 'message': 'Invalid username or password'}), 401
+    token = issue_session_token(user)
+    claims, _ = verify_session_token(token)
+    return jsonify({
+        'success': True,
+        'token': token,
+        'expires_at': claims['exp'],
+        'user': session_user(claims)
+    }), 201
+
+@app.route('/api/session', methods=['DELETE'])
+def end_session():
+    """Sign out the session sent in the X-Session-Token header"""
+    if not revoke_session_token(request.headers.get('X-Session-Token')):
+        return jsonify({'success': False, 'message': 'Missing or invalid session token'}), 401
+    return jsonify({'success': True, 'message': 'Signed out'}), 200
+
+@app.route('/api/jobs/<job_id>', methods=['GET'])
+def job_status(job_id):
+    job = get_job(job_id)
+    if not job:
+        return jsonify({'success': False, 'message': 'Job not found'}), 404
+    return jsonify({'success': True, 'job': job}), 200
+
+@app.route('/api/files/<token>', methods=['GET'])
+def download_shared_file(token):
+    shared = get_shared_file(token)
+    if not shared or not os.path.exists(shared['file_path']):
+        return jsonify({'success': False, 'message': 'Link expired or file not found'}), 404
+    return send_file(shared['file_path'], as_attachment=True, download_name=shared['file_name'])
 
 if __name__ == '__main__':
     app.run(port=5050, debug=True)
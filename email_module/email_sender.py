@@ -4,7 +4,6 @@ import sys
 from pathlib import Path
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 from dotenv import load_dotenv
 
 # Add the parent directory to the path to allow imports
@@ -15,7 +14,10 @@ if parent_dir not in sys.path:
 # Load environment variables
 load_dotenv()
 
-from db.database import get_user_by_id
+from db.database import get_user_by_id, get_users_by_ids
+from email_module.attachments import AttachmentPolicy, add_download_links, report_attachment_name
+from email_module.email_templates import render_email
+from utils.signing import make_action_urls
 
 class EmailSender:
     def __init__(self):
@@ -25,9 +27,14 @@ class EmailSender:
         self.smtp_username = os.getenv('SMTP_USERNAME', '')
         self.smtp_password = os.getenv('SMTP_PASSWORD', '')
         self.sender_email = os.getenv('SENDER_EMAIL', self.smtp_username)
+        self.attachment_policy = AttachmentPolicy()
         
-    def send_email(self, recipient_email, subject, body, attachment_path=None):
-        """Send an email with optional attachment"""
+    def send_email(self, recipient_email, subject, body, attachment_path=None, attachment_names=None):
+        """
+        Send an email with optional attachment (a single path or a list of paths).
+
+        attachment_names maps paths to the file names shown to the recipient.
+        """
         try:
             # Create message
             msg = MIMEMultipart()
@@ -35,15 +42,16 @@ class EmailSender:
             msg['To'] = recipient_email
             msg['Subject'] = subject
             
+            # Prepare files (compressed, or replaced by download links when too large)
+            attachment_paths = attachment_path if isinstance(attachment_path, (list, tuple)) else [attachment_path]
+            parts, links = self.attachment_policy.prepare(attachment_paths, attachment_names)
+            
             # Attach body
-            msg.attach(MIMEText(body, 'html'))
+            msg.attach(MIMEText(add_download_links(body, links), 'html'))
             
-            # Attach file if provided
-            if attachment_path and os.path.exists(attachment_path):
-                with open(attachment_path, 'rb') as file:
-                    attachment = MIMEApplication(file.read(), Name=os.path.basename(attachment_path))
-                attachment['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment_path)}"'
-                msg.attach(attachment)
+            # Attach files if provided
+            for part in parts:
+                msg.attach(part)
             
             # Connect to SMTP server and send email
             with smtplib.SMTP(self.smtp_server, self.smtp_port) as server:
@@ -65,20 +73,9 @@ class EmailSender:
             if not user or not unit_leader:
                 return False, "User or Unit Leader not found"
             
-            subject = f"New Report for Review: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>New Report for Review</h2>
-                <p>Hello {unit_leader['username']},</p>
-                <p>A new report has been submitted by {user['username']} and requires your review.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p>Please log in to the system to review this report.</p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            subject, body = render_email('unit_leader_review', recipient_name=unit_leader['username'],
+                                         author_name=user['username'], report_id=report_id,
+                                         report_title=report_title)
             
             return self.send_email(unit_leader['email'], subject, body)
         except Exception as e:
@@ -87,39 +84,24 @@ class EmailSender:
     def send_notification_to_admin(self, report_id, report_title, user_id, unit_leader_id, admin_id, excel_path=None, api_base_url="http://localhost:5050"):
         """Send a notification to an admin for final approval with Excel attachment and action links"""
         try:
-            user = get_user_by_id(user_id)
-            unit_leader = get_user_by_id(unit_leader_id)
-            admin = get_user_by_id(admin_id)
+            users = get_users_by_ids([user_id, unit_leader_id, admin_id])
+            user = users.get(user_id)
+            unit_leader = users.get(unit_leader_id)
+            admin = users.get(admin_id)
             
             if not user or not unit_leader or not admin:
                 return False, "User, Unit Leader, or Admin not found"
             
-            subject = f"Report Submitted for Final Approval"
-            approve_link = f"{api_base_url}/api/report/approve?report_id={report_id}&admin_id={admin_id}"
-            send_back_link = f"{api_base_url}/api/report/send_back?report_id={report_id}&admin_id={admin_id}"
-            print(f"DEBUG[EmailSender] Approval URL: {approve_link}")
-            print(f"DEBUG[EmailSender] Request Revision URL: {send_back_link}")
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Submitted for Final Approval</h2>
-                <p>Hello {admin['username']},</p>
-                <p>A report has been reviewed and approved by Unit Leader {unit_leader['username']} and is now ready for your final approval.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p><strong>Created by:</strong> {user['username']}</p>
-                <p>
-                    <a href='{approve_link}' style='padding:10px 20px; background:#27ae60; color:white; text-decoration:none; border-radius:5px;'>Approve</a>
-                    &nbsp;
-                    <a href='{send_back_link}' style='padding:10px 20px; background:#e67e22; color:white; text-decoration:none; border-radius:5px;'>Send Back for Review</a>
-                </p>
-                <p>The Excel report is attached to this email.</p>
-                <p>Thank you,<br>Report Management System</p>
-            </body>
-            </html>
-            """
-            
-            return self.send_email(admin['email'], subject, body, excel_path)
+            # Construct action URLs
+            approve_url, send_back_url = make_action_urls(api_base_url, report_id, admin_id)
+            subject, body = render_email('admin_review', recipient_name=admin['username'],
+                                         reviewer_name=unit_leader['username'], author_name=user['username'],
+                                         report_id=report_id, report_title=report_title,
+                                         approve_url=approve_url, send_back_url=send_back_url)
+            
+            # Attach Excel report if provided
+            return self.send_email(admin['email'], subject, body, attachment_path=excel_path,
+                                   attachment_names={excel_path: report_attachment_name(report_id, excel_path)})
         except Exception as e:
             return False, f"Failed to send admin notification: {str(e)}"
     
@@ -131,22 +113,10 @@ class EmailSender:
             if not admin:
                 return False, "Admin not found"
             
-            subject = f"Final PDF Report Approved"
-            body = f"""
-            <html>
-            <body>
-                <h2>Final PDF Report Approved</h2>
-                <p>Hello {admin['username']},</p>
-                <p>The final PDF report has been approved and is attached to this email.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p>Status: Approved and finalized.</p>
-                <p>Thank you,<br>Report Management System</p>
-            </body>
-            </html>
-            """
-            
-            return self.send_email(admin['email'], subject, body, pdf_path)
+            subject, body = render_email('final_pdf_admin', recipient_name=admin['username'],
+                                         report_id=report_id, report_title=report_title)
+            
+            return self.send_email(admin['email'], subject, body, attachment_path=pdf_path)
         except Exception as e:
             return False, f"Failed to send final PDF to admin: {str(e)}"
     
@@ -158,19 +128,9 @@ class EmailSender:
             if not user:
                 return False, "User not found"
             
-            subject = f"Report Approved: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Approved</h2>
-                <p>Hello {user['username']},</p>
-                <p>Your report "{report_title}" has been approved and finalized.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                {("<p>The final report is attached to this email as a PDF.</p>") if pdf_path else ""}
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            attachment_note = "<p>The final report is attached to this email as a PDF.</p>" if pdf_path else ""
+            subject, body = render_email('final_approval', recipient_name=user['username'], report_id=report_id,
+                                         report_title=report_title, attachment_note=attachment_note)
             
             return self.send_email(user['email'], subject, body, pdf_path)
         except Exception as e:
@@ -185,21 +145,9 @@ class EmailSender:
             if not user or not rejected_by:
                 return False, "User or Reviewer not found"
             
-            subject = f"Report Requires Revision: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Requires Revision</h2>
-                <p>Hello {user['username']},</p>
-                <p>Your report "{report_title}" requires some revisions before it can be approved.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Reviewed by:</strong> {rejected_by['username']}</p>
-                <p><strong>Comments:</strong> {comments}</p>
-                <p>Please log in to the system to make the necessary revisions.</p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            subject, body = render_email('revision_request', recipient_name=user['username'], report_id=report_id,
+                                         report_title=report_title, reviewer_name=rejected_by['username'],
+                                         comments=comments)
             
             return self.send_email(user['email'], subject, body)
         except Exception as e:
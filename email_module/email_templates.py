@@ -0,0 +1,182 @@
+from string import Template
+
+# Shared footer for every notification
+_SIGNATURE = "<p>Thank you,<br>LogBook System</p>"
+
+_LAYOUT = """
+            <html>
+            <body>
+                $content
+                %s
+            </body>
+            </html>
+            """ % _SIGNATURE
+
+# Templates as (subject, body content); bodies are wrapped in the shared layout
+_TEMPLATES = {
+    'unit_leader_review': (
+        "New Report for Review: $report_title",
+        """<h2>New Report for Review</h2>
+                <p>Hello $recipient_name,</p>
+                <p>A new report has been submitted by $author_name and requires your review.</p>
+                <p><strong>Report ID:</strong> $report_id</p>
+                <p><strong>Report Title:</strong> $report_title</p>
+                <p>Please log in to the system to review this report.</p>""",
+    ),
+    'admin_review': (
+        "Report Ready for Final Approval: $report_title",
+        """<h2>Report Ready for Final Approval</h2>
+                <p>Hello $recipient_name,</p>
+                <p>A report has been reviewed and approved by Unit Leader $reviewer_name and is now ready for your final approval.</p>
+                <p><strong>Report ID:</strong> $report_id</p>
+                <p><strong>Report Title:</strong> $report_title</p>
+                <p><strong>Created by:</strong> $author_name</p>
+                <p>Please use one of the options below:</p>
+                <p><a href="$approve_url">Approve Report</a> | <a href="$send_back_url">Request Revision</a></p>""",
+    ),
+    'final_pdf_admin': (
+        "Final PDF Report Approved",
+        """<h2>Final PDF Report Approved</h2>
+                <p>Hello $recipient_name,</p>
+                <p>The final PDF report has been approved and is attached to this email.</p>
+                <p><strong>Report ID:</strong> $report_id</p>
+                <p><strong>Report Title:</strong> $report_title</p>
+                <p>Status: Approved and finalized.</p>""",
+    ),
+    'final_approval': (
+        "Report Approved: $report_title",
+        """<h2>Report Approved</h2>
+                <p>Hello $recipient_name,</p>
+                <p>Your report "$report_title" has been approved and finalized.</p>
+                <p><strong>Report ID:</strong> $report_id</p>
+                $attachment_note""",
+    ),
+    'revision_request': (
+        "Report Requires Revision: $report_title",
+        """<h2>Report Requires Revision</h2>
+                <p>Hello $recipient_name,</p>
+                <p>Your report "$report_title" requires some revisions before it can be approved.</p>
+                <p><strong>Report ID:</strong> $report_id</p>
+                <p><strong>Reviewed by:</strong> $reviewer_name</p>
+                <p><strong>Comments:</strong> $comments</p>
+                <p>Please log in to the system to make the necessary revisions.</p>""",
+    ),
+    'admin_digest': (
+        "$count Report(s) Ready for Final Approval",
+        """<h2>Reports Ready for Final Approval</h2>
+                <p>Hello $recipient_name,</p>
+                <p>The following reports have been approved by Unit Leaders and are now ready for your final approval.</p>
+                <table border="1" cellpadding="5" cellspacing="0">
+                    <tr><th>Report ID</th><th>Report Title</th><th>Created by</th><th>Unit Leader</th><th>Actions</th></tr>
+                    $rows
+                </table>""",
+    ),
+    'admin_digest_row': (
+        "",
+        """
+                <tr>
+                    <td>$report_id</td>
+                    <td>$report_title</td>
+                    <td>$author_name</td>
+                    <td>$reviewer_name</td>
+                    <td><a href="$approve_url">Approve</a> | <a href="$send_back_url">Request Revision</a></td>
+                </tr>""",
+    ),
+    'unit_leader_digest': (
+        "$count New Report(s) for Review",
+        """<h2>New Reports for Review</h2>
+                <p>Hello $recipient_name,</p>
+                <p>The following reports have been submitted and require your review.</p>
+                <table border="1" cellpadding="5" cellspacing="0">
+                    <tr><th>Report ID</th><th>Report Title</th><th>Created by</th></tr>
+                    $rows
+                </table>
+                <p>Please log in to the system to review these reports.</p>""",
+    ),
+    'unit_leader_digest_row': (
+        "",
+        """
+                <tr>
+                    <td>$report_id</td>
+                    <td>$report_title</td>
+                    <td>$author_name</td>
+                </tr>""",
+    ),
+}
+
+# Fragments rendered inside a layout rather than as a full email
+_FRAGMENTS = {'admin_digest_row', 'unit_leader_digest_row'}
+
+class CompiledTemplate:
+    """
+    A string.Template split once into static text and placeholder names.
+
+    Rendering only joins the cached static chunks with the substituted
+    values, so bulk runs do not re-scan the template text for every email.
+    """
+
+    __slots__ = ('chunks', 'names')
+
+    def __init__(self, text):
+        self.chunks = []
+        self.names = []
+        position = 0
+        literal = []
+        for match in Template.pattern.finditer(text):
+            literal.append(text[position:match.start()])
+            position = match.end()
+            if match.group('escaped') is not None:
+                literal.append(Template.delimiter)
+                continue
+            name = match.group('named') or match.group('braced')
+            if name is None:
+                raise ValueError(f"Invalid placeholder in email template at position {match.start()}")
+            self.chunks.append(''.join(literal))
+            self.names.append(name)
+            literal = []
+        literal.append(text[position:])
+        self.chunks.append(''.join(literal))
+
+    def render(self, values):
+        """Substitute values; raises KeyError for a missing placeholder"""
+        parts = [self.chunks[0]]
+        for name, chunk in zip(self.names, self.chunks[1:]):
+            parts.append(str(values[name]))
+            parts.append(chunk)
+        return ''.join(parts)
+
+def _compile_registry():
+    registry = {}
+    for name, (subject, content) in _TEMPLATES.items():
+        if name not in _FRAGMENTS:
+            content = _LAYOUT.replace('$content', content)
+        registry[name] = (CompiledTemplate(subject), CompiledTemplate(content))
+    return registry
+
+# Compiled once at import and shared by every EmailSender
+_REGISTRY = _compile_registry()
+
+def template_names():
+    """Names of all registered email templates"""
+    return sorted(_REGISTRY)
+
+def render_email(name, **values):
+    """
+    Render a registered email template.
+
+    Args:
+        name (str): Template name, e.g. 'admin_review'
+        **values: Placeholder values
+
+    Returns:
+        tuple: (subject, html_body)
+    """
+    try:
+        subject, body = _REGISTRY[name]
+    except KeyError:
+        raise ValueError(f"Unknown email template: {name}")
+    return subject.render(values), body.render(values)
+
+def render_fragment(name, **values):
+    """Render a registered fragment (such as a digest table row) to HTML"""
+    return render_email(name, **values)[1]
@@ -0,0 +1,264 @@
+import logging
+import os
+import socket
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import (
+    add_api_job, update_api_job, get_api_job, get_api_jobs, touch_api_jobs, claim_stale_api_jobs,
+    add_email_queue, get_active_template, bulk_review_reports
+)
+from db.report_loader import load_report
+
+logger = logging.getLogger(__name__)
+
+# Job kinds
+FINALIZE_APPROVAL = 'finalize_approval'
+FINALIZE_REPORT = 'finalize_report'
+
+# Job statuses
+QUEUED = 'queued'
+RUNNING = 'running'
+SUCCEEDED = 'succeeded'
+FAILED = 'failed'
+
+# Running processes refresh their jobs' heartbeat this often; jobs whose
+# heartbeat is older than JOB_STALE_SECONDS belong to a process that died
+JOB_HEARTBEAT_SECONDS = 30
+JOB_STALE_SECONDS = 120
+
+_executor = None
+_executor_lock = threading.Lock()
+
+# LibreOffice cannot run several headless conversions on one user profile,
+# so PDF stages are serialized while email stages run in parallel
+_pdf_lock = threading.Lock()
+
+def get_worker_count():
+    """Get the number of approval workers from APPROVAL_WORKERS (default 2)"""
+    try:
+        return max(1, int(os.getenv('APPROVAL_WORKERS', '2')))
+    except ValueError:
+        logger.warning("Invalid APPROVAL_WORKERS value, using 2 workers")
+        return 2
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=get_worker_count(), thread_name_prefix="ApprovalWorker")
+            threading.Thread(target=_heartbeat_loop, name="ApprovalHeartbeat", daemon=True).start()
+        return _executor
+
+def _heartbeat_loop():
+    """Keep this process's jobs from looking stale to other processes"""
+    while True:
+        time.sleep(JOB_HEARTBEAT_SECONDS)
+        try:
+            touch_api_jobs()
+        except Exception as e:
+            logger.warning(f"Could not refresh approval job heartbeats: {e}")
+
+def _is_online():
+    try:
+        socket.create_connection(("8.8.8.8", 53), timeout=2)
+        return True
+    except OSError:
+        return False
+
+def submit_approval_job(report_id, admin_id, admin=None):
+    """
+    Queue the PDF and email stages of an admin approval.
+
+    admin is the approving user when already known (e.g. from a session
+    token), so their signature does not need to be looked up again.
+
+    Returns:
+        str: Job ID that can be polled through get_job()
+    """
+    job_id = add_api_job(FINALIZE_APPROVAL, report_id, admin_id)
+    _get_executor().submit(run_approval_job, job_id, report_id, admin_id, admin)
+    logger.info(f"Queued approval job {job_id} for report {report_id}")
+    return job_id
+
+def get_job(job_id):
+    """Get the current state of a job, or None if it does not exist"""
+    return get_api_job(job_id)
+
+def get_jobs(job_ids):
+    """Get the current state of several jobs as a dict keyed by job ID"""
+    return get_api_jobs(job_ids)
+
+def _template_path_for(report):
+    """Pick the template used to render a report's PDF"""
+    if report.get('template_path'):
+        return report['template_path']
+    templates = get_active_template()
+    if templates:
+        return templates[0]['file_path']
+    return 'templates/default_template.xlsx'
+
+def _known_signers(admin):
+    return {admin['id']: admin} if admin else None
+
+def run_approval_job(job_id, report_id, admin_id, admin=None):
+    """Generate the final PDF for an approved report and email it to the admin"""
+    try:
+        report = load_report(report_id)
+        if not report:
+            update_api_job(job_id, FAILED, message="Report not found")
+            return
+
+        update_api_job(job_id, RUNNING, stage='pdf')
+        from pdf.pdf_generator import PDFGenerator
+        template_path = _template_path_for(report)
+        output_dir = os.path.join(parent_dir, 'approved_reports')
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"report_{report_id}_final.pdf")
+        with _pdf_lock:
+            success, result = PDFGenerator.generate_report_pdf(report_id, template_path, output_path,
+                                                               _known_signers(admin))
+        if not success:
+            update_api_job(job_id, FAILED, message=f"PDF generation failed: {result}")
+            return
+
+        update_api_job(job_id, RUNNING, stage='email')
+        if _is_online():
+            from email_sender import EmailSender
+            sent, send_msg = EmailSender().send_final_pdf_to_admin(report_id, report['title'], admin_id, pdf_path=output_path)
+            if sent:
+                update_api_job(job_id, SUCCEEDED, stage='done', message='Email sent successfully')
+                return
+            message = f"Email queued for later: {send_msg}"
+        else:
+            message = 'Offline mode, email queued for later'
+        add_email_queue(report_id, admin_id, output_path)
+        update_api_job(job_id, SUCCEEDED, stage='done', message=message)
+    except Exception as e:
+        logger.error(f"Approval job {job_id} for report {report_id} failed", exc_info=True)
+        update_api_job(job_id, FAILED, message=f"PDF or Email error: {str(e)}")
+
+def run_finalize_job(job_id, report_id, admin_id, admin=None):
+    """Generate the final PDF for a report approved in bulk and notify its author"""
+    try:
+        report = load_report(report_id)
+        if not report:
+            update_api_job(job_id, FAILED, message="Report not found")
+            return
+
+        update_api_job(job_id, RUNNING, stage='pdf')
+        from pdf.pdf_generator import PDFGenerator
+        output_dir = os.path.join(parent_dir, 'approved_reports')
+        os.makedirs(output_dir, exist_ok=True)
+        output_path = os.path.join(output_dir, f"report_{report_id}_{datetime.now().strftime('%Y%m%d_%H%M%S')}.pdf")
+        with _pdf_lock:
+            success, result = PDFGenerator.generate_report_pdf(report_id, _template_path_for(report), output_path,
+                                                               _known_signers(admin))
+        if not success:
+            update_api_job(job_id, FAILED, message=f"PDF generation failed: {result}")
+            return
+
+        update_api_job(job_id, RUNNING, stage='notify')
+        from utils.notifications import send_report_notification
+        send_report_notification(
+            report['user_id'],
+            f"Report '{report['title']}' Approved",
+            "Your report has received final approval."
+        )
+        update_api_job(job_id, SUCCEEDED, stage='done', message=output_path)
+    except Exception as e:
+        logger.error(f"Finalize job {job_id} for report {report_id} failed", exc_info=True)
+        update_api_job(job_id, FAILED, message=f"PDF or notification error: {str(e)}")
+
+def _admin_log_comments(admin, comments):
+    """Append the admin's digital signature to approval comments"""
+    signature = f"{admin.get('emp_code', '') or ''} - {admin.get('designation', '') or ''}"
+    if not signature.strip(' -'):
+        return comments or None
+    return f"{comments}\nDigital Signature: {signature}" if comments else f"Digital Signature: {signature}"
+
+def bulk_approve_reports(report_ids, admin, comments=None):
+    """
+    Give final approval to several reports at once.
+
+    Status changes and approval logs are written in one transaction; PDF
+    generation and author notification for each approved report are queued
+    on the worker pool.
+
+    Args:
+        report_ids (list): Reports to approve (must be approved by a unit leader)
+        admin (dict): Approving admin user
+        comments (str): Optional approval comments
+
+    Returns:
+        dict: report_id -> {'success', 'job_id' or 'message'}
+    """
+    updated = bulk_review_reports(report_ids, 'approved_leader', 'approved_admin', admin['id'],
+                                  'approve_admin', _admin_log_comments(admin, comments))
+    results = {}
+    for report_id, ok in updated.items():
+        if not ok:
+            results[report_id] = {'success': False, 'message': 'Report is not awaiting final approval'}
+            continue
+        job_id = add_api_job(FINALIZE_REPORT, report_id, admin['id'])
+        _get_executor().submit(run_finalize_job, job_id, report_id, admin['id'], admin)
+        results[report_id] = {'success': True, 'job_id': job_id}
+    logger.info(f"Bulk approved {sum(1 for r in results.values() if r['success'])} of {len(report_ids)} report(s)")
+    return results
+
+def bulk_send_back_reports(report_ids, admin, comments):
+    """
+    Send several reports back for revision in one transaction and notify their authors.
+
+    Returns:
+        dict: report_id -> {'success', 'message'}
+    """
+    from utils.notifications import send_report_notification
+    updated = bulk_review_reports(report_ids, 'approved_leader', 'needs_revision', admin['id'], 'send_back', comments)
+    results = {}
+    for report_id, ok in updated.items():
+        if not ok:
+            results[report_id] = {'success': False, 'message': 'Report is not awaiting final approval'}
+            continue
+        report = load_report(report_id)
+        if report:
+            send_report_notification(
+                report['user_id'],
+                f"Report '{report['title']}' Needs Revision",
+                f"Your report requires revision. Comments: {comments}"
+            )
+        results[report_id] = {'success': True, 'message': 'Report sent back for revision'}
+    return results
+
+_JOB_RUNNERS = {
+    FINALIZE_APPROVAL: run_approval_job,
+    FINALIZE_REPORT: run_finalize_job,
+}
+
+def resume_unfinished_jobs():
+    """
+    Resubmit jobs interrupted by an application restart.
+
+    Only jobs whose process stopped refreshing their heartbeat are claimed,
+    so jobs still running in another process (the desktop app and a
+    standalone API server sharing the database) are not run twice.
+    """
+    jobs = claim_stale_api_jobs(JOB_STALE_SECONDS)
+    for job in jobs:
+        runner = _JOB_RUNNERS.get(job['kind'])
+        if runner is None:
+            update_api_job(job['job_id'], FAILED, message=f"Unknown job kind: {job['kind']}")
+            continue
+        _get_executor().submit(runner, job['job_id'], job['report_id'], job['requested_by'])
+    if jobs:
+        logger.info(f"Resumed {len(jobs)} unfinished API job(s)")
+    return len(jobs)
@@ -0,0 +1,131 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import add_digest_entry, get_due_digest_batches, update_digest_entries_status
+
+logger = logging.getLogger(__name__)
+
+# Digest kinds
+ADMIN_REVIEW = 'admin_review'
+LEADER_REVIEW = 'leader_review'
+
+def get_digest_window():
+    """
+    Get the digest window in seconds from EMAIL_DIGEST_WINDOW.
+
+    A window of 0 (the default) disables digest mode and notifications are
+    sent immediately, one email per report.
+    """
+    try:
+        return max(0, int(os.getenv('EMAIL_DIGEST_WINDOW', '0')))
+    except ValueError:
+        logger.warning("Invalid EMAIL_DIGEST_WINDOW value, digest mode disabled")
+        return 0
+
+def is_digest_enabled():
+    """Check whether notifications should be coalesced into digests"""
+    return get_digest_window() > 0
+
+def notify_admin(sender, report_id, report_title, user_id, unit_leader_id, admin_id, excel_path=None):
+    """
+    Notify an admin that a report is ready for final approval.
+
+    In digest mode the notification is queued and delivered with the next
+    digest for this admin; otherwise it is sent immediately.
+
+    Returns:
+        tuple: (success, message) as returned by EmailSender methods
+    """
+    if not is_digest_enabled():
+        return sender.send_notification_to_admin(
+            report_id, report_title, user_id, unit_leader_id, admin_id, excel_path=excel_path
+        )
+
+    try:
+        add_digest_entry(admin_id, ADMIN_REVIEW, report_id, report_title,
+                         author_id=user_id, reviewer_id=unit_leader_id, excel_path=excel_path)
+        return True, "Notification queued for digest"
+    except Exception as e:
+        logger.error(f"Error queuing admin digest entry for report {report_id}: {e}")
+        return False, f"Failed to queue admin notification: {str(e)}"
+
+def notify_unit_leader(sender, report_id, report_title, user_id, unit_leader_id):
+    """
+    Notify a unit leader that a report is waiting for review.
+
+    Returns:
+        tuple: (success, message) as returned by EmailSender methods
+    """
+    if not is_digest_enabled():
+        return sender.send_notification_to_unit_leader(report_id, report_title, user_id, unit_leader_id)
+
+    try:
+        add_digest_entry(unit_leader_id, LEADER_REVIEW, report_id, report_title, author_id=user_id)
+        return True, "Notification queued for digest"
+    except Exception as e:
+        logger.error(f"Error queuing unit leader digest entry for report {report_id}: {e}")
+        return False, f"Failed to queue unit leader notification: {str(e)}"
+
+def _latest_per_report(entries):
+    """Keep only the most recent entry for each report in a batch"""
+    latest = {}
+    for entry in entries:
+        latest[entry['report_id']] = entry
+    return sorted(latest.values(), key=lambda e: e['id'])
+
+def flush_due_digests(sender=None, window_seconds=None):
+    """
+    Send one digest email per recipient whose digest window has elapsed.
+
+    Failed batches stay pending (with the error recorded) and are retried on
+    the next flush.
+
+    Args:
+        sender: EmailSender instance to use (a new one is created if None)
+        window_seconds (int): Override for the configured digest window
+
+    Returns:
+        int: Number of digest emails sent
+    """
+    if window_seconds is None:
+        window_seconds = get_digest_window()
+
+    batches = get_due_digest_batches(window_seconds)
+    if not batches:
+        return 0
+
+    if sender is None:
+        from email_sender import EmailSender
+        sender = EmailSender()
+
+    sent = 0
+    for (recipient_id, kind), entries in batches.items():
+        entry_ids = [entry['id'] for entry in entries]
+        reports = _latest_per_report(entries)
+        if kind not in (ADMIN_REVIEW, LEADER_REVIEW):
+            update_digest_entries_status(entry_ids, 'error', f"Unknown digest kind: {kind}")
+            continue
+        try:
+            if kind == ADMIN_REVIEW:
+                success, msg = sender.send_admin_digest(recipient_id, reports)
+            else:
+                success, msg = sender.send_unit_leader_digest(recipient_id, reports)
+        except Exception as e:
+            success, msg = False, str(e)
+
+        if success:
+            update_digest_entries_status(entry_ids, 'sent')
+            sent += 1
+            logger.info(f"Sent {kind} digest with {len(reports)} report(s) to user {recipient_id}")
+        else:
+            update_digest_entries_status(entry_ids, 'pending', msg)
+            logger.error(f"Failed to send {kind} digest to user {recipient_id}: {msg}")
+
+    return sent
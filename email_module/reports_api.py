@@ -0,0 +1,145 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import sys
+from pathlib import Path
+
+from flask import Blueprint, Response, jsonify, request
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import (
+    get_reports_page, get_report, get_all_templates, get_queue_summary, get_reports_changed_since
+)
+from db.archive import get_archived_report
+
+reports_api = Blueprint('reports_api', __name__)
+
+DEFAULT_PAGE_SIZE = 50
+MAX_PAGE_SIZE = 200
+
+def api_key_error(env_name):
+    """
+    Check the request's API key against the key configured in env_name.
+
+    Returns None when the key matches, otherwise an error response. Endpoints
+    guarded by an unset key are disabled.
+    """
+    api_key = os.getenv(env_name, '')
+    if not api_key:
+        return jsonify({'success': False, 'message': f'This API is disabled; set {env_name} to enable it'}), 403
+    auth_header = request.headers.get('Authorization', '')
+    provided = request.headers.get('X-API-Key') or (auth_header[7:] if auth_header.startswith('Bearer ') else '')
+    if not hmac.compare_digest(provided.encode('utf-8'), api_key.encode('utf-8')):
+        return jsonify({'success': False, 'message': 'Invalid or missing API key'}), 401
+    return None
+
+@reports_api.before_request
+def _require_api_key():
+    """Only serve read requests that present READ_API_KEY"""
+    return api_key_error('READ_API_KEY')
+
+def _conditional_json(payload):
+    """
+    Serialize a payload with a content ETag.
+
+    Clients that send a matching If-None-Match get an empty 304 response, so
+    polling dashboards only download data that changed.
+    """
+    body = json.dumps(payload, sort_keys=True, default=str)
+    etag = hashlib.sha1(body.encode('utf-8')).hexdigest()
+    response = Response(body, mimetype='application/json')
+    response.set_etag(etag)
+    response.headers['Cache-Control'] = 'no-cache'
+    return response.make_conditional(request)
+
+def _page_args():
+    try:
+        page = max(1, int(request.args.get('page', 1)))
+        per_page = min(MAX_PAGE_SIZE, max(1, int(request.args.get('per_page', DEFAULT_PAGE_SIZE))))
+    except ValueError:
+        return None, None
+    return page, per_page
+
+@reports_api.route('/api/reports', methods=['GET'])
+def list_reports():
+    page, per_page = _page_args()
+    if page is None:
+        return jsonify({'success': False, 'message': 'page and per_page must be integers'}), 400
+    reports, total = get_reports_page(
+        status=request.args.get('status'),
+        user_id=request.args.get('user_id'),
+        limit=per_page,
+        offset=(page - 1) * per_page,
+        # Archived reports are listed unless the client asks for live ones only
+        include_archived=request.args.get('archived', '1') != '0',
+    )
+    return _conditional_json({
+        'success': True,
+        'reports': reports,
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page,
+    })
+
+def _encode_watermark(watermark):
+    return base64.urlsafe_b64encode(json.dumps(list(watermark)).encode('utf-8')).decode('ascii')
+
+def _decode_watermark(cursor):
+    """Decode a 'since' cursor; returns None for a full sync and raises ValueError if malformed"""
+    if not cursor:
+        return None
+    try:
+        changed_at, report_id = json.loads(base64.urlsafe_b64decode(cursor.encode('ascii')))
+        return str(changed_at), int(report_id)
+    except (TypeError, ValueError, UnicodeError) as e:
+        raise ValueError(str(e))
+
+@reports_api.route('/api/reports/changes', methods=['GET'])
+def report_changes():
+    """Reports changed or deleted since the 'since' cursor returned by a previous call"""
+    try:
+        since = _decode_watermark(request.args.get('since'))
+        limit = min(MAX_PAGE_SIZE, max(1, int(request.args.get('limit', MAX_PAGE_SIZE))))
+    except ValueError:
+        return jsonify({'success': False, 'message': 'Invalid since cursor or limit'}), 400
+    changes = get_reports_changed_since(since, user_id=request.args.get('user_id'), limit=limit)
+    return _conditional_json({
+        'success': True,
+        'reports': changes['reports'],
+        'deleted': changes['deleted'],
+        'next_since': _encode_watermark(changes['watermark']),
+        'has_more': changes['has_more'],
+    })
+
+@reports_api.route('/api/reports/<int:report_id>', methods=['GET'])
+def report_detail(report_id):
+    report = get_report(report_id) or get_archived_report(report_id)
+    if not report:
+        return jsonify({'success': False, 'message': 'Report not found'}), 404
+    return _conditional_json({'success': True, 'report': report})
+
+@reports_api.route('/api/templates', methods=['GET'])
+def list_templates():
+    templates = [
+        {
+            'id': template['id'],
+            'name': template['name'],
+            'file_name': os.path.basename(template['file_path']),
+            'is_active': bool(template['is_active']),
+            'uploaded_by': template['uploaded_by'],
+            'uploaded_at': template['uploaded_at'],
+        }
+        for template in get_all_templates()
+    ]
+    return _conditional_json({'success': True, 'templates': templates})
+
+@reports_api.route('/api/queue', methods=['GET'])
+def queue_status():
+    return _conditional_json({'success': True, 'queues': get_queue_summary()})
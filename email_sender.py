@@ -5,7 +5,6 @@ import ssl
 from pathlib import Path
 from email.mime.multipart import MIMEMultipart
 from email.mime.text import MIMEText
-from email.mime.application import MIMEApplication
 from dotenv import load_dotenv
 
 # Add the parent directory to the path to allow imports
@@ -16,7 +15,10 @@ if parent_dir not in sys.path:
 # Load environment variables
 load_dotenv()
 
-from db.database import get_user_by_id
+from db.database import get_user_by_id, get_users_by_ids
+from email_module.attachments import AttachmentPolicy, add_download_links, report_attachment_name
+from email_module.email_templates import render_email, render_fragment
+from utils.signing import make_action_urls
 
 class EmailSender:
     def __init__(self):
@@ -28,9 +30,14 @@ class EmailSender:
         self.smtp_username = os.getenv('SMTP_USERNAME', '')
         self.smtp_password = os.getenv('SMTP_PASSWORD', '')
         self.sender_email = os.getenv('SENDER_EMAIL', self.smtp_username)
+        self.attachment_policy = AttachmentPolicy()
         
-    def send_email(self, recipient_email, subject, body, attachment_path=None):
-        """Send an email with optional attachment"""
+    def send_email(self, recipient_email, subject, body, attachment_path=None, attachment_names=None):
+        """
+        Send an email with optional attachment (a single path or a list of paths).
+
+        attachment_names maps paths to the file names shown to the recipient.
+        """
         try:
             # Create message
             msg = MIMEMultipart()
@@ -38,15 +45,16 @@ class EmailSender:
             msg['To'] = recipient_email
             msg['Subject'] = subject
             
+            # Prepare files (compressed, or replaced by download links when too large)
+            attachment_paths = attachment_path if isinstance(attachment_path, (list, tuple)) else [attachment_path]
+            parts, links = self.attachment_policy.prepare(attachment_paths, attachment_names)
+            
             # Attach body
-            msg.attach(MIMEText(body, 'html'))
+            msg.attach(MIMEText(add_download_links(body, links), 'html'))
             
-            # Attach file if provided
-            if attachment_path and os.path.exists(attachment_path):
-                with open(attachment_path, 'rb') as file:
-                    attachment = MIMEApplication(file.read(), Name=os.path.basename(attachment_path))
-                attachment['Content-Disposition'] = f'attachment; filename="{os.path.basename(attachment_path)}"'
-                msg.attach(attachment)
+            # Attach files if provided
+            for part in parts:
+                msg.attach(part)
             
             # Connect to SMTP server and send email with SSL/TLS (bypass SSL verification)
             context = ssl._create_unverified_context()
@@ -75,20 +83,9 @@ class EmailSender:
             if not user or not unit_leader:
                 return False, "User or Unit Leader not found"
             
-            subject = f"New Report for Review: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>New Report for Review</h2>
-                <p>Hello {unit_leader['username']},</p>
-                <p>A new report has been submitted by {user['username']} and requires your review.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p>Please log in to the system to review this report.</p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            subject, body = render_email('unit_leader_review', recipient_name=unit_leader['username'],
+                                         author_name=user['username'], report_id=report_id,
+                                         report_title=report_title)
             
             return self.send_email(unit_leader['email'], subject, body)
         except Exception as e:
@@ -99,35 +96,24 @@ class EmailSender:
         try:
             # Determine backend API URL
             api_base_url = os.getenv('API_BASE_URL', 'http://localhost:5050')
-            user = get_user_by_id(user_id)
-            unit_leader = get_user_by_id(unit_leader_id)
-            admin = get_user_by_id(admin_id)
+            users = get_users_by_ids([user_id, unit_leader_id, admin_id])
+            user = users.get(user_id)
+            unit_leader = users.get(unit_leader_id)
+            admin = users.get(admin_id)
             
             if not user or not unit_leader or not admin:
                 return False, "User, Unit Leader, or Admin not found"
             
-            subject = f"Report Ready for Final Approval: {report_title}"
             # Construct action URLs
-            approve_url = f"{api_base_url}/api/report/approve?report_id={report_id}&admin_id={admin_id}"
-            send_back_url = f"{api_base_url}/api/report/send_back?report_id={report_id}&admin_id={admin_id}"
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Ready for Final Approval</h2>
-                <p>Hello {admin['username']},</p>
-                <p>A report has been reviewed and approved by Unit Leader {unit_leader['username']} and is now ready for your final approval.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p><strong>Created by:</strong> {user['username']}</p>
-                <p>Please use one of the options below:</p>
-                <p><a href="{approve_url}">Approve Report</a> | <a href="{send_back_url}">Request Revision</a></p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            approve_url, send_back_url = make_action_urls(api_base_url, report_id, admin_id)
+            subject, body = render_email('admin_review', recipient_name=admin['username'],
+                                         reviewer_name=unit_leader['username'], author_name=user['username'],
+                                         report_id=report_id, report_title=report_title,
+                                         approve_url=approve_url, send_back_url=send_back_url)
             
             # Attach Excel report if provided
-            return self.send_email(admin['email'], subject, body, attachment_path=excel_path)
+            return self.send_email(admin['email'], subject, body, attachment_path=excel_path,
+                                   attachment_names={excel_path: report_attachment_name(report_id, excel_path)})
         except Exception as e:
             return False, f"Failed to send admin notification: {str(e)}"
     
@@ -139,20 +125,8 @@ class EmailSender:
             if not admin:
                 return False, "Admin not found"
             
-            subject = f"Final PDF Report Approved"
-            body = f"""
-            <html>
-            <body>
-                <h2>Final PDF Report Approved</h2>
-                <p>Hello {admin['username']},</p>
-                <p>The final PDF report has been approved and is attached to this email.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Report Title:</strong> {report_title}</p>
-                <p>Status: Approved and finalized.</p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            subject, body = render_email('final_pdf_admin', recipient_name=admin['username'],
+                                         report_id=report_id, report_title=report_title)
             
             return self.send_email(admin['email'], subject, body, attachment_path=pdf_path)
         except Exception as e:
@@ -166,19 +140,9 @@ class EmailSender:
             if not user:
                 return False, "User not found"
             
-            subject = f"Report Approved: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Approved</h2>
-                <p>Hello {user['username']},</p>
-                <p>Your report "{report_title}" has been approved and finalized.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                {("<p>The final report is attached to this email as a PDF.</p>") if pdf_path else ""}
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            attachment_note = "<p>The final report is attached to this email as a PDF.</p>" if pdf_path else ""
+            subject, body = render_email('final_approval', recipient_name=user['username'], report_id=report_id,
+                                         report_title=report_title, attachment_note=attachment_note)
             
             return self.send_email(user['email'], subject, body, pdf_path)
         except Exception as e:
@@ -193,22 +157,76 @@ class EmailSender:
             if not user or not rejected_by:
                 return False, "User or Reviewer not found"
             
-            subject = f"Report Requires Revision: {report_title}"
-            body = f"""
-            <html>
-            <body>
-                <h2>Report Requires Revision</h2>
-                <p>Hello {user['username']},</p>
-                <p>Your report "{report_title}" requires some revisions before it can be approved.</p>
-                <p><strong>Report ID:</strong> {report_id}</p>
-                <p><strong>Reviewed by:</strong> {rejected_by['username']}</p>
-                <p><strong>Comments:</strong> {comments}</p>
-                <p>Please log in to the system to make the necessary revisions.</p>
-                <p>Thank you,<br>LogBook System</p>
-            </body>
-            </html>
-            """
+            subject, body = render_email('revision_request', recipient_name=user['username'], report_id=report_id,
+                                         report_title=report_title, reviewer_name=rejected_by['username'],
+                                         comments=comments)
             
             return self.send_email(user['email'], subject, body)
         except Exception as e:
-            return False, f"Failed to send rejection notification: {str(e)}"
\ No newline at end of file
+            return False, f"Failed to send rejection notification: {str(e)}"
+    
+    def send_admin_digest(self, admin_id, entries):
+        """Send one email listing every report awaiting an admin's final approval"""
+        try:
+            api_base_url = os.getenv('API_BASE_URL', 'http://localhost:5050')
+            admin = get_user_by_id(admin_id)
+            
+            if not admin:
+                return False, "Admin not found"
+            
+            rows = []
+            attachments = []
+            attachment_names = {}
+            users = get_users_by_ids([entry.get('author_id') for entry in entries] +
+                                     [entry.get('reviewer_id') for entry in entries])
+            for entry in entries:
+                report_id = entry['report_id']
+                author = users.get(entry.get('author_id'))
+                reviewer = users.get(entry.get('reviewer_id'))
+                approve_url, send_back_url = make_action_urls(api_base_url, report_id, admin_id)
+                rows.append(render_fragment(
+                    'admin_digest_row',
+                    report_id=report_id,
+                    report_title=entry.get('report_title') or '',
+                    author_name=author['username'] if author else 'Unknown',
+                    reviewer_name=reviewer['username'] if reviewer else 'Unknown',
+                    approve_url=approve_url,
+                    send_back_url=send_back_url,
+                ))
+                if entry.get('excel_path') and entry['excel_path'] not in attachments:
+                    attachments.append(entry['excel_path'])
+                    attachment_names[entry['excel_path']] = report_attachment_name(report_id, entry['excel_path'])
+            
+            subject, body = render_email('admin_digest', recipient_name=admin['username'],
+                                         count=len(entries), rows=''.join(rows))
+            
+            return self.send_email(admin['email'], subject, body, attachment_path=attachments,
+                                   attachment_names=attachment_names)
+        except Exception as e:
+            return False, f"Failed to send admin digest: {str(e)}"
+    
+    def send_unit_leader_digest(self, unit_leader_id, entries):
+        """Send one email listing every report awaiting a unit leader's review"""
+        try:
+            unit_leader = get_user_by_id(unit_leader_id)
+            
+            if not unit_leader:
+                return False, "Unit Leader not found"
+            
+            rows = []
+            authors = get_users_by_ids([entry.get('author_id') for entry in entries])
+            for entry in entries:
+                author = authors.get(entry.get('author_id'))
+                rows.append(render_fragment(
+                    'unit_leader_digest_row',
+                    report_id=entry['report_id'],
+                    report_title=entry.get('report_title') or '',
+                    author_name=author['username'] if author else 'Unknown',
+                ))
+            
+            subject, body = render_email('unit_leader_digest', recipient_name=unit_leader['username'],
+                                         count=len(entries), rows=''.join(rows))
+            
+            return self.send_email(unit_leader['email'], subject, body)
+        except Exception as e:
+            return False, f"Failed to send unit leader digest: {str(e)}"
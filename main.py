@@ -1,7 +1,6 @@
 import sys
 import os
 import threading
-import importlib.util
 import logging
 import traceback
 import socket
@@ -148,24 +147,9 @@ if not initialize_application():
 # Load environment variables from .env (override existing variables)
 load_dotenv(override=True)
 
-# Dynamically load local email_action_api for Flask endpoints (avoid stdlib email package conflict)
-email_api_path = os.path.join(os.path.dirname(__file__), "email_module", "email_action_api.py")
-if not os.path.exists(email_api_path):
-    logger.error(f"Email API module not found at: {email_api_path}")
-    email_api = None
-    flask_app = None
-else:
-    try:
-        spec = importlib.util.spec_from_file_location("email_action_api", email_api_path)
-        email_api = importlib.util.module_from_spec(spec)
-        sys.modules["email_action_api"] = email_api
-        spec.loader.exec_module(email_api)
-        flask_app = email_api.app
-        logger.info("Successfully loaded email_action_api")
-    except Exception as e:
-        logger.error(f"Failed to load email_action_api: {e}")
-        email_api = None
-        flask_app = None
+# Load the Flask app for the approval API endpoints
+from email_module.api_server import ApiServer, load_api_app
+flask_app = load_api_app()
 
 def _is_online():
     try:
@@ -278,10 +262,21 @@ if __name__ == "__main__":
     ngrok_thread = threading.Thread(target=setup_ngrok_tunnel, daemon=True, name="NgrokSetup")
     ngrok_thread.start()
 
-    threading.Thread(
-        target=lambda: flask_app.run(host=api_host, port=api_port, debug=False, use_reloader=False),
-        daemon=True
-    ).start()
+    # Serve the API with waitress; closed gracefully when the application quits
+    if flask_app is not None:
+        try:
+            api_server = ApiServer(flask_app, host=api_host, port=api_port).start()
+            app.aboutToQuit.connect(api_server.stop)
+        except Exception as e:
+            logger.error(f"Failed to start API server: {e}")
+    else:
+        logger.error("API server not started because the API module failed to load")
+    # Pick up approval jobs interrupted by the last shutdown
+    try:
+        from email_module.jobs import resume_unfinished_jobs
+        resume_unfinished_jobs()
+    except Exception as e:
+        logger.error(f"Failed to resume unfinished API jobs: {e}")
     # Start background processor for offline queued emails
     def _process_email_queue():
         try:
@@ -329,6 +324,112 @@ if __name__ == "__main__":
     # Start the email queue processor in a daemon thread
     email_thread = threading.Thread(target=_process_email_queue, daemon=True, name="EmailQueueProcessor")
     email_thread.start()
+
+    # Start background sender for coalesced notification digests
+    def _process_notification_digests():
+        try:
+            from email_module.notification_digest import get_digest_window, flush_due_digests
+            logger.info("Notification digest processor started")
+
+            while True:
+                window = get_digest_window()
+                try:
+                    if window > 0 and _is_online():
+                        sent = flush_due_digests(window_seconds=window)
+                        if sent:
+                            logger.info(f"Sent {sent} notification digest(s)")
+                except Exception as e:
+                    logger.error("Error in notification digest processor loop", exc_info=True)
+                # Check a few times per window so digests go out close to schedule
+                time.sleep(min(max(window // 4, 5), 60) if window > 0 else 60)
+
+        except Exception as e:
+            logger.critical("Notification digest processor crashed", exc_info=True)
+
+    digest_thread = threading.Thread(target=_process_notification_digests, daemon=True, name="NotificationDigestProcessor")
+    digest_thread.start()
+
+    # Start background pruning of old read notifications
+    def _prune_notifications():
+        try:
+            from utils.notifications import get_retention_settings, prune_notifications
+            logger.info("Notification retention job started")
+
+            while True:
+                try:
+                    retention_days, mode = get_retention_settings()
+                    if retention_days > 0:
+                        prune_notifications(retention_days, mode)
+                except Exception as e:
+                    logger.error("Error in notification retention job", exc_info=True)
+                time.sleep(6 * 60 * 60)  # Prune a few times a day
+
+        except Exception as e:
+            logger.critical("Notification retention job crashed", exc_info=True)
+
+    retention_thread = threading.Thread(target=_prune_notifications, daemon=True, name="NotificationRetention")
+    retention_thread.start()
+
+    # Start background archiving of reports approved long ago
+    def _archive_reports():
+        try:
+            from db.archive import get_archive_days, archive_reports
+            logger.info("Report archive job started")
+
+            while True:
+                try:
+                    archive_days = get_archive_days()
+                    if archive_days > 0:
+                        archive_reports(archive_days)
+                except Exception as e:
+                    logger.error("Error in report archive job", exc_info=True)
+                time.sleep(24 * 60 * 60)  # Archive once a day
+
+        except Exception as e:
+            logger.critical("Report archive job crashed", exc_info=True)
+
+    threading.Thread(target=_archive_reports, daemon=True, name="ReportArchive").start()
+
+    # Start scheduled online backups of the database
+    def _backup_database():
+        try:
+            from db.backup import run_scheduled_backup
+            logger.info("Database backup job started")
+
+            while True:
+                try:
+                    run_scheduled_backup()
+                except Exception as e:
+                    logger.error("Error in database backup job", exc_info=True)
+                time.sleep(60 * 60)  # Check hourly whether a backup is due
+
+        except Exception as e:
+            logger.critical("Database backup job crashed", exc_info=True)
+
+    threading.Thread(target=_backup_database, daemon=True, name="DatabaseBackup").start()
+
+    # Record PDFs generated before the artifact registry existed (runs once)
+    def _backfill_artifacts():
+        try:
+            from pdf.pdf_generator import PDFGenerator
+            recorded = PDFGenerator.backfill_artifacts()
+            if recorded:
+                logger.info(f"Recorded {recorded} existing PDF(s) in report_artifacts")
+        except Exception as e:
+            logger.error("Failed to record existing PDFs", exc_info=True)
+
+    threading.Thread(target=_backfill_artifacts, daemon=True, name="ArtifactBackfill").start()
+
+    # Refresh dashboards when another process (e.g. a standalone run_api.py) writes to the database
+    try:
+        from db.change_watcher import ChangeWatcher
+        change_watcher = ChangeWatcher().start()
+        app.aboutToQuit.connect(change_watcher.stop)
+    except Exception as e:
+        logger.error("Failed to start change watcher", exc_info=True)
+    # The workbook watcher starts when a report workbook is first opened
+    from utils.workbook_watcher import stop_workbook_watcher
+    app.aboutToQuit.connect(stop_workbook_watcher)
     try:
         logger.info("Creating main window...")
         main_window = MainWindow()
@@ -2,6 +2,8 @@ import sys
 import os
 from pathlib import Path
 import tempfile
+import hashlib
+import re
 from reportlab.lib.pagesizes import letter
 from reportlab.lib import colors
 from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer
@@ -15,13 +17,20 @@ parent_dir = str(Path(__file__).resolve().parent.parent)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from db.database import get_report, get_user_by_id
+from db.database import (get_report, get_users_by_ids, add_report_artifact, get_latest_artifact,
+                         get_artifact_by_path, get_setting, set_setting_if_missing)
+from utils.storage import get_store, remove_file
 from utils.excel_handler import ExcelHandler
 
 class PDFGenerator:
     @staticmethod
-    def generate_report_pdf(report_id, template_path, output_path):
-        """Generate a PDF report from a report ID and template"""
+    def generate_report_pdf(report_id, template_path, output_path, known_signers=None):
+        """
+        Generate a PDF report from a report ID and template
+
+        known_signers maps user IDs to users already at hand (e.g. the claims
+        of the approving admin's session); only other signers are looked up.
+        """
         try:
             # Get the report data from the database
             report = get_report(report_id)
@@ -61,9 +70,13 @@ class PDFGenerator:
             # Sort by timestamp ascending
             sorted_logs = sorted(latest_log_per_user.values(), key=lambda l: l['timestamp'])
             signatures = []
+            signers = dict(known_signers or {})
+            missing = [log['action_by'] for log in sorted_logs if log['action_by'] not in signers]
+            if missing:
+                signers.update(get_users_by_ids(missing))
             for log in sorted_logs:
                 # Include employee code for each signer
-                user_info = get_user_by_id(log['action_by'])
+                user_info = signers.get(log['action_by'])
                 emp_code = user_info.get('emp_code', '') if user_info else ''
                 # Convert UTC timestamp to local system time
                 raw_ts = log['timestamp']
@@ -110,9 +123,21 @@ class PDFGenerator:
             if not pdf_success:
                 return False, "Failed to convert Excel to PDF. Ensure LibreOffice is installed and 'soffice' is in your PATH."
 
-            # Append digital signatures to the PDF
+            # Append digital signatures to the PDF (a previous PDF at this path
+            # is a read-only link into the content store, so replace it)
+            if os.path.exists(output_path):
+                remove_file(output_path)
             append_signatures_to_pdf(temp_pdf, output_path, signatures)
 
+            # Keep the PDF in the content store (output_path becomes a hard link
+            # to the blob) and record it with the workbook it was built from
+            try:
+                PDFGenerator.store_pdf(report_id, output_path, report.get('version'))
+                if user_excel_path and os.path.exists(user_excel_path):
+                    PDFGenerator.record_artifact(report_id, 'excel', user_excel_path, report.get('version'))
+            except Exception as e:
+                print(f"Warning: Could not record report artifacts - {e}")
+
             # Clean up temp files
             try:
                 os.remove(temp_excel)
@@ -124,4 +149,81 @@ class PDFGenerator:
                 
         except Exception as e:
             print(f"Error generating PDF: {str(e)}")
-            return False, str(e) 
\ No newline at end of file
+            return False, str(e) 
+
+    @staticmethod
+    def record_artifact(report_id, kind, path, version=None, created_at=None):
+        """Hash a generated file and record it in report_artifacts"""
+        sha256 = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for chunk in iter(lambda: f.read(1024 * 1024), b''):
+                sha256.update(chunk)
+        return add_report_artifact(report_id, kind, path, os.path.getsize(path), sha256.hexdigest(), version, created_at)
+
+    @staticmethod
+    def store_pdf(report_id, path, version=None):
+        """
+        Move a generated PDF into the content store and record it.
+
+        path is replaced by a hard link to the stored blob (a copy where the
+        filesystem has no hard links), so existing paths keep working while
+        identical PDFs share storage. The blob of a PDF previously recorded at
+        the same path is released.
+
+        Returns:
+            str: Storage key of the PDF
+        """
+        store = get_store()
+        previous = get_artifact_by_path(path)
+        key = store.put(path)
+        store.export(key, path, link=True)
+        info = store.stat(key)
+        add_report_artifact(report_id, 'pdf', path, info['size'], info['sha256'], version)
+        # Drop the reference held by the PDF this one replaces (possibly the
+        # same blob, which put() has just referenced again)
+        if previous and previous['sha256']:
+            previous_key = previous['sha256'] + os.path.splitext(path)[1].lower()
+            if store.stat(previous_key):
+                store.release(previous_key)
+        return key
+
+    @staticmethod
+    def find_latest_pdf(report_id):
+        """Path of the most recently generated PDF of a report, or None"""
+        artifact = get_latest_artifact(report_id, 'pdf')
+        if artifact and os.path.exists(artifact['path']):
+            return artifact['path']
+        return None
+
+    @staticmethod
+    def backfill_artifacts(folders=None):
+        """
+        Record PDFs generated before report_artifacts existed.
+
+        Scans approved_reports/ and admin_all_reports/ once for files named
+        report_<id>_*.pdf; later runs return immediately.
+
+        Returns:
+            int: Number of PDFs recorded
+        """
+        if get_setting('report_artifacts_backfilled'):
+            return 0
+        if folders is None:
+            folders = [os.path.join(parent_dir, name) for name in ('approved_reports', 'admin_all_reports')]
+        pattern = re.compile(r'^report_(\d+)_.*\.pdf$')
+        recorded = 0
+        for folder in folders:
+            if not os.path.isdir(folder):
+                continue
+            for entry in os.scandir(folder):
+                match = pattern.match(entry.name)
+                if not match or not entry.is_file():
+                    continue
+                created_at = datetime.fromtimestamp(entry.stat().st_mtime, timezone.utc).strftime('%Y-%m-%d %H:%M:%S.000')
+                try:
+                    PDFGenerator.record_artifact(int(match.group(1)), 'pdf', entry.path, created_at=created_at)
+                    recorded += 1
+                except Exception as e:
+                    print(f"Warning: Could not record {entry.path} - {e}")
+        set_setting_if_missing('report_artifacts_backfilled', datetime.now(timezone.utc).isoformat())
+        return recorded
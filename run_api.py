@@ -3,24 +3,27 @@
 Entry point for production API server using waitress WSGI.
 Run: python run_api.py
 """
-import os
+import logging
+import sys
 from dotenv import load_dotenv
 # Load environment variables from .env
 load_dotenv()
-import sys
-import importlib.util
-from waitress import serve
 
-# Dynamically load local email_action_api to avoid stdlib 'email' collision
-email_api_path = os.path.join(os.path.dirname(__file__), "email", "email_action_api.py")
-spec = importlib.util.spec_from_file_location("email_action_api", email_api_path)
-email_api = importlib.util.module_from_spec(spec)
-sys.modules["email_action_api"] = email_api
-spec.loader.exec_module(email_api)
-app = email_api.app
+from email_module.api_server import ApiServer, load_api_app
+
+app = load_api_app()
 
 if __name__ == '__main__':
-    port = int(os.getenv('API_PORT', '5050'))
-    host = os.getenv('API_HOST', '0.0.0.0')
-    print(f"Serving API on {host}:{port} using waitress")
-    serve(app, host=host, port=port)
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if app is None:
+        sys.exit("Failed to load the API module")
+    from email_module.jobs import resume_unfinished_jobs
+    resume_unfinished_jobs()
+    server = ApiServer(app)
+    print(f"Serving API on {server.host}:{server.port} using waitress")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.stop()
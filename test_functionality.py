@@ -16,6 +16,7 @@ import sqlite3
 import unittest
 import tempfile
 import shutil
+import time
 from pathlib import Path
 from datetime import datetime, timedelta
 
@@ -150,6 +151,46 @@ class TestAuthentication(unittest.TestCase):
         user = self.auth.login("nonexistent_user", "password")
         self.assertIsNone(user, "Non-existent user should not be able to login")
         print("\n[PASS] User login tests passed")
+    
+    def test_login_throttle_and_rehash(self):
+        """Test rehashing on login and throttling repeated failures."""
+        from utils import auth as auth_module
+        from utils.auth import LoginThrottle, LoginThrottled
+        from db.database import get_user_by_username
+        os.environ['BCRYPT_ROUNDS'] = "5"
+        try:
+            self.auth.register_user("rehash_user", "Secret@1", "user", "rehash@example.com")
+            self.assertTrue(get_user_by_username("rehash_user")['password_hash'].startswith("$2b$05$"))
+            os.environ['BCRYPT_ROUNDS'] = "4"
+            self.assertIsNotNone(self.auth.login("rehash_user", "Secret@1"))
+            new_hash = get_user_by_username("rehash_user")['password_hash']
+            self.assertTrue(new_hash.startswith("$2b$04$"))
+            self.assertIsNotNone(self.auth.login("rehash_user", "Secret@1"))
+            self.assertEqual(get_user_by_username("rehash_user")['password_hash'], new_hash)
+        finally:
+            os.environ.pop('BCRYPT_ROUNDS', None)
+        
+        throttle = LoginThrottle(max_attempts=3, window=60)
+        original, auth_module.login_throttle = auth_module.login_throttle, throttle
+        try:
+            for _ in range(3):
+                self.assertIsNone(self.auth.login("Rehash_User", "wrong"))
+            # Even the right password is rejected, without hashing, until the window passes
+            with self.assertRaises(LoginThrottled) as raised:
+                self.auth.login("rehash_user", "Secret@1")
+            self.assertGreater(raised.exception.retry_after, 0)
+            self.assertEqual(throttle.retry_after("rehash_user", now=time.monotonic() + 61), 0)
+            throttle.reset("rehash_user")
+            self.assertIsNotNone(self.auth.login("rehash_user", "Secret@1"))
+        finally:
+            auth_module.login_throttle = original
+        
+        small = LoginThrottle(max_attempts=1, window=60, max_users=2)
+        for name in ("a", "b", "c"):
+            small.record_failure(name)
+        self.assertEqual(small.retry_after("a"), 0)
+        self.assertGreater(small.retry_after("c"), 0)
+        print("\n[PASS] Login throttle and rehash tests passed")
 
 
 class TestReportManagement(unittest.TestCase):
@@ -196,6 +237,43 @@ class TestReportManagement(unittest.TestCase):
         self.conn.commit()
         close_connection(self.conn)
     
+    def test_user_reports_by_ids(self):
+        """Test loading only some of a user's reports."""
+        from db.database import get_user_reports
+        other_id = add_user("test_other_owner", "x", "user", "other@example.com")
+        mine = [create_report(self.user_id, f"Test Report Mine {i}") for i in range(3)]
+        theirs = create_report(other_id, "Test Report Theirs")
+
+        loaded = get_user_reports(self.user_id, [mine[0], mine[2], theirs])
+        self.assertEqual(sorted(r['report_id'] for r in loaded), [mine[0], mine[2]])
+        self.assertEqual(get_user_reports(self.user_id, []), [])
+        self.assertEqual([r['report_id'] for r in get_user_reports(self.user_id)], mine[::-1])
+        print("\n[PASS] User report lookup tests passed")
+
+    def test_last_modified_migration(self):
+        """Test the one-time conversion of old last_modified_at values."""
+        from db.init_db import init_db
+        from datetime import timezone
+        local_id = create_report(self.user_id, "Test Report Local Time")
+        utc_id = create_report(self.user_id, "Test Report UTC Default")
+        local_value = datetime(2020, 1, 1, 10, 0, 0, 123456)
+        self.cursor.execute("UPDATE reports SET last_modified_at = ? WHERE report_id = ?",
+                            (str(local_value), local_id))
+        self.cursor.execute("UPDATE reports SET last_modified_at = '2020-01-01 10:00:00' WHERE report_id = ?",
+                            (utc_id,))
+        self.cursor.execute("DELETE FROM app_settings WHERE key = 'last_modified_utc_migrated'")
+        self.conn.commit()
+
+        init_db()
+        expected_local = local_value.astimezone(timezone.utc).strftime('%Y-%m-%d %H:%M:%S.%f')[:23]
+        self.assertEqual(get_report(local_id)['last_modified_at'], expected_local)
+        self.assertEqual(get_report(utc_id)['last_modified_at'], "2020-01-01 10:00:00.000")
+
+        # The migration runs once
+        init_db()
+        self.assertEqual(get_report(utc_id)['last_modified_at'], "2020-01-01 10:00:00.000")
+        print("\n[PASS] last_modified_at migration tests passed")
+
     def test_create_report(self):
         """Test report creation."""
         # Create a new report
@@ -234,6 +312,206 @@ class TestReportManagement(unittest.TestCase):
         report = get_report(report_id)
         self.assertEqual(report['status'], 'approved')
         print("\n[PASS] Report status update tests passed")
+    
+    def test_report_loader(self):
+        """Test loading report sections eagerly, lazily and in the get_report shape."""
+        from db.database import add_approval_log
+        from db.report_loader import load_report
+        report_id = create_report(user_id=self.user_id, title="Test Report Loader")
+        add_report_data(report_id, "test_field", "test_value")
+        add_approval_log(report_id, self.user_id, 'submit', "Submitted")
+        add_approval_log(report_id, self.user_id, 'approve_leader')
+        
+        self.assertIsNone(load_report(999999))
+        
+        eager = load_report(report_id, with_fields=True, with_logs=True)
+        self.assertEqual(eager.fields, {"test_field": "test_value"})
+        self.assertEqual([log.action for log in eager.approval_logs], ['submit', 'approve_leader'])
+        self.assertEqual(eager.approval_logs[0]['actor_name'], self.test_username)
+        self.assertEqual(eager.to_dict(), get_report(report_id))
+        
+        lazy = load_report(report_id)
+        self.assertEqual((lazy['title'], lazy.status, lazy.get('template_path')), ("Test Report Loader", 'draft', None))
+        self.assertIsNone(lazy._fields)
+        self.assertEqual(lazy.get('fields')['test_field'], "test_value")
+        self.assertEqual(len(lazy['approval_logs']), 2)
+        with self.assertRaises(AttributeError):
+            lazy.unknown_attribute = 1
+        print("\n[PASS] Report loader tests passed")
+
+    def test_report_artifacts(self):
+        """Test recording generated PDFs and finding the latest one."""
+        from db.database import get_latest_artifact, get_report_artifacts
+        from pdf.pdf_generator import PDFGenerator
+        report_id = create_report(user_id=self.user_id, title="Test Report Artifacts")
+        pdf_dir = os.path.join(self.test_dir, "approved_reports")
+        os.makedirs(pdf_dir, exist_ok=True)
+        old_pdf = os.path.join(pdf_dir, f"report_{report_id}_20240101_000000.pdf")
+        new_pdf = os.path.join(pdf_dir, f"report_{report_id}_final.pdf")
+        for path, content in ((old_pdf, b"%PDF-old"), (new_pdf, b"%PDF-new")):
+            with open(path, "wb") as f:
+                f.write(content)
+        os.utime(old_pdf, (0, 0))
+
+        self.assertIsNone(PDFGenerator.find_latest_pdf(report_id))
+        self.assertEqual(PDFGenerator.backfill_artifacts([pdf_dir]), 2)
+        self.assertEqual(PDFGenerator.backfill_artifacts([pdf_dir]), 0)
+        self.assertEqual(PDFGenerator.find_latest_pdf(report_id), os.path.abspath(new_pdf))
+
+        # Regenerating at the same path replaces the record
+        PDFGenerator.record_artifact(report_id, 'pdf', new_pdf, version=2)
+        artifacts = get_report_artifacts(report_id)
+        self.assertEqual(len(artifacts), 2)
+        latest = get_latest_artifact(report_id)
+        self.assertEqual((latest['version'], latest['size']), (2, len(b"%PDF-new")))
+        self.assertEqual(len(latest['sha256']), 64)
+
+        os.remove(new_pdf)
+        self.assertIsNone(PDFGenerator.find_latest_pdf(report_id))
+        print("\n[PASS] Report artifact registry tests passed")
+
+    def test_report_versions(self):
+        """Test that field changes are stored as version deltas and can be diffed."""
+        from db.database import (set_report_fields, add_approval_log, get_report_versions,
+                                 get_report_fields_at, diff_report_versions, get_changes_since_review)
+        report_id = create_report(user_id=self.user_id, title="Test Report Versions")
+        
+        # The first save is version 1; bookkeeping fields do not add versions
+        set_report_fields(report_id, {"shift": "Morning", "output": "100"})
+        add_report_data(report_id, "excel_file_path", "/tmp/report.xlsx")
+        self.assertEqual(get_report(report_id)['version'], 1)
+        
+        add_approval_log(report_id, self.user_id, 'send_back', "Fix the output")
+        set_report_fields(report_id, {"shift": "Morning", "output": "120"})
+        set_report_fields(report_id, {"shift": "Morning", "output": "120"})
+        set_report_fields(report_id, {"notes": "Recounted"}, removed=["shift"])
+        self.assertEqual(get_report(report_id)['version'], 3)
+        
+        versions = get_report_versions(report_id)
+        self.assertEqual([(v['version'], v['fields']) for v in versions],
+                         [(1, ['output', 'shift']), (2, ['output']), (3, ['notes', 'shift'])])
+        self.assertEqual(get_report_fields_at(report_id, 1), {"shift": "Morning", "output": "100"})
+        self.assertEqual(get_report_fields_at(report_id, 3), {"output": "120", "notes": "Recounted"})
+        self.assertEqual(diff_report_versions(report_id, 2), {
+            "notes": (None, "Recounted"), "shift": ("Morning", None)
+        })
+        self.assertEqual(get_changes_since_review(report_id), (1, {
+            "notes": (None, "Recounted"), "output": ("100", "120"), "shift": ("Morning", None)
+        }))
+        print("\n[PASS] Report version history tests passed")
+
+    def test_archive_reports(self):
+        """Test moving old approved reports to the archive database."""
+        from db.database import set_report_fields, add_approval_log, get_reports_page
+        from db.archive import archive_reports, get_archived_report, get_archived_field_versions
+        os.environ['ARCHIVE_DB_PATH'] = os.path.join(self.test_dir, "archive.db")
+        try:
+            old_id = create_report(user_id=self.user_id, title="Old Approved Report")
+            set_report_fields(old_id, {"output": "100"})
+            set_report_fields(old_id, {"output": "120"})
+            add_approval_log(old_id, self.user_id, 'approve_admin', "Approved")
+            update_report_status(old_id, 'approved_admin', self.user_id)
+            recent_id = create_report(user_id=self.user_id, title="Recent Approved Report")
+            update_report_status(recent_id, 'approved_admin', self.user_id)
+            draft_id = create_report(user_id=self.user_id, title="Old Draft Report")
+            self.cursor.execute('''
+            UPDATE reports SET last_modified_at = '2000-01-01 00:00:00.000' WHERE report_id IN (?, ?)
+            ''', (old_id, draft_id))
+            self.conn.commit()
+            
+            self.assertEqual(get_reports_page(user_id=self.user_id, include_archived=True)[1], 3)
+            self.assertEqual(archive_reports(30, chunk_size=1), 1)
+            self.assertEqual(archive_reports(30), 0)
+            
+            self.assertIsNone(get_report(old_id))
+            self.cursor.execute("SELECT COUNT(*) FROM report_tombstones WHERE report_id = ?", (old_id,))
+            self.assertEqual(self.cursor.fetchone()[0], 0)
+            archived = get_archived_report(old_id)
+            self.assertEqual((archived['title'], archived['fields']), ("Old Approved Report", {"output": "120"}))
+            self.assertEqual([log['action'] for log in archived['approval_logs']], ['approve_admin'])
+            self.assertEqual([row[:3] for row in get_archived_field_versions(old_id)],
+                             [[1, "output", "100"], [2, "output", "120"]])
+            
+            live, live_total = get_reports_page(user_id=self.user_id)
+            self.assertEqual((live_total, {r['report_id'] for r in live}), (2, {recent_id, draft_id}))
+            listed, total = get_reports_page(user_id=self.user_id, status='approved_admin', include_archived=True)
+            self.assertEqual(total, 2)
+            self.assertEqual({(r['report_id'], r['archived']) for r in listed}, {(old_id, 1), (recent_id, 0)})
+        finally:
+            os.environ.pop('ARCHIVE_DB_PATH', None)
+        print("\n[PASS] Report archive tests passed")
+
+    def test_backup_and_restore(self):
+        """Test online snapshots, rotation and restoring a snapshot."""
+        from db.backup import create_backup, list_backups, rotate_backups, check_integrity, restore_backup, backup_due
+        backup_dir = os.path.join(self.test_dir, "backups")
+        report_id = create_report(user_id=self.user_id, title="Backed Up Report")
+        add_report_data(report_id, "output", "100")
+        
+        self.assertTrue(backup_due(24, backup_dir))
+        snapshot = create_backup(backup_dir)[0]
+        self.assertEqual(check_integrity(snapshot), [])
+        self.assertFalse(backup_due(24, backup_dir))
+        
+        # Older snapshots beyond the kept count are removed
+        for stamp in ("20200101_000000", "20200102_000000"):
+            shutil.copy(snapshot, os.path.join(backup_dir, f"logbook_{stamp}.db"))
+        self.assertEqual(rotate_backups(2, backup_dir), 1)
+        self.assertEqual([os.path.basename(s['path']) for s in list_backups(backup_dir)][1:],
+                         ["logbook_20200102_000000.db"])
+        
+        # A copy restarted by every write finishes in one step after a few restarts
+        from unittest import mock
+        from db import backup
+        busy_copy = os.path.join(self.test_dir, "busy_copy.db")
+        writer = sqlite3.connect(get_db_path())
+        
+        def write_between_steps(pause):
+            writer.execute("UPDATE reports SET title = title WHERE report_id = ?", (report_id,))
+            writer.commit()
+        
+        try:
+            with mock.patch.object(backup.time, "sleep", write_between_steps), \
+                    self.assertLogs("db.backup", "WARNING"):
+                backup._copy_online(get_db_path(), busy_copy, pages=1, pause=0, max_restarts=2)
+        finally:
+            writer.close()
+        self.assertEqual(check_integrity(busy_copy), [])
+        with sqlite3.connect(busy_copy) as copy:
+            self.assertEqual(copy.execute("SELECT title FROM reports WHERE report_id = ?", (report_id,)).fetchone()[0],
+                             "Backed Up Report")
+        
+        # A corrupt snapshot is refused
+        corrupt = os.path.join(backup_dir, "logbook_20190101_000000.db")
+        with open(corrupt, "wb") as f:
+            f.write(b"not a database" * 100)
+        self.assertNotEqual(check_integrity(corrupt), [])
+        with self.assertRaises(sqlite3.DatabaseError):
+            restore_backup(corrupt)
+        
+        add_report_data(report_id, "output", "999")
+        pre_restore = restore_backup(snapshot)
+        self.assertEqual(get_report(report_id)['fields']['output'], "100")
+        self.assertTrue(os.path.exists(pre_restore))
+        
+        # The archive snapshot taken with a logbook snapshot is restored with it
+        archive_path = os.path.join(self.test_dir, "backup_archive.db")
+        os.environ['ARCHIVE_DB_PATH'] = archive_path
+        try:
+            with sqlite3.connect(archive_path) as archive:
+                archive.execute("CREATE TABLE reports (report_id INTEGER PRIMARY KEY)")
+            snapshots = create_backup(backup_dir)
+            self.assertEqual([os.path.basename(path).split('_20')[0] for path in snapshots],
+                             ["logbook", "logbook_archive"])
+            with sqlite3.connect(archive_path) as archive:
+                archive.execute("INSERT INTO reports (report_id) VALUES (?)", (report_id,))
+            restore_backup(snapshots[0])
+            with sqlite3.connect(archive_path) as archive:
+                self.assertEqual(archive.execute("SELECT COUNT(*) FROM reports").fetchone()[0], 0)
+            self.assertTrue(os.path.exists(os.path.join(backup_dir, "logbook_archive_pre_restore.db")))
+        finally:
+            os.environ.pop('ARCHIVE_DB_PATH', None)
+        print("\n[PASS] Database backup tests passed")
 
 
 class TestTemplateManagement(unittest.TestCase):
@@ -288,6 +566,1029 @@ class TestTemplateManagement(unittest.TestCase):
         print("\n[PASS] Template management tests passed")
 
 
+class TestNotificationDigest(unittest.TestCase):
+    """Test digest batching of review notifications."""
+    
+    class RecordingSender:
+        """Stand-in for EmailSender that records digests instead of sending."""
+        def __init__(self):
+            self.digests = []
+        
+        def send_admin_digest(self, admin_id, entries):
+            self.digests.append(('admin', admin_id, [e['report_id'] for e in entries]))
+            return True, "Email sent successfully"
+        
+        def send_unit_leader_digest(self, unit_leader_id, entries):
+            self.digests.append(('leader', unit_leader_id, [e['report_id'] for e in entries]))
+            return True, "Email sent successfully"
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+        
+        cls.user_id = add_user("test_digest_user", "x", "user", "user@example.com")
+        cls.leader_id = add_user("test_digest_leader", "x", "unit_leader", "leader@example.com")
+        cls.admin_id = add_user("test_digest_admin", "x", "admin", "admin2@example.com")
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_digest_coalesces_per_recipient(self):
+        """Test that queued notifications go out as one email per recipient."""
+        from db.database import add_digest_entry
+        from email_module.notification_digest import flush_due_digests, ADMIN_REVIEW, LEADER_REVIEW
+        report_ids = [create_report(self.user_id, f"Test Report Digest {i}") for i in range(3)]
+        for report_id in report_ids:
+            add_digest_entry(self.admin_id, ADMIN_REVIEW, report_id, "Test Report",
+                             author_id=self.user_id, reviewer_id=self.leader_id)
+        # The same report queued twice is only listed once
+        add_digest_entry(self.admin_id, ADMIN_REVIEW, report_ids[0], "Test Report",
+                         author_id=self.user_id, reviewer_id=self.leader_id)
+        add_digest_entry(self.leader_id, LEADER_REVIEW, report_ids[1], "Test Report", author_id=self.user_id)
+        
+        sender = self.RecordingSender()
+        # Nothing is due while the window is still open
+        self.assertEqual(flush_due_digests(sender, window_seconds=3600), 0)
+        
+        self.assertEqual(flush_due_digests(sender, window_seconds=0), 2)
+        self.assertIn(('admin', self.admin_id, sorted(report_ids)),
+                      [(k, r, sorted(ids)) for k, r, ids in sender.digests])
+        self.assertIn(('leader', self.leader_id, [report_ids[1]]), sender.digests)
+        
+        # Sent entries are not delivered again
+        self.assertEqual(flush_due_digests(sender, window_seconds=0), 0)
+        print("\n[PASS] Notification digest tests passed")
+
+
+class TestAttachmentPolicy(unittest.TestCase):
+    """Test attachment compression and download links."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+        
+        cls.small_path = os.path.join(cls.test_dir, "small.pdf")
+        cls.large_path = os.path.join(cls.test_dir, "large.pdf")
+        with open(cls.small_path, 'wb') as f:
+            f.write(b"%PDF-1.4 small" * 10)
+        with open(cls.large_path, 'wb') as f:
+            f.write(os.urandom(4096))
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_attachment_policy(self):
+        """Test bundling of small files and links for oversized ones."""
+        from db.database import get_shared_file
+        from email_module.attachments import AttachmentPolicy
+        
+        policy = AttachmentPolicy(compress=True, max_bytes=2048, link_ttl_hours=1)
+        parts, links = policy.prepare([self.small_path, self.small_path])
+        self.assertEqual(len(parts), 1)
+        self.assertEqual(parts[0].get_filename(), "small.zip")
+        self.assertEqual(links, [])
+        
+        # Random data does not compress, so the bundle is over the limit
+        parts, links = policy.prepare([self.small_path, self.large_path])
+        self.assertEqual([p.get_filename() for p in parts], ["small.zip"])
+        self.assertEqual([name for name, _ in links], ["large.pdf"])
+        
+        token = links[0][1].rsplit('/', 1)[-1]
+        shared = get_shared_file(token)
+        self.assertIsNotNone(shared)
+        self.assertEqual(shared['file_name'], "large.pdf")
+        self.assertIsNone(get_shared_file("unknown-token"))
+        print("\n[PASS] Attachment policy tests passed")
+
+    def test_attachment_cache_bounds(self):
+        """Test that cached payloads are bounded by size and shared across threads."""
+        import threading
+        from email_module.attachments import AttachmentPolicy
+
+        policy = AttachmentPolicy(compress=False, max_bytes=4096, link_ttl_hours=1, cache_bytes=0)
+        policy.prepare([self.small_path])
+        self.assertEqual(len(policy._payloads), 0)
+
+        policy = AttachmentPolicy(compress=True, max_bytes=2048, link_ttl_hours=1)
+        errors = []
+
+        def send():
+            try:
+                for _ in range(20):
+                    parts, _ = policy.prepare([self.small_path, self.small_path])
+                    self.assertEqual(len(parts), 1)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=send) for _ in range(6)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        self.assertEqual(len(policy._payloads), 1)
+        
+        # Links too old to be reused are dropped when a new one is made
+        policy = AttachmentPolicy(compress=False, max_bytes=1024, link_ttl_hours=1)
+        policy._links[("gone.pdf", "gone.pdf")] = ("old-token", time.monotonic() - 3600)
+        policy.prepare([self.large_path])
+        self.assertEqual(list(policy._links), [(policy._file_key(self.large_path), "large.pdf")])
+        print("\n[PASS] Attachment cache bound tests passed")
+
+
+class TestEmailTemplates(unittest.TestCase):
+    """Test the shared email template registry."""
+    
+    def test_render_email(self):
+        """Test that templates substitute values and reject unknown names."""
+        from email_module.email_templates import render_email, render_fragment
+        
+        subject, body = render_email('revision_request', recipient_name="alice", report_id=7,
+                                     report_title="Weekly Log", reviewer_name="bob", comments="Fix totals")
+        self.assertEqual(subject, "Report Requires Revision: Weekly Log")
+        self.assertIn("<p><strong>Comments:</strong> Fix totals</p>", body)
+        self.assertIn("LogBook System", body)
+        self.assertNotIn("$", body)
+        
+        row = render_fragment('unit_leader_digest_row', report_id=3, report_title="T", author_name="carol")
+        self.assertNotIn("<html>", row)
+        self.assertIn("<td>carol</td>", row)
+        
+        with self.assertRaises(KeyError):
+            render_email('final_pdf_admin', recipient_name="alice")
+        with self.assertRaises(ValueError):
+            render_email('no_such_template')
+        print("\n[PASS] Email template tests passed")
+
+
+class TestApprovalJobs(unittest.TestCase):
+    """Test background approval jobs and their status endpoint."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+        
+        from email_module.email_action_api import app
+        cls.client = app.test_client()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_job_status(self):
+        """Test that job state is recorded and exposed through the API."""
+        from db.database import add_api_job
+        from email_module.jobs import run_approval_job, FINALIZE_APPROVAL, FAILED
+        
+        job_id = add_api_job(FINALIZE_APPROVAL, 999999, 1)
+        response = self.client.get(f"/api/jobs/{job_id}")
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.get_json()['job']['status'], 'queued')
+        
+        run_approval_job(job_id, 999999, 1)
+        job = self.client.get(f"/api/jobs/{job_id}").get_json()['job']
+        self.assertEqual(job['status'], FAILED)
+        self.assertEqual(job['message'], "Report not found")
+        
+        self.assertEqual(self.client.get("/api/jobs/unknown").status_code, 404)
+        print("\n[PASS] Approval job tests passed")
+    
+    def test_claim_stale_jobs(self):
+        """Test that only jobs of stopped processes are taken over on startup."""
+        from db.database import add_api_job, claim_stale_api_jobs, PROCESS_ORIGIN
+        from email_module.jobs import FINALIZE_APPROVAL
+        
+        own = add_api_job(FINALIZE_APPROVAL, 999999, 1)
+        live = add_api_job(FINALIZE_APPROVAL, 999999, 1)
+        dead = add_api_job(FINALIZE_APPROVAL, 999999, 1)
+        conn, cursor = get_db_connection()
+        cursor.execute("UPDATE api_jobs SET owner = 'other-process' WHERE job_id = ?", (live,))
+        cursor.execute("UPDATE api_jobs SET owner = 'dead-process', status = 'running', "
+                       "heartbeat = datetime('now', '-1 hour') WHERE job_id = ?", (dead,))
+        conn.commit()
+        close_connection(conn)
+        
+        claimed = [job for job in claim_stale_api_jobs(120) if job['job_id'] in (own, live, dead)]
+        self.assertEqual([(job['job_id'], job['status'], job['owner']) for job in claimed],
+                         [(dead, 'queued', PROCESS_ORIGIN)])
+        # Claimed jobs are fresh again, so a second process starting now leaves them alone
+        self.assertEqual([job for job in claim_stale_api_jobs(120) if job['job_id'] == dead], [])
+        print("\n[PASS] Stale job claim tests passed")
+    
+    def test_signed_action_tokens(self):
+        """Test that action links need a valid token and replay repeated hits."""
+        from utils.signing import make_action_token, APPROVE, SEND_BACK
+        
+        # Legacy unsigned links are rejected by default
+        response = self.client.get("/api/report/approve?report_id=999999&admin_id=1")
+        self.assertEqual(response.status_code, 403)
+        
+        token = make_action_token(APPROVE, 999999, 1)
+        first = self.client.get(f"/api/report/approve?token={token}")
+        self.assertEqual(first.status_code, 404)
+        repeat = self.client.get(f"/api/report/approve?token={token}")
+        self.assertEqual(repeat.status_code, 404)
+        self.assertEqual(repeat.get_json(), first.get_json())
+        
+        # Tampered, mismatched and expired tokens are refused
+        self.assertEqual(self.client.get(f"/api/report/approve?token={token[:-2]}xx").status_code, 403)
+        self.assertEqual(self.client.get(f"/api/report/send_back?token={token}").status_code, 403)
+        expired = make_action_token(SEND_BACK, 999999, 1, ttl_seconds=-1)
+        self.assertEqual(self.client.get(f"/api/report/send_back?token={expired}").status_code, 403)
+        for bogus in ("abc.%C3%A9", "%C3%A9.x"):
+            self.assertEqual(self.client.get(f"/api/report/approve?token={bogus}").status_code, 403)
+
+        # A claim left 'processing' by a dead request is released after a while
+        from db.database import claim_action_token
+        self.assertTrue(claim_action_token("stale-nonce", APPROVE, 999999, 1))
+        self.assertFalse(claim_action_token("stale-nonce", APPROVE, 999999, 1))
+        conn, cursor = get_db_connection()
+        cursor.execute("UPDATE action_token_uses SET used_at = datetime('now', '-1 hour') WHERE nonce = 'stale-nonce'")
+        conn.commit()
+        close_connection(conn)
+        self.assertTrue(claim_action_token("stale-nonce", APPROVE, 999999, 1))
+        
+        # The links of one email share a nonce: a scanner fetching approve and
+        # then send-back gets the approval replayed instead of undoing it
+        from utils.signing import make_action_urls
+        author_id = add_user("test_links_author", "x", "user", "links@example.com")
+        admin_id = add_user("test_links_admin", "x", "admin", "linksadmin@example.com")
+        report_id = create_report(author_id, "Test Report Links")
+        update_report_status(report_id, 'approved_leader', author_id)
+        approve_url, send_back_url = make_action_urls("", report_id, admin_id)
+        approved = self.client.get(approve_url)
+        self.assertEqual(approved.status_code, 202)
+        replayed = self.client.get(send_back_url)
+        self.assertEqual((replayed.status_code, replayed.get_json()), (202, approved.get_json()))
+        self.assertEqual(get_report(report_id)['status'], 'approved_admin')
+        # Links from another email find the report no longer awaiting review
+        _, other_send_back_url = make_action_urls("", report_id, admin_id)
+        self.assertEqual(self.client.get(other_send_back_url).status_code, 409)
+        self.assertEqual(get_report(report_id)['status'], 'approved_admin')
+        print("\n[PASS] Signed action token tests passed")
+    
+    def test_api_server(self):
+        """Test that the waitress server serves the API and shuts down cleanly."""
+        import urllib.request
+        import urllib.error
+        from email_module.api_server import ApiServer
+        from email_module.email_action_api import app
+        
+        server = ApiServer(app, host="127.0.0.1", port=0, threads=2).start()
+        try:
+            with self.assertRaises(urllib.error.HTTPError) as ctx:
+                urllib.request.urlopen(f"http://127.0.0.1:{server.bound_port}/api/jobs/unknown", timeout=5)
+            self.assertEqual(ctx.exception.code, 404)
+        finally:
+            server.stop()
+        self.assertFalse(server._thread.is_alive())
+        print("\n[PASS] API server tests passed")
+    
+    def test_read_only_api(self):
+        """Test paginated listings, API key checks and conditional GETs."""
+        user_id = add_user("test_api_reader", "x", "user", "reader@example.com")
+        for i in range(3):
+            create_report(user_id, f"Test Report API {i}")
+        
+        os.environ.pop('READ_API_KEY', None)
+        self.assertEqual(self.client.get("/api/reports").status_code, 403)
+        os.environ['READ_API_KEY'] = "test-key"
+        try:
+            self.assertEqual(self.client.get("/api/reports", headers={'X-API-Key': "wrong"}).status_code, 401)
+            headers = {'X-API-Key': "test-key"}
+            
+            response = self.client.get(f"/api/reports?user_id={user_id}&per_page=2", headers=headers)
+            self.assertEqual(response.status_code, 200)
+            data = response.get_json()
+            self.assertEqual(len(data['reports']), 2)
+            self.assertEqual((data['total'], data['pages']), (3, 2))
+            
+            etag = response.headers['ETag']
+            cached = self.client.get(f"/api/reports?user_id={user_id}&per_page=2",
+                                     headers={**headers, 'If-None-Match': etag})
+            self.assertEqual(cached.status_code, 304)
+            
+            create_report(user_id, "Test Report API 3")
+            changed = self.client.get(f"/api/reports?user_id={user_id}&per_page=2",
+                                      headers={**headers, 'If-None-Match': etag})
+            self.assertEqual(changed.status_code, 200)
+            
+            self.assertEqual(self.client.get("/api/queue", headers=headers).status_code, 200)
+            self.assertEqual(self.client.get("/api/reports/999999", headers=headers).status_code, 404)
+            
+            synced = self.client.get(f"/api/reports/changes?user_id={user_id}&limit=3", headers=headers).get_json()
+            self.assertEqual((len(synced['reports']), synced['has_more']), (3, True))
+            rest = self.client.get(f"/api/reports/changes?user_id={user_id}&since={synced['next_since']}",
+                                   headers=headers).get_json()
+            self.assertEqual([r['title'] for r in rest['reports']], ["Test Report API 3"])
+            self.assertEqual(self.client.get("/api/reports/changes?since=bogus", headers=headers).status_code, 400)
+        finally:
+            os.environ.pop('READ_API_KEY', None)
+        print("\n[PASS] Read-only API tests passed")
+    
+    def test_bulk_review(self):
+        """Test bulk status changes in one transaction and the bulk API endpoint."""
+        from db.database import bulk_review_reports, get_user_by_username
+        user_id = add_user("test_bulk_author", "x", "user", "bulk@example.com")
+        admin_id = get_user_by_username("admin")['id']
+        report_ids = [create_report(user_id, f"Test Report Bulk {i}") for i in range(3)]
+        for report_id in report_ids[:2]:
+            update_report_status(report_id, 'approved_leader', user_id)
+        
+        results = bulk_review_reports(report_ids, 'approved_leader', 'needs_revision', admin_id, 'send_back', "Fix")
+        self.assertEqual(results, {report_ids[0]: True, report_ids[1]: True, report_ids[2]: False})
+        self.assertEqual(get_report(report_ids[0])['status'], 'needs_revision')
+        self.assertEqual(get_report(report_ids[0])['approval_logs'][-1]['action'], 'send_back')
+        self.assertEqual(get_report(report_ids[2])['approval_logs'], [])
+        
+        update_report_status(report_ids[0], 'approved_leader', user_id)
+        os.environ['ADMIN_API_KEY'] = "admin-key"
+        try:
+            body = {'admin_id': admin_id, 'action': 'send_back', 'report_ids': report_ids[:2], 'comments': "Redo"}
+            self.assertEqual(self.client.post("/api/reports/bulk_review", json=body).status_code, 401)
+            response = self.client.post("/api/reports/bulk_review", json=body, headers={'X-API-Key': "admin-key"})
+            self.assertEqual(response.status_code, 202)
+            results = response.get_json()['results']
+            self.assertTrue(results[str(report_ids[0])]['success'])
+            self.assertFalse(results[str(report_ids[1])]['success'])
+            
+            body['admin_id'] = user_id
+            response = self.client.post("/api/reports/bulk_review", json=body, headers={'X-API-Key': "admin-key"})
+            self.assertEqual(response.status_code, 403)
+            
+            # An admin demoted by another process is refused even while cached
+            from db.database import get_user_by_id
+            other_admin = add_user("test_bulk_other_admin", "x", "admin", "bulkadmin@example.com")
+            self.assertEqual(get_user_by_id(other_admin)['role'], 'admin')
+            conn, cursor = get_db_connection()
+            cursor.execute("UPDATE users SET role = 'user' WHERE id = ?", (other_admin,))
+            conn.commit()
+            close_connection(conn)
+            body['admin_id'] = other_admin
+            response = self.client.post("/api/reports/bulk_review", json=body, headers={'X-API-Key': "admin-key"})
+            self.assertEqual(response.status_code, 403)
+        finally:
+            os.environ.pop('ADMIN_API_KEY', None)
+        print("\n[PASS] Bulk review tests passed")
+
+    def test_session_tokens(self):
+        """Test signing in through the API and authorizing with session tokens."""
+        from db.database import update_user
+        from utils.session import issue_session_token, verify_session_token, revoke_session_token
+        os.environ['BCRYPT_ROUNDS'] = "4"
+        try:
+            Auth.register_user("test_session_admin", "Secret@1", "admin", "sadmin@example.com",
+                               emp_code="E-77", designation="Director")
+        finally:
+            os.environ.pop('BCRYPT_ROUNDS', None)
+        author_id = add_user("test_session_author", "x", "user", "sauthor@example.com")
+
+        body = {'username': "test_session_admin", 'password': "wrong"}
+        self.assertEqual(self.client.post("/api/session", json=body).status_code, 401)
+        body['password'] = "Secret@1"
+        response = self.client.post("/api/session", json=body)
+        self.assertEqual(response.status_code, 201)
+        data = response.get_json()
+        self.assertEqual((data['user']['role'], data['user']['emp_code']), ('admin', "E-77"))
+        headers = {'X-Session-Token': data['token']}
+
+        # The session authorizes bulk review without ADMIN_API_KEY or an admin_id
+        report_id = create_report(author_id, "Test Report Session")
+        update_report_status(report_id, 'approved_leader', author_id)
+        review = {'action': 'send_back', 'report_ids': [report_id], 'comments': "Redo"}
+        response = self.client.post("/api/reports/bulk_review", json=review, headers=headers)
+        self.assertEqual(response.status_code, 202)
+        self.assertTrue(response.get_json()['results'][str(report_id)]['success'])
+        self.assertEqual(get_report(report_id)['approval_logs'][-1]['action_by'], data['user']['id'])
+
+        # Unsigned action links are accepted with an admin session, which names the admin
+        self.assertEqual(self.client.get("/api/report/approve?report_id=999999&admin_id=1").status_code, 403)
+        self.assertEqual(self.client.get("/api/report/approve?report_id=999999&admin_id=1",
+                                         headers=headers).status_code, 404)
+
+        user_headers = {'X-Session-Token': issue_session_token({'id': author_id, 'role': 'user'})}
+        self.assertEqual(self.client.post("/api/reports/bulk_review", json=review, headers=user_headers).status_code, 403)
+        tampered = {'X-Session-Token': data['token'][:-2] + "xx"}
+        self.assertEqual(self.client.post("/api/reports/bulk_review", json=review, headers=tampered).status_code, 401)
+        expired = issue_session_token(data['user'], ttl_seconds=-1)
+        self.assertEqual(verify_session_token(expired), (None, "Session has expired"))
+
+        # Changing the user revokes their sessions; signing out revokes one
+        self.assertEqual(self.client.delete("/api/session", headers=user_headers).status_code, 200)
+        self.assertEqual(self.client.post("/api/reports/bulk_review", json=review, headers=user_headers).status_code, 401)
+        update_user(data['user']['id'], designation="Chief")
+        self.assertEqual(verify_session_token(data['token']), (None, "Session has been revoked"))
+        fresh = issue_session_token(dict(data['user'], designation="Chief"))
+        self.assertEqual(verify_session_token(fresh)[0]['designation'], "Chief")
+        self.assertTrue(revoke_session_token(fresh))
+        self.assertFalse(revoke_session_token(fresh))
+        
+        # Non-ASCII tokens are malformed, not a server error
+        self.assertEqual(verify_session_token("abc.\u00e9"), (None, "Invalid session token"))
+        self.assertEqual(verify_session_token("\u00e9.abc"), (None, "Malformed session token"))
+        non_ascii = {'X-Session-Token': "\u00e9.\u00e9"}
+        self.assertEqual(self.client.post("/api/reports/bulk_review", json=review, headers=non_ascii).status_code, 401)
+        
+        # Revocations written by another process apply once cached claims are rechecked
+        from db.database import get_db_path
+        from utils.session import session_store
+        signed_out = issue_session_token(dict(data['user'], designation="Chief"))
+        demoted = issue_session_token({'id': author_id, 'role': 'admin'})
+        self.assertIsNone(verify_session_token(signed_out)[1])
+        self.assertIsNone(verify_session_token(demoted)[1])
+        other = sqlite3.connect(get_db_path())
+        other.execute("INSERT INTO revoked_sessions (sid, expires_at) VALUES (?, ?)",
+                      (verify_session_token(signed_out)[0]['sid'], int(time.time()) + 60))
+        other.execute("INSERT OR REPLACE INTO session_user_cutoffs (user_id, revoked_at) VALUES (?, ?)",
+                      (author_id, int(time.time() * 1000) + 1))
+        other.commit()
+        other.close()
+        self.assertIsNone(verify_session_token(signed_out)[1])
+        session_store.RECHECK_SECONDS = 0
+        try:
+            self.assertEqual(verify_session_token(signed_out), (None, "Session has been revoked"))
+            self.assertEqual(verify_session_token(demoted), (None, "Session has been revoked"))
+        finally:
+            del session_store.RECHECK_SECONDS
+        print("\n[PASS] Session token tests passed")
+
+
+class TestNotifications(unittest.TestCase):
+    """Test in-app notifications and the unread count cache."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+        
+        cls.user_id = add_user("test_notified_user", "x", "user", "notified@example.com")
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_unread_count_feed(self):
+        """Test that subscribers see unread counts change as notifications arrive and are read."""
+        from utils.notifications import (
+            notification_service, send_report_notification, get_user_notifications, mark_notification_as_read
+        )
+        notification_service.invalidate()
+        events = []
+        unsubscribe = notification_service.subscribe(events.append)
+        try:
+            self.assertEqual(notification_service.unread_count(self.user_id), 0)
+            self.assertTrue(send_report_notification(self.user_id, "Test Subject", "Test message"))
+            self.assertTrue(send_report_notification(self.user_id, "Test Subject 2", "Test message"))
+            self.assertEqual(notification_service.unread_count(self.user_id), 2)
+            
+            notification_id = get_user_notifications(self.user_id)[0]['id']
+            mark_notification_as_read(notification_id)
+            # Marking the same notification twice does not change the count again
+            mark_notification_as_read(notification_id)
+            self.assertEqual(notification_service.unread_count(self.user_id), 1)
+            self.assertEqual([(e['type'], e['unread_count']) for e in events],
+                             [('added', 1), ('added', 2), ('read', 1)])
+        finally:
+            unsubscribe()
+        print("\n[PASS] Notification tests passed")
+    
+    def test_bulk_read_and_retention(self):
+        """Test bulk mark-as-read and chunked pruning of old read notifications."""
+        from utils.notifications import (
+            notification_service, send_report_notification, get_user_notifications,
+            mark_notifications_as_read, prune_notifications
+        )
+        user_id = add_user("test_retention_user", "x", "user", "retention@example.com")
+        for i in range(5):
+            send_report_notification(user_id, f"Test Subject {i}", "Test message")
+        ids = sorted(n['id'] for n in get_user_notifications(user_id))
+        
+        self.assertEqual(mark_notifications_as_read(user_id, ids[:2]), 2)
+        self.assertEqual(mark_notifications_as_read(user_id, []), 0)
+        self.assertEqual(notification_service.unread_count(user_id), 3)
+        self.assertEqual(mark_notifications_as_read(user_id), 3)
+        self.assertEqual(notification_service.unread_count(user_id), 0)
+        
+        conn, cursor = get_db_connection()
+        cursor.execute("UPDATE notifications SET created_at = datetime('now', '-100 days') WHERE id IN (?, ?, ?)",
+                       ids[:3])
+        conn.commit()
+        close_connection(conn)
+        
+        self.assertEqual(prune_notifications(90, 'archive', chunk_size=2, pause=0), 3)
+        self.assertEqual(len(get_user_notifications(user_id, include_read=True)), 2)
+        conn, cursor = get_db_connection()
+        cursor.execute("SELECT COUNT(*) FROM notifications_archive WHERE user_id = ?", (user_id,))
+        self.assertEqual(cursor.fetchone()[0], 3)
+        close_connection(conn)
+        self.assertEqual(prune_notifications(90, 'delete'), 0)
+        print("\n[PASS] Notification retention tests passed")
+
+
+class TestChangeEvents(unittest.TestCase):
+    """Test database change events used by the dashboards."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_write_helpers_publish_events(self):
+        """Test that report, user and template writes publish change events."""
+        from utils.events import event_bus, REPORT_EVENTS
+        from db.database import bulk_review_reports, get_report_summaries, count_reports_by_status
+        events = []
+        unsubscribe = event_bus.subscribe(events.append)
+        report_events = []
+        unsubscribe_reports = event_bus.subscribe(report_events.append, REPORT_EVENTS)
+        try:
+            user_id = add_user("test_event_user", "x", "user", "events@example.com")
+            report_id = create_report(user_id, "Event Report")
+            add_report_data(report_id, "field", "value")
+            update_report_status(report_id, 'approved_leader', user_id)
+            # Updating a report that does not exist publishes nothing
+            update_report_status(999999, 'approved_leader', user_id)
+            bulk_review_reports([report_id], 'approved_leader', 'approved_admin', user_id, 'approve_admin')
+            template_id = add_template("Event Template", "/tmp/event_template.xlsx", user_id)
+            update_user(user_id, email="events2@example.com")
+        finally:
+            unsubscribe()
+            unsubscribe_reports()
+        
+        self.assertEqual([e['type'] for e in events], [
+            'user_added', 'report_created', 'report_updated', 'report_status_changed',
+            'report_status_changed', 'template_added', 'user_updated'
+        ])
+        self.assertEqual(events[1]['user_id'], user_id)
+        self.assertEqual(events[4]['status'], 'approved_admin')
+        self.assertEqual(events[5]['template_id'], template_id)
+        self.assertEqual(len(report_events), 4)
+        self.assertTrue(all(e['report_id'] == report_id for e in report_events))
+        
+        summaries = get_report_summaries([report_id, 999999])
+        self.assertEqual(list(summaries), [report_id])
+        self.assertEqual(summaries[report_id]['creator_name'], "test_event_user")
+        self.assertEqual(count_reports_by_status().get('approved_admin'), 1)
+        print("\n[PASS] Change event tests passed")
+    
+    def test_change_watcher(self):
+        """Test that writes from other processes are published once and local writes are not repeated."""
+        from utils.events import event_bus
+        from db.change_watcher import ChangeWatcher
+        user_id = add_user("test_watcher_user", "x", "user", "watcher@example.com")
+        report_id = create_report(user_id, "Watched Report")
+        
+        watcher = ChangeWatcher(interval=0.1)
+        events = []
+        unsubscribe = event_bus.subscribe(events.append)
+        try:
+            self.assertEqual(watcher.poll(), 0)  # Connects and records the starting point
+            self.assertEqual(watcher.poll(), 0)  # Nothing changed
+            
+            # A write made in this process is already published by the helper
+            update_report_status(report_id, 'submitted', user_id)
+            self.assertEqual(watcher.poll(), 0)
+            # ...however many change_log rows it produces
+            from db.database import set_report_fields
+            add_report_data(report_id, "watched_field", "1")
+            add_report_data(report_id, "watched_field", "2")
+            set_report_fields(report_id, {'a': "1", 'b': "2"}, removed=['watched_field'])
+            self.assertEqual(watcher.poll(), 0)
+            
+            # A write made by another process (simulated with a raw connection)
+            conn = sqlite3.connect(get_db_path())
+            conn.execute("UPDATE reports SET status = 'approved_leader' WHERE report_id = ?", (report_id,))
+            conn.execute("DELETE FROM users WHERE id = ?", (user_id,))
+            conn.commit()
+            conn.close()
+            self.assertEqual(watcher.poll(), 2)
+            self.assertEqual(watcher.poll(), 0)
+        finally:
+            unsubscribe()
+            watcher.stop()
+        
+        external = [e for e in events if e.get('external')]
+        self.assertEqual([(e['type'], e.get('report_id'), e.get('user_id')) for e in external],
+                         [('report_updated', report_id, None), ('user_deleted', None, user_id)])
+        print("\n[PASS] Change watcher tests passed")
+    
+    def test_delta_sync(self):
+        """Test fetching only reports changed or deleted since a watermark."""
+        from db.database import get_reports_changed_since
+        user_id = add_user("test_delta_user", "x", "user", "delta@example.com")
+        first = create_report(user_id, "Delta Report 1")
+        second = create_report(user_id, "Delta Report 2")
+        
+        full = get_reports_changed_since(user_id=user_id)
+        self.assertEqual([r['report_id'] for r in full['reports']], [first, second])
+        watermark = full['watermark']
+        self.assertEqual(get_reports_changed_since(watermark, user_id=user_id)['reports'], [])
+        
+        # Field edits and status changes move a report past the watermark
+        add_report_data(first, "field", "value")
+        update_report_status(second, 'submitted', user_id)
+        changes = get_reports_changed_since(watermark, user_id=user_id, limit=1)
+        self.assertEqual(([r['report_id'] for r in changes['reports']], changes['has_more']), ([first], True))
+        changes = get_reports_changed_since(changes['watermark'], user_id=user_id)
+        self.assertEqual([r['report_id'] for r in changes['reports']], [second])
+        self.assertEqual(changes['reports'][0]['status'], 'submitted')
+        watermark = changes['watermark']
+        
+        conn, cursor = get_db_connection()
+        cursor.execute("DELETE FROM reports WHERE report_id = ?", (first,))
+        conn.commit()
+        close_connection(conn)
+        changes = get_reports_changed_since(watermark, user_id=user_id)
+        self.assertEqual((changes['reports'], changes['deleted']), ([], [first]))
+        self.assertEqual(get_reports_changed_since(changes['watermark'], user_id=user_id)['deleted'], [])
+        print("\n[PASS] Delta sync tests passed")
+
+
+class TestUserCache(unittest.TestCase):
+    """Test cached user lookups."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        
+        from db.init_db import init_db
+        init_db()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_cached_lookups(self):
+        """Test that lookups are cached, invalidated on writes and fetched in bulk."""
+        from db.database import get_user_by_id, get_users_by_ids, user_cache
+        user_id = add_user("test_cached_user", "x", "user", "cached@example.com")
+        other_id = add_user("test_cached_other", "x", "user", "other@example.com")
+        user_cache.invalidate()
+        
+        self.assertEqual(get_user_by_id(user_id)['email'], "cached@example.com")
+        # A write that bypasses the helpers is not seen until the entry expires
+        conn, cursor = get_db_connection()
+        cursor.execute("UPDATE users SET email = 'raw@example.com' WHERE id = ?", (user_id,))
+        conn.commit()
+        close_connection(conn)
+        self.assertEqual(get_user_by_id(str(user_id))['email'], "cached@example.com")
+        # Callers get copies, so mutating a result does not change the cache
+        get_user_by_id(user_id)['email'] = "mutated@example.com"
+        self.assertEqual(get_user_by_id(user_id)['email'], "cached@example.com")
+        
+        update_user(user_id, designation="Engineer")
+        self.assertEqual(get_user_by_id(user_id)['email'], "raw@example.com")
+        
+        users = get_users_by_ids([user_id, other_id, 999999, None])
+        self.assertEqual(sorted(users), sorted([user_id, other_id]))
+        self.assertEqual(users[other_id]['username'], "test_cached_other")
+        
+        delete_user(other_id)
+        self.assertIsNone(get_user_by_id(other_id))
+        self.assertEqual(list(get_users_by_ids([other_id])), [])
+        print("\n[PASS] User cache tests passed")
+
+
+class TestContentStore(unittest.TestCase):
+    """Test the sharded content-addressed store."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        os.environ['STORAGE_DIR'] = os.path.join(cls.test_dir, 'storage')
+        
+        from db.init_db import init_db
+        init_db()
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        os.environ.pop('STORAGE_DIR', None)
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_concurrent_put_and_release(self):
+        """Test that stores sharing a root never delete a blob that is still referenced."""
+        import threading
+        from utils.storage import ContentStore
+        errors = []
+
+        def churn():
+            # Separate store objects share nothing but the database, like two processes
+            store = ContentStore(os.environ['STORAGE_DIR'])
+            try:
+                for _ in range(15):
+                    key = store.put(b"shared pdf bytes", ext=".pdf")
+                    self.assertTrue(os.path.exists(store.path(key)))
+                    store.release(key)
+            except Exception as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=churn) for _ in range(4)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(errors, [])
+        store = ContentStore(os.environ['STORAGE_DIR'])
+        key = store.put(b"shared pdf bytes", ext=".pdf")
+        self.assertEqual(store.stat(key)['refcount'], 1)
+        self.assertEqual(store.release(key), 0)
+        self.assertFalse(os.path.exists(store.path(key)))
+        print("\n[PASS] Concurrent content store tests passed")
+
+    def test_put_deduplicates_and_releases(self):
+        """Test that identical content is stored once and deleted with its last reference."""
+        from utils.storage import get_store
+        store = get_store()
+        source = os.path.join(self.test_dir, "template.xlsx")
+        with open(source, "wb") as f:
+            f.write(b"workbook bytes")
+        
+        key = store.put(source)
+        self.assertEqual(store.put(b"workbook bytes", ext=".XLSX"), key)
+        self.assertTrue(key.endswith(".xlsx"))
+        info = store.stat(key)
+        self.assertEqual((info['size'], info['refcount']), (len(b"workbook bytes"), 2))
+        self.assertEqual(info['path'], os.path.join(store.root, key[:2], key[2:4], key))
+        self.assertEqual(store.key_for_path(info['path']), key)
+        self.assertIsNone(store.key_for_path(source))
+        with store.open(key) as f:
+            self.assertEqual(f.read(), b"workbook bytes")
+        
+        # Exports are private, writable copies unless linked
+        copy_path = store.export(key, os.path.join(self.test_dir, "copy.xlsx"))
+        with open(copy_path, "ab") as f:
+            f.write(b" edited")
+        with store.open(key) as f:
+            self.assertEqual(f.read(), b"workbook bytes")
+        
+        self.assertEqual(store.release(key), 1)
+        self.assertTrue(os.path.exists(info['path']))
+        self.assertEqual(store.release(key), 0)
+        self.assertFalse(os.path.exists(info['path']))
+        self.assertIsNone(store.stat(key))
+        print("\n[PASS] Content store tests passed")
+    
+    def test_stored_templates_and_pdfs(self):
+        """Test that templates share blobs and regenerated PDFs release the old one."""
+        from utils.storage import get_store
+        from pdf.pdf_generator import PDFGenerator
+        from db.database import get_latest_artifact
+        store = get_store()
+        admin_id = add_user("test_store_admin", "x", "admin", "store@example.com")
+        key = store.put(b"template", ext=".xlsx")
+        store.put(b"template", ext=".xlsx")
+        first = add_template("a.xlsx", store.path(key), admin_id)
+        second = add_template("b.xlsx", store.path(key), admin_id)
+        delete_template(first)
+        self.assertEqual(store.stat(key)['refcount'], 1)
+        delete_template(second)
+        self.assertIsNone(store.stat(key))
+        
+        report_id = create_report(admin_id, "Stored PDF")
+        pdf_path = os.path.join(self.test_dir, f"report_{report_id}_final.pdf")
+        with open(pdf_path, "wb") as f:
+            f.write(b"%PDF-1")
+        first_key = PDFGenerator.store_pdf(report_id, pdf_path)
+        self.assertEqual(get_latest_artifact(report_id)['sha256'], first_key[:64])
+        with open(pdf_path, "rb") as f:
+            self.assertEqual(f.read(), b"%PDF-1")
+        
+        from utils.storage import remove_file
+        remove_file(pdf_path)
+        with open(pdf_path, "wb") as f:
+            f.write(b"%PDF-2")
+        second_key = PDFGenerator.store_pdf(report_id, pdf_path)
+        self.assertIsNone(store.stat(first_key))
+        self.assertEqual(store.stat(second_key)['refcount'], 1)
+        print("\n[PASS] Stored template and PDF tests passed")
+    
+    def test_copy_on_write_workbooks(self):
+        """Test that report workbooks share the template until opened for editing."""
+        from utils.storage import get_store, clone_file
+        from utils import report_workbooks
+        from utils.report_workbooks import (reference_template, materialize_workbook,
+                                            release_unmodified_workbook)
+        store = get_store()
+        report_workbooks.USER_REPORTS_ROOT = os.path.join(self.test_dir, "user_reports")
+        user_id = add_user("test_cow_user", "x", "user", "cow@example.com")
+        template_path = os.path.join(self.test_dir, "shift_log.xlsx")
+        with open(template_path, "wb") as f:
+            f.write(b"template workbook")
+        
+        first = create_report(user_id, "COW Report 1")
+        second = create_report(user_id, "COW Report 2")
+        shared = reference_template(first, template_path)
+        self.assertEqual(reference_template(second, template_path), shared)
+        template_key = store.key_for_path(shared)
+        self.assertEqual(store.stat(template_key)['refcount'], 2)
+        self.assertEqual(get_report(first)['fields']['excel_file_path'], shared)
+        
+        private = materialize_workbook(first, user_id, f"report_{first}_shift_log.xlsx")
+        self.assertNotEqual(private, shared)
+        self.assertEqual(materialize_workbook(first, user_id), private)
+        # The report keeps its reference to the template it was copied from
+        self.assertEqual(store.stat(template_key)['refcount'], 2)
+        self.assertTrue(os.access(private, os.W_OK))
+        
+        # Unchanged but still open in an editor: kept until it is closed
+        for lock_name in (f"~$port_{first}_shift_log.xlsx", f".~lock.report_{first}_shift_log.xlsx#"):
+            lock_path = os.path.join(os.path.dirname(private), lock_name)
+            open(lock_path, "w").close()
+            self.assertIsNone(release_unmodified_workbook(first))
+            self.assertTrue(os.path.exists(private))
+            os.remove(lock_path)
+        
+        # Opened but unchanged: back to sharing the template
+        self.assertEqual(release_unmodified_workbook(first), shared)
+        self.assertFalse(os.path.exists(private))
+        self.assertEqual(store.stat(template_key)['refcount'], 2)
+        
+        # Edited: the private copy is kept and the template is untouched
+        private = materialize_workbook(first, user_id)
+        with open(private, "ab") as f:
+            f.write(b" with data")
+        self.assertIsNone(release_unmodified_workbook(first))
+        with store.open(template_key) as f:
+            self.assertEqual(f.read(), b"template workbook")
+        
+        # Archiving a report with a private copy drops its template reference;
+        # a report still sharing the template keeps it, as its path is the blob
+        from db.archive import _release_templates
+        _release_templates({first: get_report(first)['fields'], second: get_report(second)['fields']})
+        self.assertEqual(store.stat(template_key)['refcount'], 1)
+        
+        clone_path = os.path.join(self.test_dir, "clone.xlsx")
+        clone_file(private, clone_path)
+        with open(clone_path, "rb") as f:
+            self.assertEqual(f.read(), b"template workbook with data")
+        print("\n[PASS] Copy-on-write workbook tests passed")
+
+
+class TestWorkbookExtractor(unittest.TestCase):
+    """Test extracting user-edited workbooks into report_data."""
+    
+    @classmethod
+    def setUpClass(cls):
+        """Set up test environment."""
+        cls.test_dir = tempfile.mkdtemp()
+        os.environ['LOCALAPPDATA'] = cls.test_dir
+        os.environ['STORAGE_DIR'] = os.path.join(cls.test_dir, 'storage')
+        
+        from db.init_db import init_db
+        from utils import report_workbooks
+        init_db()
+        report_workbooks.USER_REPORTS_ROOT = os.path.join(cls.test_dir, 'user_reports')
+        
+        import openpyxl
+        cls.template_path = os.path.join(cls.test_dir, "extract_template.xlsx")
+        workbook = openpyxl.Workbook()
+        sheet = workbook.active
+        sheet["A1"] = "Shift"
+        sheet["B1"] = "{{shift_name}}"
+        sheet["A2"] = "Output"
+        sheet["B2"] = "{{ output_quantity }}"
+        sheet["B3"] = "{{notes}}"
+        workbook.save(cls.template_path)
+    
+    @classmethod
+    def tearDownClass(cls):
+        """Clean up test environment."""
+        os.environ.pop('STORAGE_DIR', None)
+        shutil.rmtree(cls.test_dir, ignore_errors=True)
+    
+    def test_extract_report_fields(self):
+        """Test that typed values are upserted and cleared cells removed."""
+        import openpyxl
+        from utils.storage import get_store
+        from utils.report_workbooks import reference_template, materialize_workbook
+        from utils.workbook_extractor import (get_placeholder_map, extract_report_fields,
+                                              queue_extraction, wait_for_extractions)
+        # Uploaded templates are held in the store by their template row
+        template_path = get_store().path(get_store().put(self.template_path))
+        self.assertEqual(get_placeholder_map(template_path), {
+            'shift_name': ('Sheet', 'B1'), 'output_quantity': ('Sheet', 'B2'), 'notes': ('Sheet', 'B3')
+        })
+        user_id = add_user("test_extract_user", "x", "user", "extract@example.com")
+        report_id = create_report(user_id, "Extract Report")
+        reference_template(report_id, template_path)
+        # Nothing to extract while the report shares the template
+        self.assertEqual(extract_report_fields(report_id), [])
+        
+        workbook_path = materialize_workbook(report_id, user_id)
+        workbook = openpyxl.load_workbook(workbook_path)
+        workbook.active["B1"] = "Night"
+        workbook.active["B2"] = 120.0
+        workbook.save(workbook_path)
+        self.assertEqual(sorted(extract_report_fields(report_id)), ['output_quantity', 'shift_name'])
+        fields = get_report(report_id)['fields']
+        self.assertEqual((fields['shift_name'], fields['output_quantity']), ("Night", "120"))
+        self.assertNotIn('notes', fields)
+        self.assertEqual(extract_report_fields(report_id), [])
+        
+        workbook = openpyxl.load_workbook(workbook_path)
+        workbook.active["B1"] = None
+        workbook.active["B3"] = "Line 2 stopped"
+        workbook.save(workbook_path)
+        queue_extraction(report_id)
+        queue_extraction(report_id)
+        wait_for_extractions()
+        fields = get_report(report_id)['fields']
+        self.assertNotIn('shift_name', fields)
+        self.assertEqual(fields['notes'], "Line 2 stopped")
+        
+        # Without a recorded template the cell map is unknown: nothing is
+        # extracted and no field is removed
+        legacy_id = create_report(user_id, "Legacy Report")
+        legacy_path = os.path.join(self.test_dir, "legacy.xlsx")
+        shutil.copy(workbook_path, legacy_path)
+        add_report_data(legacy_id, "excel_file_path", legacy_path)
+        add_report_data(legacy_id, "shift_name", "Day")
+        self.assertEqual(extract_report_fields(legacy_id), [])
+        self.assertEqual(get_report(legacy_id)['fields']['shift_name'], "Day")
+        self.assertEqual(fields['excel_file_path'], workbook_path)
+        print("\n[PASS] Workbook extraction tests passed")
+    
+    def test_workbook_watcher(self):
+        """Test that saves of watched workbooks are debounced, versioned and extracted."""
+        import openpyxl
+        import time
+        from utils.storage import get_store
+        from utils.report_workbooks import reference_template, materialize_workbook
+        from utils.workbook_extractor import wait_for_extractions
+        from utils.workbook_watcher import WorkbookWatcher
+        from db.database import get_latest_artifact
+        template_path = get_store().path(get_store().put(self.template_path))
+        user_id = add_user("test_watch_user", "x", "user", "watch@example.com")
+        
+        for use_inotify in (True, False):
+            report_id = create_report(user_id, f"Watched Report {use_inotify}")
+            reference_template(report_id, template_path)
+            workbook_path = materialize_workbook(report_id, user_id)
+            watcher = WorkbookWatcher(debounce=0.2, interval=0.05, use_inotify=use_inotify).start()
+            try:
+                watcher.watch(report_id, workbook_path)
+                for shift in ("Morning", "Evening"):
+                    workbook = openpyxl.load_workbook(workbook_path)
+                    workbook.active["B1"] = shift
+                    # Rewriting in place and saving twice is recorded once
+                    workbook.save(workbook_path)
+                    workbook.save(workbook_path)
+                    deadline = time.monotonic() + 5
+                    while time.monotonic() < deadline:
+                        wait_for_extractions()
+                        if get_report(report_id)['fields'].get('shift_name') == shift:
+                            break
+                        time.sleep(0.05)
+                    self.assertEqual(get_report(report_id)['fields'].get('shift_name'), shift)
+                self.assertEqual(get_latest_artifact(report_id, 'excel')['version'], 2)
+                
+                watcher.unwatch(report_id)
+                self.assertEqual(watcher.watched(), {})
+            finally:
+                watcher.stop()
+        print("\n[PASS] Workbook watcher tests passed")
+
+
 def run_tests():
     """Run all tests and print summary."""
     print("\n" + "="*60)
@@ -300,6 +1601,15 @@ def run_tests():
         unittest.TestLoader().loadTestsFromTestCase(TestAuthentication),
         unittest.TestLoader().loadTestsFromTestCase(TestReportManagement),
         unittest.TestLoader().loadTestsFromTestCase(TestTemplateManagement),
+        unittest.TestLoader().loadTestsFromTestCase(TestNotificationDigest),
+        unittest.TestLoader().loadTestsFromTestCase(TestAttachmentPolicy),
+        unittest.TestLoader().loadTestsFromTestCase(TestEmailTemplates),
+        unittest.TestLoader().loadTestsFromTestCase(TestApprovalJobs),
+        unittest.TestLoader().loadTestsFromTestCase(TestNotifications),
+        unittest.TestLoader().loadTestsFromTestCase(TestChangeEvents),
+        unittest.TestLoader().loadTestsFromTestCase(TestUserCache),
+        unittest.TestLoader().loadTestsFromTestCase(TestContentStore),
+        unittest.TestLoader().loadTestsFromTestCase(TestWorkbookExtractor),
     ]
     
     test_runner = unittest.TextTestRunner(verbosity=2)
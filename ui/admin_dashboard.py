@@ -8,8 +8,8 @@ from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
                            QScrollArea, QGroupBox, QTextEdit, QDialog,
                            QFileDialog, QGridLayout, QListWidget, QListWidgetItem,
                            QStackedWidget, QButtonGroup, QRadioButton, QProgressBar,
-                           QCheckBox)
-from PyQt5.QtCore import Qt, QSize, QUrl
+                           QCheckBox, QInputDialog)
+from PyQt5.QtCore import Qt, QSize, QUrl, QTimer
 from PyQt5.QtGui import QIcon, QColor, QPixmap
 from PyQt5.QtGui import QDesktopServices
 import openpyxl
@@ -24,16 +24,22 @@ if parent_dir not in sys.path:
 
 from db.database import (
     get_user_name, get_reports_by_status, get_all_reports, 
-    update_report_status, get_report, add_approval_log, get_user_by_id, add_template, 
+    update_report_status, get_report, add_approval_log, add_template, 
     get_active_template, get_all_users, delete_user, update_user,
     get_all_templates, delete_template, is_template_active,
-    get_leader_approval
+    get_leader_approval, get_report_summaries, count_reports_by_status, get_users_by_ids
 )
 from utils.excel_handler import ExcelHandler
 from utils.auth import Auth
 from utils.notifications import send_report_notification
 from email_sender import EmailSender
+from email_module.jobs import bulk_approve_reports, bulk_send_back_reports, get_jobs, SUCCEEDED, FAILED
+from db.report_loader import load_report
 from pdf.pdf_generator import PDFGenerator
+from utils.storage import get_store
+from ui.event_bridge import ChangeBatcher, find_report_row
+from ui.report_changes import create_changes_group
+from utils.events import REPORT_EVENTS, USER_EVENTS, TEMPLATE_EVENTS
 
 class UserManagementDialog(QDialog):
     """Dialog for adding/editing users"""
@@ -128,7 +134,7 @@ class UserManagementDialog(QDialog):
 
 class TemplatePreviewDialog(QDialog):
     """Dialog to preview Excel template structure"""
-    def __init__(self, template_path, parent=None):
+    def __init__(self, template_path, parent=None, template_name=None):
         super().__init__(parent)
         self.template_path = template_path
         self.setWindowTitle("Template Preview")
@@ -137,7 +143,7 @@ class TemplatePreviewDialog(QDialog):
         layout = QVBoxLayout(self)
         
         # Add template info
-        info_label = QLabel(f"Template: {os.path.basename(template_path)}")
+        info_label = QLabel(f"Template: {template_name or os.path.basename(template_path)}")
         layout.addWidget(info_label)
         
         # Create tabs for sheet preview
@@ -311,6 +317,11 @@ class ReportDetailDialog(QDialog):
         
         layout.addWidget(form_group)
         
+        # Show what a revised report changed since it was sent back
+        changes_group = create_changes_group(self.report.get('report_id'))
+        if changes_group:
+            layout.addWidget(changes_group)
+        
         # Add Excel file section if available
         if 'fields' in self.report and 'excel_file_path' in self.report['fields']:
             excel_path = self.report['fields']['excel_file_path']
@@ -522,6 +533,9 @@ class ReportDetailDialog(QDialog):
             self.parent().send_back_report(self.report['id'])
 
 class AdminDashboard(QWidget):
+    # Change batches touching more reports than this rebuild the report tables
+    MAX_PATCHED_REPORTS = 50
+    
     def __init__(self, user):
         super().__init__()
         self.user = user
@@ -530,6 +544,8 @@ class AdminDashboard(QWidget):
         self.active_template = None
         self.init_ui()
         self.refresh_data()
+        # Database changes (including those made by the approval API) patch the tables
+        self.change_batcher = ChangeBatcher(self, self.apply_changes)
         
     def init_ui(self):
         """Initialize the UI"""
@@ -844,13 +860,38 @@ class AdminDashboard(QWidget):
         )
         self.approvals_table.horizontalHeader().setSectionResizeMode(1, QHeaderView.Stretch)
         self.approvals_table.setSelectionBehavior(QTableWidget.SelectRows)
+        self.approvals_table.setSelectionMode(QTableWidget.ExtendedSelection)
         self.approvals_table.setEditTriggers(QTableWidget.NoEditTriggers)
         layout.addWidget(self.approvals_table)
         
-        # Add refresh button
+        # Bulk actions progress (PDFs are generated in the background)
+        self.bulk_progress = QProgressBar()
+        self.bulk_progress.setVisible(False)
+        layout.addWidget(self.bulk_progress)
+        self.bulk_status_label = QLabel("")
+        layout.addWidget(self.bulk_status_label)
+        self.bulk_jobs = {}
+        self.bulk_poll_timer = QTimer(self)
+        self.bulk_poll_timer.setInterval(2000)
+        self.bulk_poll_timer.timeout.connect(self.poll_bulk_jobs)
+        
+        # Add bulk action and refresh buttons
+        button_layout = QHBoxLayout()
+        self.bulk_approve_btn = QPushButton("Approve Selected")
+        self.bulk_approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+        self.bulk_approve_btn.clicked.connect(self.bulk_approve_selected)
+        button_layout.addWidget(self.bulk_approve_btn)
+        
+        self.bulk_send_back_btn = QPushButton("Send Back Selected")
+        self.bulk_send_back_btn.setStyleSheet("background-color: #e74c3c; color: white;")
+        self.bulk_send_back_btn.clicked.connect(self.bulk_send_back_selected)
+        button_layout.addWidget(self.bulk_send_back_btn)
+        button_layout.addStretch()
+        
         refresh_btn = QPushButton("Refresh")
         refresh_btn.clicked.connect(self.refresh_data)
-        layout.addWidget(refresh_btn, alignment=Qt.AlignRight)
+        button_layout.addWidget(refresh_btn)
+        layout.addLayout(button_layout)
     
     def setup_reports_tab(self):
         """Set up the all reports tab"""
@@ -921,73 +962,73 @@ class AdminDashboard(QWidget):
             # Add to both tables
             self.pending_reports_table.insertRow(row)
             self.approvals_table.insertRow(row)
+            self._fill_pending_row(row, report)
+    
+    def _fill_pending_row(self, row, report):
+        """Populate one row of both pending approvals tables"""
+        # ID
+        id_item = QTableWidgetItem(str(report['report_id']))
+        self.pending_reports_table.setItem(row, 0, id_item)
+        self.approvals_table.setItem(row, 0, QTableWidgetItem(str(report['report_id'])))
+        
+        # Title
+        title_item = QTableWidgetItem(report['title'])
+        self.pending_reports_table.setItem(row, 1, title_item)
+        self.approvals_table.setItem(row, 1, QTableWidgetItem(report['title']))
+        
+        # Created by
+        creator_item = QTableWidgetItem(report['creator_name'])
+        self.pending_reports_table.setItem(row, 2, creator_item)
+        self.approvals_table.setItem(row, 2, QTableWidgetItem(report['creator_name']))
+        
+        # Get approval info for the unit leader
+        unit_leader_name = "Unknown"
+        submitted_date = report['created_at']
+        
+        # Only the unit leader's approval log is needed, not the full report
+        leader_approval = get_leader_approval(report['report_id'])
+        if leader_approval:
+            unit_leader_name = leader_approval['actor_name']
+            submitted_date = leader_approval['timestamp']
+        
+        # Unit Leader
+        self.pending_reports_table.setItem(row, 3, QTableWidgetItem(unit_leader_name))
+        
+        # Submitted on (for approvals tab)
+        self.approvals_table.setItem(row, 3, QTableWidgetItem(str(report['created_at'])))
+        
+        # Approved by Unit Leader date (for approvals tab)
+        self.approvals_table.setItem(row, 4, QTableWidgetItem(str(submitted_date)))
+        
+        # Actions
+        for table_idx, table in enumerate([self.pending_reports_table, self.approvals_table]):
+            actions_cell = QWidget()
+            actions_layout = QHBoxLayout(actions_cell)
+            actions_layout.setContentsMargins(2, 2, 2, 2)
             
-            # ID
-            id_item = QTableWidgetItem(str(report['report_id']))
-            self.pending_reports_table.setItem(row, 0, id_item)
-            self.approvals_table.setItem(row, 0, QTableWidgetItem(str(report['report_id'])))
-            
-            # Title
-            title_item = QTableWidgetItem(report['title'])
-            self.pending_reports_table.setItem(row, 1, title_item)
-            self.approvals_table.setItem(row, 1, QTableWidgetItem(report['title']))
-            
-            # Created by
-            creator_item = QTableWidgetItem(report['creator_name'])
-            self.pending_reports_table.setItem(row, 2, creator_item)
-            self.approvals_table.setItem(row, 2, QTableWidgetItem(report['creator_name']))
-            
-            # Get approval info for the unit leader
-            unit_leader_name = "Unknown"
-            submitted_date = report['created_at']
-            
-            # Get the full report to see approval logs
-            full_report = get_report(report['report_id'])
-            if full_report and 'approval_logs' in full_report:
-                for log in full_report['approval_logs']:
-                    if log['action'] == 'approve_leader':
-                        unit_leader_name = log['actor_name']
-                        submitted_date = log['timestamp']
-                        break
-            
-            # Unit Leader
-            self.pending_reports_table.setItem(row, 3, QTableWidgetItem(unit_leader_name))
+            # View button
+            view_btn = QPushButton("View")
+            view_btn.setStyleSheet("background-color: #3498db; color: white;")
+            view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
+            actions_layout.addWidget(view_btn)
             
-            # Submitted on (for approvals tab)
-            self.approvals_table.setItem(row, 3, QTableWidgetItem(str(report['created_at'])))
+            # Approve button
+            approve_btn = QPushButton("Approve")
+            approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+            approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
+            actions_layout.addWidget(approve_btn)
             
-            # Approved by Unit Leader date (for approvals tab)
-            self.approvals_table.setItem(row, 4, QTableWidgetItem(str(submitted_date)))
+            # Send Back button
+            reject_btn = QPushButton("Send Back")
+            reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
+            reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
+            actions_layout.addWidget(reject_btn)
             
-            # Actions
-            for table_idx, table in enumerate([self.pending_reports_table, self.approvals_table]):
-                actions_cell = QWidget()
-                actions_layout = QHBoxLayout(actions_cell)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                
-                # View button
-                view_btn = QPushButton("View")
-                view_btn.setStyleSheet("background-color: #3498db; color: white;")
-                view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
-                actions_layout.addWidget(view_btn)
-                
-                # Approve button
-                approve_btn = QPushButton("Approve")
-                approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
-                approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
-                actions_layout.addWidget(approve_btn)
-                
-                # Send Back button
-                reject_btn = QPushButton("Send Back")
-                reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
-                reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
-                actions_layout.addWidget(reject_btn)
-                
-                if table_idx == 0:  # Dashboard table
-                    table.setCellWidget(row, 4, actions_cell)
-                else:  # Detailed table
-                    table.setCellWidget(row, 5, actions_cell)
-    
+            if table_idx == 0:  # Dashboard table
+                table.setCellWidget(row, 4, actions_cell)
+            else:  # Detailed table
+                table.setCellWidget(row, 5, actions_cell)
+
     def refresh_users_table(self):
         """Refresh the users table"""
         users = get_all_users()
@@ -1082,96 +1123,143 @@ class AdminDashboard(QWidget):
                 continue
             
             self.all_reports_table.insertRow(row)
-            
-            # ID
-            id_item = QTableWidgetItem(str(report['report_id']))
-            self.all_reports_table.setItem(row, 0, id_item)
-            
-            # Title
-            title_item = QTableWidgetItem(report['title'])
-            self.all_reports_table.setItem(row, 1, title_item)
-            
-            # Created by
-            creator_item = QTableWidgetItem(report['creator_name'])
-            self.all_reports_table.setItem(row, 2, creator_item)
-            
-            # Submitted on
-            created_item = QTableWidgetItem(report['created_at'])
-            self.all_reports_table.setItem(row, 3, created_item)
-            
-            # Status with color coding
-            status_text = self.get_status_display_text(report['status'])
-            status_item = QTableWidgetItem(status_text)
-            status_item.setForeground(self.get_status_color(report['status']))
-            self.all_reports_table.setItem(row, 4, status_item)
-            
-            # Actions
-            actions_cell = QWidget()
-            actions_layout = QHBoxLayout(actions_cell)
-            actions_layout.setContentsMargins(2, 2, 2, 2)
-            
-            # View button
-            view_btn = QPushButton("View")
-            view_btn.setStyleSheet("background-color: #3498db; color: white;")
-            view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
-            actions_layout.addWidget(view_btn)
-            
-            # View PDF button
-            pdf_btn = QPushButton("View PDF")
-            pdf_btn.setStyleSheet("background-color: #8e44ad; color: white;")
-            def open_pdf(report_id=report['report_id']):
-                import os
-                from PyQt5.QtWidgets import QMessageBox
-                from PyQt5.QtGui import QDesktopServices
-                from PyQt5.QtCore import QUrl
-                # Try both approved_reports and admin_all_reports
-                pdf_filename = f"report_{report_id}_"
-                found_pdf = None
-                for folder in ["approved_reports", "admin_all_reports"]:
-                    dir_path = os.path.join(os.path.dirname(os.path.dirname(__file__)), folder)
-                    if os.path.isdir(dir_path):
-                        for fname in os.listdir(dir_path):
-                            if fname.startswith(pdf_filename) and fname.endswith(".pdf"):
-                                found_pdf = os.path.join(dir_path, fname)
-                                break
-                    if found_pdf:
-                        break
-                if found_pdf and os.path.exists(found_pdf):
-                    QDesktopServices.openUrl(QUrl.fromLocalFile(found_pdf))
-                else:
-                    QMessageBox.warning(self, "PDF Not Found", "No generated PDF found for this report.")
-            pdf_btn.clicked.connect(lambda checked, r=report['report_id']: open_pdf(r))
-            actions_layout.addWidget(pdf_btn)
+            self._fill_all_reports_row(row, report)
+            row += 1
+    
+    def _fill_all_reports_row(self, row, report):
+        """Populate one row of the all reports table"""
+        # ID
+        id_item = QTableWidgetItem(str(report['report_id']))
+        self.all_reports_table.setItem(row, 0, id_item)
+        
+        # Title
+        title_item = QTableWidgetItem(report['title'])
+        self.all_reports_table.setItem(row, 1, title_item)
+        
+        # Created by
+        creator_item = QTableWidgetItem(report['creator_name'])
+        self.all_reports_table.setItem(row, 2, creator_item)
+        
+        # Submitted on
+        created_item = QTableWidgetItem(report['created_at'])
+        self.all_reports_table.setItem(row, 3, created_item)
+        
+        # Status with color coding
+        status_text = self.get_status_display_text(report['status'])
+        status_item = QTableWidgetItem(status_text)
+        status_item.setForeground(self.get_status_color(report['status']))
+        self.all_reports_table.setItem(row, 4, status_item)
+        
+        # Actions
+        actions_cell = QWidget()
+        actions_layout = QHBoxLayout(actions_cell)
+        actions_layout.setContentsMargins(2, 2, 2, 2)
+        
+        # View button
+        view_btn = QPushButton("View")
+        view_btn.setStyleSheet("background-color: #3498db; color: white;")
+        view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
+        actions_layout.addWidget(view_btn)
+        
+        # View PDF button
+        pdf_btn = QPushButton("View PDF")
+        pdf_btn.setStyleSheet("background-color: #8e44ad; color: white;")
+        def open_pdf(report_id=report['report_id']):
+            from PyQt5.QtWidgets import QMessageBox
+            from PyQt5.QtGui import QDesktopServices
+            from PyQt5.QtCore import QUrl
+            # Latest PDF recorded in report_artifacts
+            found_pdf = PDFGenerator.find_latest_pdf(report_id)
+            if found_pdf:
+                QDesktopServices.openUrl(QUrl.fromLocalFile(found_pdf))
+            else:
+                QMessageBox.warning(self, "PDF Not Found", "No generated PDF found for this report.")
+        pdf_btn.clicked.connect(lambda checked, r=report['report_id']: open_pdf(r))
+        actions_layout.addWidget(pdf_btn)
 
-            # Add approve/reject buttons only for reports approved by unit leader
-            if report['status'] == 'approved_leader':
-                # Approve button
-                approve_btn = QPushButton("Approve")
-                approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
-                approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
-                actions_layout.addWidget(approve_btn)
-                
-                # Send Back button
-                reject_btn = QPushButton("Send Back")
-                reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
-                reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
-                actions_layout.addWidget(reject_btn)
-            
-            self.all_reports_table.setCellWidget(row, 5, actions_cell)
+        # Add approve/reject buttons only for reports approved by unit leader
+        if report['status'] == 'approved_leader':
+            # Approve button
+            approve_btn = QPushButton("Approve")
+            approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+            approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
+            actions_layout.addWidget(approve_btn)
             
-            row += 1
+            # Send Back button
+            reject_btn = QPushButton("Send Back")
+            reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
+            reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
+            actions_layout.addWidget(reject_btn)
+        
+        self.all_reports_table.setCellWidget(row, 5, actions_cell)
+    
+    def apply_changes(self, events):
+        """Patch the views affected by a batch of database change events"""
+        report_ids = {event['report_id'] for event in events if event['type'] in REPORT_EVENTS}
+        if report_ids:
+            self.patch_reports(report_ids)
+        if any(event['type'] in USER_EVENTS for event in events):
+            self.refresh_users_table()
+        if any(event['type'] in TEMPLATE_EVENTS for event in events):
+            self.refresh_templates_table()
+        self.refresh_dashboard_stats()
+    
+    def patch_reports(self, report_ids):
+        """Update, insert or remove the table rows of the given reports"""
+        if len(report_ids) > self.MAX_PATCHED_REPORTS:
+            # Rebuilding is cheaper than many row lookups
+            self.refresh_pending_tables()
+            self.refresh_all_reports_table()
+            return
+        reports = get_report_summaries(report_ids)
+        for report_id in report_ids:
+            report = reports.get(report_id)
+            self._patch_pending_row(report_id, report)
+            self._patch_all_reports_row(report_id, report)
+    
+    def _patch_pending_row(self, report_id, report):
+        row = find_report_row(self.approvals_table, report_id)
+        if report and report['status'] == 'approved_leader':
+            if row < 0:
+                row = 0
+                self.pending_reports_table.insertRow(row)
+                self.approvals_table.insertRow(row)
+            self._fill_pending_row(row, report)
+        elif row >= 0:
+            self.pending_reports_table.removeRow(row)
+            self.approvals_table.removeRow(row)
+    
+    def _patch_all_reports_row(self, report_id, report):
+        row = find_report_row(self.all_reports_table, report_id)
+        if report and self._report_matches_filter(report):
+            if row < 0:
+                row = 0
+                self.all_reports_table.insertRow(row)
+            self._fill_all_reports_row(row, report)
+        elif row >= 0:
+            self.all_reports_table.removeRow(row)
+    
+    def _report_matches_filter(self, report):
+        """Check a report against the all reports table's status and search filters"""
+        status_filter = self.status_filter.currentData()
+        if status_filter == 'all':
+            if report['status'] not in ('submitted', 'approved_leader', 'approved_admin', 'needs_revision'):
+                return False
+        elif report['status'] != status_filter:
+            return False
+        search_text = self.search_input.text().lower()
+        return not search_text or search_text in report['title'].lower()
     
     def refresh_dashboard_stats(self):
         """Refresh the dashboard statistics"""
         # Get counts for different statuses
-        pending_reports = get_reports_by_status('approved_leader')
-        approved_reports = get_reports_by_status('approved_admin')
+        counts = count_reports_by_status()
         users = get_all_users()
         
         # Update labels
-        self.pending_count_label.setText(f"Pending Approvals: {len(pending_reports)}")
+        self.pending_count_label.setText(f"Pending Approvals: {counts.get('approved_leader', 0)}")
         self.users_count_label.setText(f"Users: {len(users)}")
-        self.approved_count_label.setText(f"Approved Reports: {len(approved_reports)}")
+        self.approved_count_label.setText(f"Approved Reports: {counts.get('approved_admin', 0)}")
     
     def add_user(self):
         """Add a new user"""
@@ -1195,7 +1283,6 @@ class AdminDashboard(QWidget):
                     user_data.get('designation', '')
                 ):
                     QMessageBox.information(self, "Success", "User created successfully.")
-                    self.refresh_users_table()
                 else:
                     QMessageBox.warning(self, "Error", "Failed to create user. Username might already exist.")
         except Exception as e:
@@ -1231,9 +1318,6 @@ class AdminDashboard(QWidget):
                     QMessageBox.information(self, "Success", "User updated successfully.")
                 else:
                     QMessageBox.warning(self, "Error", "Failed to update user.")
-                
-                # Refresh the table
-                self.refresh_users_table()
         except Exception as e:
             import logging
             logging.error(f"Error in edit_user: {e}")
@@ -1265,9 +1349,6 @@ class AdminDashboard(QWidget):
                 QMessageBox.information(self, "Success", f"User {user['username']} has been deleted.")
             else:
                 QMessageBox.warning(self, "Error", "Failed to delete user.")
-            
-            # Refresh the table
-            self.refresh_users_table()
     
     def upload_template(self):
         """Upload a new Excel template"""
@@ -1286,46 +1367,38 @@ class AdminDashboard(QWidget):
         # Get template name from file name
         template_name = os.path.basename(file_path)
         
-        # Save the file to templates directory
-        templates_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'templates')
-        os.makedirs(templates_dir, exist_ok=True)
-        
-        # Copy file to templates directory with a new unique name
-        import shutil
-        import time
-        
-        new_file_name = f"template_{int(time.time())}_{template_name}"
-        new_file_path = os.path.join(templates_dir, new_file_name)
-        
+        # Save the file to the content store (identical uploads share one blob)
+        store = get_store()
         try:
-            shutil.copy2(file_path, new_file_path)
+            template_key = store.put(file_path)
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to copy template file: {str(e)}")
             return
+        new_file_path = store.path(template_key)
         
         # Add template to database
         template_id = add_template(template_name, new_file_path, self.user['id'])
         
         if template_id:
             QMessageBox.information(self, "Success", "Template uploaded successfully.")
-            self.refresh_data()
             
             # Show preview of the template
             from utils.create_sample_template import create_sample_template
             if not os.path.exists(new_file_path):
                 create_sample_template()
             
-            self.preview_template(new_file_path)
+            self.preview_template(new_file_path, template_name)
         else:
+            store.release(template_key)
             QMessageBox.warning(self, "Error", "Failed to upload template.")
     
-    def preview_template(self, template_path):
+    def preview_template(self, template_path, template_name=None):
         """Show a preview of a template"""
         if not os.path.exists(template_path):
             QMessageBox.warning(self, "Error", f"Template file not found: {template_path}")
             return
         
-        dialog = TemplatePreviewDialog(template_path, self)
+        dialog = TemplatePreviewDialog(template_path, self, template_name)
         dialog.exec_()
     
     def view_report(self, report_id):
@@ -1345,7 +1418,7 @@ class AdminDashboard(QWidget):
         with open("admin_approve_debug_log.txt", "a") as f:
             f.write(f"approve_report called for report_id={report_id} by user={self.user}\n")
         
-        report = get_report(report_id)
+        report = load_report(report_id)
         if not report:
             QMessageBox.warning(self, "Error", "Report not found.")
             return
@@ -1545,16 +1618,124 @@ class AdminDashboard(QWidget):
                     "Notification Error",
                     f"Report was approved but notification failed: {str(e)}"
                 )
-                
-            # Refresh only the tables, keeping the current view
-            self.refresh_pending_tables()
-            self.refresh_all_reports_table()
         else:
             QMessageBox.warning(self, "Error", "Failed to approve report.")
     
+    def get_selected_approval_ids(self):
+        """Get the report IDs of the selected rows in the approvals table"""
+        rows = sorted({index.row() for index in self.approvals_table.selectionModel().selectedRows()})
+        report_ids = []
+        for row in rows:
+            item = self.approvals_table.item(row, 0)
+            if item:
+                report_ids.append(int(item.text()))
+        return report_ids
+    
+    def bulk_approve_selected(self):
+        """Give final approval to all selected reports"""
+        report_ids = self.get_selected_approval_ids()
+        if not report_ids:
+            QMessageBox.information(self, "No Selection", "Select one or more reports to approve.")
+            return
+        if self.bulk_jobs:
+            QMessageBox.information(self, "Busy", "Please wait for the current bulk approval to finish.")
+            return
+        
+        comments, ok = QInputDialog.getMultiLineText(
+            self, "Confirm Final Approval",
+            f"Approve {len(report_ids)} report(s)? They will be finalized and locked for editing.\n\n"
+            "Final approval comments (optional):"
+        )
+        if not ok:
+            return
+        
+        try:
+            results = bulk_approve_reports(report_ids, self.user, comments.strip())
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to approve reports: {str(e)}")
+            return
+        
+        self.bulk_jobs = {r['job_id']: report_id for report_id, r in results.items() if r['success']}
+        skipped = [report_id for report_id, r in results.items() if not r['success']]
+        if skipped:
+            QMessageBox.warning(
+                self, "Some Reports Skipped",
+                f"These reports were no longer awaiting final approval: {', '.join(map(str, skipped))}"
+            )
+        
+        if self.bulk_jobs:
+            self.bulk_progress.setRange(0, len(self.bulk_jobs))
+            self.bulk_progress.setValue(0)
+            self.bulk_progress.setVisible(True)
+            self.bulk_status_label.setText(f"Generating PDFs for {len(self.bulk_jobs)} approved report(s)...")
+            self.bulk_approve_btn.setEnabled(False)
+            self.bulk_poll_timer.start()
+    
+    def poll_bulk_jobs(self):
+        """Update progress of background PDF generation for a bulk approval"""
+        try:
+            jobs = get_jobs(list(self.bulk_jobs))
+        except Exception as e:
+            logging.error(f"Error polling bulk approval jobs: {e}")
+            return
+        
+        finished = [job for job in jobs.values() if job['status'] in (SUCCEEDED, FAILED)]
+        self.bulk_progress.setValue(len(finished))
+        self.bulk_status_label.setText(f"Generated {len(finished)} of {len(self.bulk_jobs)} PDF(s)...")
+        if len(finished) < len(self.bulk_jobs):
+            return
+        
+        self.bulk_poll_timer.stop()
+        failures = [f"Report {self.bulk_jobs[job['job_id']]}: {job['message']}"
+                    for job in finished if job['status'] == FAILED]
+        succeeded = len(finished) - len(failures)
+        self.bulk_jobs = {}
+        self.bulk_progress.setVisible(False)
+        self.bulk_status_label.setText("")
+        self.bulk_approve_btn.setEnabled(True)
+        
+        if failures:
+            QMessageBox.warning(
+                self, "Bulk Approval Finished",
+                f"{succeeded} PDF(s) generated. These reports were approved but their PDF failed:\n"
+                + "\n".join(failures)
+            )
+        else:
+            QMessageBox.information(self, "Bulk Approval Finished", f"{succeeded} report(s) approved and PDFs generated.")
+    
+    def bulk_send_back_selected(self):
+        """Send all selected reports back for revision with the same comments"""
+        report_ids = self.get_selected_approval_ids()
+        if not report_ids:
+            QMessageBox.information(self, "No Selection", "Select one or more reports to send back.")
+            return
+        
+        comments, ok = QInputDialog.getMultiLineText(
+            self, "Send Back for Revision",
+            f"Send {len(report_ids)} report(s) back for revision.\n\nPlease provide feedback for the authors:"
+        )
+        if not ok:
+            return
+        if not comments.strip():
+            QMessageBox.warning(self, "Required Field", "Please provide revision comments for the authors.")
+            return
+        
+        try:
+            results = bulk_send_back_reports(report_ids, self.user, comments.strip())
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to send reports back: {str(e)}")
+            return
+        
+        sent_back = sum(1 for r in results.values() if r['success'])
+        skipped = [report_id for report_id, r in results.items() if not r['success']]
+        message = f"{sent_back} report(s) sent back for revision."
+        if skipped:
+            message += f"\nSkipped (no longer awaiting final approval): {', '.join(map(str, skipped))}"
+        QMessageBox.information(self, "Success", message)
+    
     def send_back_report(self, report_id):
         """Send a report back for revision"""
-        report = get_report(report_id)
+        report = load_report(report_id)
         if not report:
             QMessageBox.warning(self, "Error", "Report not found.")
             return
@@ -1636,7 +1817,6 @@ class AdminDashboard(QWidget):
                     )
                 
                 QMessageBox.information(self, "Success", "Report has been sent back for revision.")
-                self.refresh_data()
             else:
                 QMessageBox.warning(self, "Error", "Failed to update report status.")
     
@@ -1669,6 +1849,7 @@ class AdminDashboard(QWidget):
         # Clear the table
         self.templates_table.setRowCount(0)
         
+        uploaders = get_users_by_ids([template['uploaded_by'] for template in templates])
         for row, template in enumerate(templates):
             self.templates_table.insertRow(row)
             
@@ -1681,7 +1862,7 @@ class AdminDashboard(QWidget):
             self.templates_table.setItem(row, 1, name_item)
             
             # Uploaded By
-            uploader = get_user_by_id(template['uploaded_by'])
+            uploader = uploaders.get(template['uploaded_by'])
             uploader_name = uploader['username'] if uploader else "Unknown"
             uploader_item = QTableWidgetItem(uploader_name)
             self.templates_table.setItem(row, 2, uploader_item)
@@ -1698,7 +1879,7 @@ class AdminDashboard(QWidget):
             # Preview button
             preview_btn = QPushButton("Preview")
             preview_btn.setStyleSheet("background-color: #3498db; color: white;")
-            preview_btn.clicked.connect(lambda checked, path=template['file_path']: self.preview_template(path))
+            preview_btn.clicked.connect(lambda checked, t=template: self.preview_template(t['file_path'], t['name']))
             actions_layout.addWidget(preview_btn)
             
             # Delete button
@@ -1731,7 +1912,6 @@ class AdminDashboard(QWidget):
                     "Success", 
                     "Template deleted successfully."
                 )
-                self.refresh_templates_table()
             except Exception as e:
                 QMessageBox.critical(
                     self, 
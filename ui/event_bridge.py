@@ -0,0 +1,76 @@
+import sys
+from pathlib import Path
+
+from PyQt5.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from utils.events import event_bus
+
+class EventBridge(QObject):
+    """
+    Re-emits event bus events as a Qt signal.
+
+    Database changes are published from whichever thread made them; emitting
+    a signal owned by the GUI thread queues the event onto the GUI thread.
+    """
+
+    event_received = pyqtSignal(object)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._unsubscribe = event_bus.subscribe(self.event_received.emit)
+
+def find_report_row(table, report_id):
+    """Find the table row showing a report (report ID in column 0), or -1"""
+    for row in range(table.rowCount()):
+        item = table.item(row, 0)
+        if item and item.text() == str(report_id):
+            return row
+    return -1
+
+_bridge = None
+
+def get_event_bridge():
+    """Get the shared bridge (must first be called from the GUI thread)"""
+    global _bridge
+    if _bridge is None:
+        _bridge = EventBridge()
+    return _bridge
+
+class ChangeBatcher(QObject):
+    """
+    Collects change events for a dashboard and hands them over in batches.
+
+    Events arriving within delay_ms of the first one are delivered together,
+    so a bulk review or a form save touching many fields costs one update.
+    The batcher is parented to the dashboard and stops receiving events when
+    the dashboard is destroyed.
+    """
+
+    def __init__(self, parent, callback, event_types=None, delay_ms=200):
+        super().__init__(parent)
+        self._callback = callback
+        self._event_types = frozenset(event_types) if event_types else None
+        self._pending = []
+        self._timer = QTimer(self)
+        self._timer.setSingleShot(True)
+        self._timer.setInterval(delay_ms)
+        self._timer.timeout.connect(self._flush)
+        get_event_bridge().event_received.connect(self.add_event)
+
+    @pyqtSlot(object)
+    def add_event(self, event):
+        if self._event_types is not None and event['type'] not in self._event_types:
+            return
+        self._pending.append(event)
+        if not self._timer.isActive():
+            self._timer.start()
+
+    def _flush(self):
+        events, self._pending = self._pending, []
+        if events:
+            self._callback(events)
@@ -4,7 +4,7 @@ from pathlib import Path
 from PyQt5.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, 
                            QLineEdit, QPushButton, QMessageBox, QFormLayout,
                            QGroupBox)
-from PyQt5.QtCore import Qt, pyqtSignal
+from PyQt5.QtCore import Qt, pyqtSignal, QThread
 from PyQt5.QtGui import QIcon, QPixmap
 
 # Add the parent directory to the path to allow imports
@@ -12,13 +12,32 @@ parent_dir = str(Path(__file__).resolve().parent.parent)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from utils.auth import Auth
+from utils.auth import Auth, LoginThrottled
+
+class LoginWorker(QThread):
+    """Runs Auth.login (bcrypt) off the GUI thread"""
+    # user dict or None, and an error message or None
+    completed = pyqtSignal(object, object)
+    
+    def __init__(self, username, password, parent=None):
+        super().__init__(parent)
+        self.username = username
+        self.password = password
+    
+    def run(self):
+        try:
+            self.completed.emit(Auth.login(self.username, self.password), None)
+        except LoginThrottled as e:
+            self.completed.emit(None, f"Too many failed attempts. Please try again in {int(e.retry_after) + 1} seconds.")
+        except Exception as e:
+            self.completed.emit(None, f"Login failed: {str(e)}")
 
 class LoginWindow(QWidget):
     login_success = pyqtSignal(dict)
     
     def __init__(self):
         super().__init__()
+        self.login_worker = None
         self.init_ui()
         
     def init_ui(self):
@@ -136,14 +155,27 @@ class LoginWindow(QWidget):
         if not username or not password:
             QMessageBox.warning(self, "Login Error", "Please enter both username and password.")
             return
+        if self.login_worker is not None:
+            return
         
-        # Authenticate user
-        user = Auth.login(username, password)
+        # Authenticate user on a worker thread; bcrypt would freeze the window
+        self.login_button.setEnabled(False)
+        self.login_button.setText("Logging in...")
+        self.login_worker = LoginWorker(username, password, self)
+        self.login_worker.completed.connect(self.on_login_completed)
+        self.login_worker.finished.connect(self.login_worker.deleteLater)
+        self.login_worker.start()
+    
+    def on_login_completed(self, user, error):
+        """Handle the result of a login attempt from the worker"""
+        self.login_worker = None
+        self.login_button.setEnabled(True)
+        self.login_button.setText("Login")
         
         if user:
             self.login_success.emit(user)
         else:
-            QMessageBox.warning(self, "Login Failed", "Invalid username or password.")
+            QMessageBox.warning(self, "Login Failed", error or "Invalid username or password.")
             self.password_input.clear()
             self.password_input.setFocus()
     
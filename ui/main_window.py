@@ -17,14 +17,19 @@ from ui.user_dashboard import UserDashboard
 from ui.unit_leader_dashboard import UnitLeaderDashboard
 from ui.admin_dashboard import AdminDashboard
 from utils.auth import Auth
+from utils.notifications import notification_service, get_user_notifications, mark_notifications_as_read
 
 class MainWindow(QMainWindow):
     logout_signal = pyqtSignal()
+    # Emitted with the new unread count; may be raised from worker threads
+    unread_count_changed = pyqtSignal(int)
     
     def __init__(self):
         super().__init__()
         self.current_user = None
+        self.unsubscribe_notifications = None
         self.init_ui()
+        self.unread_count_changed.connect(self.update_notification_badge)
         
     def init_ui(self):
         """Initialize the UI"""
@@ -101,6 +106,15 @@ class MainWindow(QMainWindow):
         self.user_info_label = QLabel("")
         header_layout.addWidget(self.user_info_label, alignment=Qt.AlignRight)
         
+        # Unread notifications badge (initially hidden)
+        self.notification_badge = QPushButton("")
+        self.notification_badge.setStyleSheet(
+            "background-color: #e74c3c; color: white; border-radius: 8px; padding: 2px 8px;"
+        )
+        self.notification_badge.clicked.connect(self.show_notifications)
+        self.notification_badge.setVisible(False)
+        header_layout.addWidget(self.notification_badge)
+        
         # Logout button (initially hidden)
         self.logout_button = QPushButton("Logout")
         self.logout_button.setFixedWidth(100)
@@ -116,6 +130,10 @@ class MainWindow(QMainWindow):
         self.user_info_label.setText(f"Logged in as: {user['username']} ({user['role']})")
         self.logout_button.setVisible(True)
         
+        # Keep the notification badge current without polling
+        self.unsubscribe_notifications = notification_service.subscribe(self.on_notification_event)
+        self.update_notification_badge(notification_service.unread_count(user['id']))
+        
         # Show appropriate dashboard based on user role
         if Auth.is_admin(user):
             self.show_admin_dashboard()
@@ -157,11 +175,42 @@ class MainWindow(QMainWindow):
         self.stacked_widget.setCurrentWidget(self.user_dashboard)
         self.statusBar.showMessage(f"Welcome, {self.current_user['username']}! You are logged in as a user.")
     
+    def on_notification_event(self, event):
+        """Forward unread count changes for the logged-in user to the GUI thread"""
+        user = self.current_user
+        if user and event['user_id'] == user['id']:
+            self.unread_count_changed.emit(event['unread_count'])
+    
+    def update_notification_badge(self, unread_count):
+        """Show the number of unread notifications in the header"""
+        self.notification_badge.setText(f"{unread_count} unread notification(s)")
+        self.notification_badge.setVisible(unread_count > 0)
+    
+    def show_notifications(self):
+        """Show unread notifications and mark them as read"""
+        if not self.current_user:
+            return
+        notifications = get_user_notifications(self.current_user['id'])
+        if not notifications:
+            self.update_notification_badge(0)
+            return
+        
+        shown = notifications[:20]
+        text = "\n\n".join(f"{n['subject']}\n{n['message']}" for n in shown)
+        if len(notifications) > len(shown):
+            text += f"\n\n...and {len(notifications) - len(shown)} more"
+        QMessageBox.information(self, "Notifications", text)
+        mark_notifications_as_read(self.current_user['id'], [n['id'] for n in shown])
+    
     def logout(self):
         """Log out the current user"""
         self.current_user = None
         self.user_info_label.setText("")
         self.logout_button.setVisible(False)
+        if self.unsubscribe_notifications:
+            self.unsubscribe_notifications()
+            self.unsubscribe_notifications = None
+        self.notification_badge.setVisible(False)
         
         # Reset and show login screen
         self.login_window.reset()
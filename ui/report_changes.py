@@ -0,0 +1,44 @@
+import sys
+from pathlib import Path
+
+from PyQt5.QtWidgets import QGroupBox, QVBoxLayout, QLabel, QTableWidget, QTableWidgetItem, QHeaderView
+from PyQt5.QtGui import QColor
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_changes_since_review
+
+def create_changes_group(report_id):
+    """
+    Build a group box listing the fields a report changed since it was last
+    sent back, for the review dialogs.
+
+    Returns:
+        QGroupBox: The group, or None if there is nothing to show
+    """
+    changes = get_changes_since_review(report_id)
+    if not changes or not changes[1]:
+        return None
+    reviewed_version, diff = changes
+
+    group = QGroupBox("Changes Since Last Review")
+    layout = QVBoxLayout(group)
+    layout.addWidget(QLabel(f"{len(diff)} field(s) changed since version {reviewed_version} was sent back."))
+
+    table = QTableWidget(len(diff), 3)
+    table.setHorizontalHeaderLabels(["Field", "Before", "Now"])
+    table.horizontalHeader().setSectionResizeMode(QHeaderView.Stretch)
+    table.setEditTriggers(QTableWidget.NoEditTriggers)
+    for row, (field_name, (before, after)) in enumerate(diff.items()):
+        table.setItem(row, 0, QTableWidgetItem(field_name))
+        before_item = QTableWidgetItem("" if before is None else str(before))
+        after_item = QTableWidgetItem("(removed)" if after is None else str(after))
+        before_item.setForeground(QColor(192, 57, 43))   # Red
+        after_item.setForeground(QColor(39, 174, 96))    # Green
+        table.setItem(row, 1, before_item)
+        table.setItem(row, 2, after_item)
+    layout.addWidget(table)
+    return group
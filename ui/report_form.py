@@ -14,7 +14,7 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from utils.excel_handler import ExcelHandler
-from db.database import create_report, add_report_data, update_report_status, add_approval_log
+from db.database import create_report, set_report_fields, update_report_status, add_approval_log
 
 class ReportForm(QWidget):
     report_submitted = pyqtSignal(int)  # Signal to emit report_id when submitted
@@ -226,9 +226,8 @@ class ReportForm(QWidget):
         # Create report
         report_id = create_report(self.user_id, title)
         
-        # Save form data
-        for field_name, value in data.items():
-            add_report_data(report_id, field_name, value)
+        # Save form data (as the report's first version)
+        set_report_fields(report_id, data)
         
         QMessageBox.information(self, "Success", "Report saved as draft successfully.")
         
@@ -259,9 +258,8 @@ class ReportForm(QWidget):
         # Create report
         report_id = create_report(self.user_id, title)
         
-        # Save form data
-        for field_name, value in data.items():
-            add_report_data(report_id, field_name, value)
+        # Save form data (as the report's first version)
+        set_report_fields(report_id, data)
         
         # Update status to submitted
         update_report_status(report_id, 'submitted', self.user_id)
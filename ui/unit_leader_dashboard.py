@@ -16,8 +16,14 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from db.database import (get_reports_by_status, get_report, 
-                       update_report_status, add_approval_log)
+                       update_report_status, add_approval_log,
+                       get_report_summaries, count_reports_by_status)
+from db.report_loader import load_report
 from email_sender import EmailSender
+from email_module.notification_digest import notify_admin
+from ui.event_bridge import ChangeBatcher, find_report_row
+from ui.report_changes import create_changes_group
+from utils.events import REPORT_EVENTS
 
 class CommentDialog(QDialog):
     """Dialog for entering comments when sending back a report"""
@@ -82,6 +88,11 @@ class ReportDetailDialog(QDialog):
         
         layout.addWidget(meta_group)
         
+        # Show what a revised report changed since it was sent back
+        changes_group = create_changes_group(self.report['report_id'])
+        if changes_group:
+            layout.addWidget(changes_group)
+        
         # Add report fields in scrollable area
         fields_group = QGroupBox("Report Content")
         fields_layout = QVBoxLayout(fields_group)
@@ -169,12 +180,17 @@ class ReportDetailDialog(QDialog):
         return categories
 
 class UnitLeaderDashboard(QWidget):
+    # Change batches touching more reports than this rebuild the tables
+    MAX_PATCHED_REPORTS = 50
+    
     def __init__(self, user):
         super().__init__()
         self.user = user
         self.email_sender = EmailSender()
         self.init_ui()
         self.refresh_data()
+        # Report changes made anywhere in the app patch the affected rows
+        self.change_batcher = ChangeBatcher(self, self.apply_changes, REPORT_EVENTS)
         
     def init_ui(self):
         """Initialize the UI"""
@@ -399,68 +415,70 @@ class UnitLeaderDashboard(QWidget):
             # Add to both tables
             self.pending_reports_table.insertRow(row)
             self.detailed_pending_table.insertRow(row)
+            self._fill_pending_row(row, report)
+    
+    def _fill_pending_row(self, row, report):
+        """Populate one row of both pending reports tables"""
+        # ID
+        id_item = QTableWidgetItem(str(report['report_id']))
+        self.pending_reports_table.setItem(row, 0, id_item)
+        self.detailed_pending_table.setItem(row, 0, QTableWidgetItem(str(report['report_id'])))
+        
+        # Title
+        title_item = QTableWidgetItem(report['title'])
+        self.pending_reports_table.setItem(row, 1, title_item)
+        self.detailed_pending_table.setItem(row, 1, QTableWidgetItem(report['title']))
+        
+        # Created by
+        creator_item = QTableWidgetItem(report['creator_name'])
+        self.pending_reports_table.setItem(row, 2, creator_item)
+        self.detailed_pending_table.setItem(row, 2, QTableWidgetItem(report['creator_name']))
+        
+        # Submitted on
+        created_item = QTableWidgetItem(report['created_at'])
+        self.pending_reports_table.setItem(row, 3, created_item)
+        self.detailed_pending_table.setItem(row, 3, QTableWidgetItem(report['created_at']))
+        
+        # Version (detailed table only)
+        self.detailed_pending_table.setItem(row, 4, QTableWidgetItem(str(report['version'])))
+        
+        # Actions
+        for table_idx, table in enumerate([self.pending_reports_table, self.detailed_pending_table]):
+            actions_cell = QWidget()
+            actions_layout = QHBoxLayout(actions_cell)
+            actions_layout.setContentsMargins(2, 2, 2, 2)
             
-            # ID
-            id_item = QTableWidgetItem(str(report['report_id']))
-            self.pending_reports_table.setItem(row, 0, id_item)
-            self.detailed_pending_table.setItem(row, 0, QTableWidgetItem(str(report['report_id'])))
-            
-            # Title
-            title_item = QTableWidgetItem(report['title'])
-            self.pending_reports_table.setItem(row, 1, title_item)
-            self.detailed_pending_table.setItem(row, 1, QTableWidgetItem(report['title']))
-            
-            # Created by
-            creator_item = QTableWidgetItem(report['creator_name'])
-            self.pending_reports_table.setItem(row, 2, creator_item)
-            self.detailed_pending_table.setItem(row, 2, QTableWidgetItem(report['creator_name']))
-            
-            # Submitted on
-            created_item = QTableWidgetItem(report['created_at'])
-            self.pending_reports_table.setItem(row, 3, created_item)
-            self.detailed_pending_table.setItem(row, 3, QTableWidgetItem(report['created_at']))
-            
-            # Version (detailed table only)
-            self.detailed_pending_table.setItem(row, 4, QTableWidgetItem(str(report['version'])))
+            # View button
+            view_btn = QPushButton("View")
+            view_btn.setStyleSheet("background-color: #3498db; color: white;")
+            view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
+            actions_layout.addWidget(view_btn)
             
-            # Actions
-            for table_idx, table in enumerate([self.pending_reports_table, self.detailed_pending_table]):
-                actions_cell = QWidget()
-                actions_layout = QHBoxLayout(actions_cell)
-                actions_layout.setContentsMargins(2, 2, 2, 2)
-                
-                # View button
-                view_btn = QPushButton("View")
-                view_btn.setStyleSheet("background-color: #3498db; color: white;")
-                view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
-                actions_layout.addWidget(view_btn)
-                
-                # Approve button
-                approve_btn = QPushButton("Approve")
-                approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
-                approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
-                actions_layout.addWidget(approve_btn)
-                
-                # Send Back button
-                reject_btn = QPushButton("Send Back")
-                reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
-                reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
-                actions_layout.addWidget(reject_btn)
-                
-                if table_idx == 0:  # Dashboard table
-                    table.setCellWidget(row, 4, actions_cell)
-                else:  # Detailed table
-                    table.setCellWidget(row, 5, actions_cell)
-    
+            # Approve button
+            approve_btn = QPushButton("Approve")
+            approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+            approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
+            actions_layout.addWidget(approve_btn)
+            
+            # Send Back button
+            reject_btn = QPushButton("Send Back")
+            reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
+            reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
+            actions_layout.addWidget(reject_btn)
+            
+            if table_idx == 0:  # Dashboard table
+                table.setCellWidget(row, 4, actions_cell)
+            else:  # Detailed table
+                table.setCellWidget(row, 5, actions_cell)
+
     def refresh_dashboard_stats(self):
         """Refresh the dashboard statistics"""
         # Get counts for different statuses
-        pending_reports = get_reports_by_status('submitted')
-        approved_reports = get_reports_by_status('approved_leader')
+        counts = count_reports_by_status()
         
         # Update labels
-        self.pending_count_label.setText(f"Pending Reviews: {len(pending_reports)}")
-        self.approved_count_label.setText(f"Approved: {len(approved_reports)}")
+        self.pending_count_label.setText(f"Pending Reviews: {counts.get('submitted', 0)}")
+        self.approved_count_label.setText(f"Approved: {counts.get('approved_leader', 0)}")
     
     def refresh_all_reports_table(self):
         """Refresh the all reports table"""
@@ -488,58 +506,106 @@ class UnitLeaderDashboard(QWidget):
                 continue
             
             self.all_reports_table.insertRow(row)
-            
-            # ID
-            id_item = QTableWidgetItem(str(report['report_id']))
-            self.all_reports_table.setItem(row, 0, id_item)
-            
-            # Title
-            title_item = QTableWidgetItem(report['title'])
-            self.all_reports_table.setItem(row, 1, title_item)
-            
-            # Created by
-            creator_item = QTableWidgetItem(report['creator_name'])
-            self.all_reports_table.setItem(row, 2, creator_item)
-            
-            # Submitted on
-            created_item = QTableWidgetItem(report['created_at'])
-            self.all_reports_table.setItem(row, 3, created_item)
-            
-            # Status with color coding
-            status_text = self.get_status_display_text(report['status'])
-            status_item = QTableWidgetItem(status_text)
-            status_item.setForeground(self.get_status_color(report['status']))
-            self.all_reports_table.setItem(row, 4, status_item)
-            
-            # Actions
-            actions_cell = QWidget()
-            actions_layout = QHBoxLayout(actions_cell)
-            actions_layout.setContentsMargins(2, 2, 2, 2)
-            
-            # View button
-            view_btn = QPushButton("View")
-            view_btn.setStyleSheet("background-color: #3498db; color: white;")
-            view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
-            actions_layout.addWidget(view_btn)
-            
-            # Add approve/reject buttons only for submitted reports
-            if report['status'] == 'submitted':
-                # Approve button
-                approve_btn = QPushButton("Approve")
-                approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
-                approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
-                actions_layout.addWidget(approve_btn)
-                
-                # Send Back button
-                reject_btn = QPushButton("Send Back")
-                reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
-                reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
-                actions_layout.addWidget(reject_btn)
-            
-            self.all_reports_table.setCellWidget(row, 5, actions_cell)
-            
+            self._fill_all_reports_row(row, report)
             row += 1
     
+    def _fill_all_reports_row(self, row, report):
+        """Populate one row of the all reports table"""
+        # ID
+        id_item = QTableWidgetItem(str(report['report_id']))
+        self.all_reports_table.setItem(row, 0, id_item)
+        
+        # Title
+        title_item = QTableWidgetItem(report['title'])
+        self.all_reports_table.setItem(row, 1, title_item)
+        
+        # Created by
+        creator_item = QTableWidgetItem(report['creator_name'])
+        self.all_reports_table.setItem(row, 2, creator_item)
+        
+        # Submitted on
+        created_item = QTableWidgetItem(report['created_at'])
+        self.all_reports_table.setItem(row, 3, created_item)
+        
+        # Status with color coding
+        status_text = self.get_status_display_text(report['status'])
+        status_item = QTableWidgetItem(status_text)
+        status_item.setForeground(self.get_status_color(report['status']))
+        self.all_reports_table.setItem(row, 4, status_item)
+        
+        # Actions
+        actions_cell = QWidget()
+        actions_layout = QHBoxLayout(actions_cell)
+        actions_layout.setContentsMargins(2, 2, 2, 2)
+        
+        # View button
+        view_btn = QPushButton("View")
+        view_btn.setStyleSheet("background-color: #3498db; color: white;")
+        view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
+        actions_layout.addWidget(view_btn)
+        
+        # Add approve/reject buttons only for submitted reports
+        if report['status'] == 'submitted':
+            # Approve button
+            approve_btn = QPushButton("Approve")
+            approve_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+            approve_btn.clicked.connect(lambda checked, r=report['report_id']: self.approve_report(r))
+            actions_layout.addWidget(approve_btn)
+            
+            # Send Back button
+            reject_btn = QPushButton("Send Back")
+            reject_btn.setStyleSheet("background-color: #e74c3c; color: white;")
+            reject_btn.clicked.connect(lambda checked, r=report['report_id']: self.send_back_report(r))
+            actions_layout.addWidget(reject_btn)
+        
+        self.all_reports_table.setCellWidget(row, 5, actions_cell)
+    
+    def apply_changes(self, events):
+        """Patch the report tables affected by a batch of database change events"""
+        report_ids = {event['report_id'] for event in events}
+        if len(report_ids) > self.MAX_PATCHED_REPORTS:
+            self.refresh_data()
+            return
+        reports = get_report_summaries(report_ids)
+        for report_id in report_ids:
+            report = reports.get(report_id)
+            self._patch_pending_row(report_id, report)
+            self._patch_all_reports_row(report_id, report)
+        self.refresh_dashboard_stats()
+    
+    def _patch_pending_row(self, report_id, report):
+        row = find_report_row(self.detailed_pending_table, report_id)
+        if report and report['status'] in ('submitted', 'needs_revision'):
+            if row < 0:
+                row = 0
+                self.pending_reports_table.insertRow(row)
+                self.detailed_pending_table.insertRow(row)
+            self._fill_pending_row(row, report)
+        elif row >= 0:
+            self.pending_reports_table.removeRow(row)
+            self.detailed_pending_table.removeRow(row)
+    
+    def _patch_all_reports_row(self, report_id, report):
+        row = find_report_row(self.all_reports_table, report_id)
+        if report and self._report_matches_filter(report):
+            if row < 0:
+                row = 0
+                self.all_reports_table.insertRow(row)
+            self._fill_all_reports_row(row, report)
+        elif row >= 0:
+            self.all_reports_table.removeRow(row)
+    
+    def _report_matches_filter(self, report):
+        """Check a report against the all reports table's status and search filters"""
+        status_filter = self.status_filter.currentData()
+        if status_filter == 'all':
+            if report['status'] not in ('submitted', 'approved_leader', 'approved_admin', 'needs_revision'):
+                return False
+        elif report['status'] != status_filter:
+            return False
+        search_text = self.search_input.text().lower()
+        return not search_text or search_text in report['title'].lower()
+    
     def get_status_display_text(self, status):
         """Convert status code to display text"""
         status_map = {
@@ -607,7 +673,7 @@ class UnitLeaderDashboard(QWidget):
             add_approval_log(report_id, self.user['id'], 'approve_leader', "Approved by Unit Leader")
             
             # Get report for notifications
-            report = get_report(report_id)
+            report = load_report(report_id)
             excel_path = None
             if report:
                 # Try to get Excel file path from report fields or directly
@@ -621,8 +687,9 @@ class UnitLeaderDashboard(QWidget):
             admin_users = [user for user in self.get_admin_users()]
             if admin_users and report:
                 for admin in admin_users:
-                    self.email_sender.send_notification_to_admin(
-                        report_id, 
+                    notify_admin(
+                        self.email_sender,
+                        report_id,
                         report['title'],
                         report['user_id'],
                         self.user['id'],
@@ -630,7 +697,6 @@ class UnitLeaderDashboard(QWidget):
                         excel_path=excel_path
                     )
             QMessageBox.information(self, "Success", "Report approved and forwarded to Section Head.")
-            self.refresh_data()
     
     def send_back_report(self, report_id):
         """Send a report back for revision"""
@@ -651,7 +717,7 @@ class UnitLeaderDashboard(QWidget):
             add_approval_log(report_id, self.user['id'], 'send_back', comments)
             
             # Get report for notifications
-            report = get_report(report_id)
+            report = load_report(report_id)
             
             # Send email notification to user
             if report:
@@ -664,7 +730,6 @@ class UnitLeaderDashboard(QWidget):
                 )
             
             QMessageBox.information(self, "Success", "Report has been sent back for revision.")
-            self.refresh_data()
     
     def get_admin_users(self):
         """Get all admin users for notifications"""
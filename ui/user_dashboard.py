@@ -16,19 +16,27 @@ if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
 from db.database import (get_user_reports, create_report, add_report_data, 
-                        update_report_status, get_report, add_approval_log, get_user_by_id)
+                        update_report_status, get_report, add_approval_log, get_user_by_id,
+                        get_users_by_ids)
 from utils.excel_handler import ExcelHandler
 from ui.report_form import ReportForm
 from utils.auth import Auth
+from db.report_loader import load_report
+from utils.report_workbooks import reference_template, materialize_workbook, release_unmodified_workbook
+from utils.workbook_extractor import queue_extraction
+from utils.workbook_watcher import get_workbook_watcher
 from email_sender import EmailSender
+from ui.event_bridge import ChangeBatcher, find_report_row
+from utils.events import REPORT_EVENTS, REPORT_CREATED, TEMPLATE_EVENTS
 
 class ExcelReportForm(QWidget):
     """Widget for creating reports based on Excel templates without conversion"""
     report_submitted = pyqtSignal(int)  # Signal to emit report_id when submitted
     
-    def __init__(self, template_path, user_id):
+    def __init__(self, template_path, user_id, template_name=None):
         super().__init__()
         self.template_path = template_path
+        self.template_name = template_name or os.path.basename(template_path)
         self.user_id = user_id
         self.report_id = None
         self.excel_file_path = None
@@ -58,7 +66,7 @@ class ExcelReportForm(QWidget):
         excel_group = QGroupBox("Excel Report Template")
         excel_layout = QVBoxLayout(excel_group)
         
-        template_info = QLabel(f"Template: {os.path.basename(self.template_path)}")
+        template_info = QLabel(f"Template: {self.template_name}")
         excel_layout.addWidget(template_info)
         
         instructions = QLabel(
@@ -184,28 +192,23 @@ class ExcelReportForm(QWidget):
                 QMessageBox.warning(self, "Error", "Failed to create report.")
                 return
         
-        # Instead of generating a new file, we create a copy of the template in a user-specific location
-        reports_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'user_reports', str(self.user_id))
-        os.makedirs(reports_dir, exist_ok=True)
-        
-        # Create a file name based on the report ID and original template name
-        file_name = f"report_{self.report_id}_{os.path.basename(self.template_path)}"
-        file_path = os.path.join(reports_dir, file_name)
-        
-        # If this is the first time, copy the template; otherwise, use existing file
-        if not os.path.exists(file_path):
-            import shutil
-            try:
-                shutil.copy2(self.template_path, file_path)
+        # The report shares the template until it is opened for editing; then it
+        # gets a private workbook in user_reports/ (copy-on-write where supported)
+        file_name = f"report_{self.report_id}_{self.template_name}"
+        try:
+            if not self.excel_file_path:
                 # Add report title as data
                 add_report_data(self.report_id, "report_title", self.report_title.text())
-                add_report_data(self.report_id, "excel_file_path", file_path)
-            except Exception as e:
-                QMessageBox.warning(self, "Error", f"Failed to copy template file: {str(e)}")
-                return
+                reference_template(self.report_id, self.template_path)
+            file_path = materialize_workbook(self.report_id, self.user_id, file_name)
+        except Exception as e:
+            QMessageBox.warning(self, "Error", f"Failed to copy template file: {str(e)}")
+            return
         
         self.excel_file_path = file_path
         self.excel_status_label.setText(f"Status: Editing template at {file_path}")
+        # Saves made in Excel are recorded and extracted in the background
+        get_workbook_watcher().watch(self.report_id, file_path)
         
         # Open the file in the default application
         try:
@@ -219,8 +222,8 @@ class ExcelReportForm(QWidget):
                 
             QMessageBox.information(
                 self, "Template Opened", 
-                "The Excel template has been opened for editing. Fill in your data and save the file, "
-                "then click 'Save Changes' to register your edits."
+                "The Excel template has been opened for editing. Fill in your data and save the file; "
+                "your saves are registered automatically."
             )
         except Exception as e:
             QMessageBox.warning(self, "Error", f"Failed to open Excel file: {str(e)}")
@@ -239,6 +242,8 @@ class ExcelReportForm(QWidget):
         # Update report title if changed
         if self.report_title.text():
             add_report_data(self.report_id, "report_title", self.report_title.text())
+        # Copy the values typed into the workbook into report_data
+        queue_extraction(self.report_id)
         
         self.excel_status_label.setText(f"Status: Changes saved for {os.path.basename(self.excel_file_path)}")
         QMessageBox.information(
@@ -258,6 +263,11 @@ class ExcelReportForm(QWidget):
         
         # Update report status to draft (it should already be draft, but just to be sure)
         update_report_status(self.report_id, 'draft', self.user_id)
+        # A workbook that was opened but never changed goes back to sharing the
+        # template, unless it is still being edited (its saves are watched)
+        if self.report_id not in get_workbook_watcher().watched().values():
+            self.excel_file_path = release_unmodified_workbook(self.report_id) or self.excel_file_path
+        queue_extraction(self.report_id)
         
         QMessageBox.information(self, "Success", "Report saved as draft.")
         self.report_submitted.emit(self.report_id)
@@ -297,6 +307,9 @@ class ExcelReportForm(QWidget):
             # Removed single user_signature field; using approval_logs to gather all signatures
             # Update report status
             update_report_status(self.report_id, 'submitted', user['id'])
+            get_workbook_watcher().unwatch(self.report_id)
+            self.excel_file_path = release_unmodified_workbook(self.report_id) or self.excel_file_path
+            queue_extraction(self.report_id)
             
             # Add approval log with signature information
             add_approval_log(self.report_id, user['id'], 'submit', f"Submission with digital signature: {signature}")
@@ -316,8 +329,12 @@ class UserDashboard(QWidget):
         super().__init__()
         self.user = user
         self.email_sender = EmailSender()
+        # This user's reports by ID, as last loaded
+        self._reports = {}
         self.init_ui()
         self.refresh_data()
+        # Reviews and template uploads made elsewhere patch this dashboard
+        self.change_batcher = ChangeBatcher(self, self.apply_changes, REPORT_EVENTS + TEMPLATE_EVENTS)
         
     def init_ui(self):
         """Initialize the UI"""
@@ -513,6 +530,7 @@ class UserDashboard(QWidget):
         # Clear the table
         self.templates_table.setRowCount(0)
         
+        uploaders = get_users_by_ids([template['uploaded_by'] for template in templates])
         for row, template in enumerate(templates):
             self.templates_table.insertRow(row)
             
@@ -525,7 +543,7 @@ class UserDashboard(QWidget):
             self.templates_table.setItem(row, 1, name_item)
             
             # Uploaded By
-            uploader = get_user_by_id(template['uploaded_by'])
+            uploader = uploaders.get(template['uploaded_by'])
             uploader_name = uploader['username'] if uploader else "Unknown"
             uploader_item = QTableWidgetItem(uploader_name)
             self.templates_table.setItem(row, 2, uploader_item)
@@ -569,7 +587,7 @@ class UserDashboard(QWidget):
         """Use the selected template to create a new report"""
         # Create an Excel report form based on template
         template_path = template['file_path']
-        self.report_form = ExcelReportForm(template_path, self.user['id'])
+        self.report_form = ExcelReportForm(template_path, self.user['id'], template['name'])
         self.report_form.report_submitted.connect(self.on_report_submitted)
         self.report_form_container.setWidget(self.report_form)
     
@@ -625,12 +643,9 @@ class UserDashboard(QWidget):
         
     def refresh_reports_table(self):
         """Refresh the reports table"""
-        # Get filter values
-        status_filter = self.status_filter.currentData()
-        search_text = self.search_input.text().lower()
-        
         # Get user reports
         reports = get_user_reports(self.user['id'])
+        self._reports = {report['report_id']: report for report in reports}
         
         # Clear the table
         self.reports_table.setRowCount(0)
@@ -638,67 +653,129 @@ class UserDashboard(QWidget):
         
         for report in reports:
             # Apply filters
-            if status_filter != "all" and report['status'] != status_filter:
-                continue
-                
-            if search_text and search_text not in report['title'].lower():
+            if not self._report_matches_filter(report):
                 continue
             
             self.reports_table.insertRow(row)
-            
-            # ID
-            id_item = QTableWidgetItem(str(report['report_id']))
-            self.reports_table.setItem(row, 0, id_item)
-            
-            # Title
-            title_item = QTableWidgetItem(report['title'])
-            self.reports_table.setItem(row, 1, title_item)
-            
-            # Created date
-            created_item = QTableWidgetItem(report['created_at'])
-            self.reports_table.setItem(row, 2, created_item)
-            
-            # Status with color coding
-            status_text = self.get_status_display_text(report['status'])
-            status_item = QTableWidgetItem(status_text)
-            status_item.setForeground(self.get_status_color(report['status']))
-            self.reports_table.setItem(row, 3, status_item)
-            
-            # Actions
-            actions_cell = QWidget()
-            actions_layout = QHBoxLayout(actions_cell)
-            actions_layout.setContentsMargins(2, 2, 2, 2)
-            
-            # View button
-            view_btn = QPushButton("View")
-            view_btn.setStyleSheet("background-color: #3498db; color: white;")
-            view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
-            actions_layout.addWidget(view_btn)
-            
-            # Edit button - only for drafts, submitted, or reports needing revision
-            if report['status'] in ['draft', 'submitted', 'needs_revision']:
-                edit_btn = QPushButton("Edit")
-                edit_btn.setStyleSheet("background-color: #f39c12; color: white;")
-                edit_btn.clicked.connect(lambda checked, r=report['report_id']: self.edit_report(r))
-                actions_layout.addWidget(edit_btn)
-            
-            # Submit button - allow multiple submissions until approved
-            if report['status'] in ['draft', 'submitted', 'needs_revision']:
-                submit_btn = QPushButton("Submit")
-                submit_btn.setStyleSheet("background-color: #2ecc71; color: white;")
-                submit_btn.clicked.connect(lambda checked, r=report['report_id']: self.submit_report(r))
-                actions_layout.addWidget(submit_btn)
-            
-            self.reports_table.setCellWidget(row, 4, actions_cell)
-            
+            self._fill_report_row(row, report)
             row += 1
         
         # Also update the recent reports table on dashboard
         self.update_recent_reports_table(reports[:5])
     
-    def refresh_dashboard_stats(self):
+    def _fill_report_row(self, row, report):
+        """Populate one row of the reports table"""
+        # ID
+        id_item = QTableWidgetItem(str(report['report_id']))
+        self.reports_table.setItem(row, 0, id_item)
+        
+        # Title
+        title_item = QTableWidgetItem(report['title'])
+        self.reports_table.setItem(row, 1, title_item)
+        
+        # Created date
+        created_item = QTableWidgetItem(report['created_at'])
+        self.reports_table.setItem(row, 2, created_item)
+        
+        # Status with color coding
+        status_text = self.get_status_display_text(report['status'])
+        status_item = QTableWidgetItem(status_text)
+        status_item.setForeground(self.get_status_color(report['status']))
+        self.reports_table.setItem(row, 3, status_item)
+        
+        # Actions
+        actions_cell = QWidget()
+        actions_layout = QHBoxLayout(actions_cell)
+        actions_layout.setContentsMargins(2, 2, 2, 2)
+        
+        # View button
+        view_btn = QPushButton("View")
+        view_btn.setStyleSheet("background-color: #3498db; color: white;")
+        view_btn.clicked.connect(lambda checked, r=report['report_id']: self.view_report(r))
+        actions_layout.addWidget(view_btn)
+        
+        # Edit button - only for drafts, submitted, or reports needing revision
+        if report['status'] in ['draft', 'submitted', 'needs_revision']:
+            edit_btn = QPushButton("Edit")
+            edit_btn.setStyleSheet("background-color: #f39c12; color: white;")
+            edit_btn.clicked.connect(lambda checked, r=report['report_id']: self.edit_report(r))
+            actions_layout.addWidget(edit_btn)
+        
+        # Submit button - allow multiple submissions until approved
+        if report['status'] in ['draft', 'submitted', 'needs_revision']:
+            submit_btn = QPushButton("Submit")
+            submit_btn.setStyleSheet("background-color: #2ecc71; color: white;")
+            submit_btn.clicked.connect(lambda checked, r=report['report_id']: self.submit_report(r))
+            actions_layout.addWidget(submit_btn)
+        
+        self.reports_table.setCellWidget(row, 4, actions_cell)
+    
+    def _report_matches_filter(self, report):
+        """Check a report against the reports table's status and search filters"""
+        status_filter = self.status_filter.currentData()
+        if status_filter != "all" and report['status'] != status_filter:
+            return False
+        search_text = self.search_input.text().lower()
+        return not search_text or search_text in report['title'].lower()
+    
+    def apply_changes(self, events):
+        """Patch the views affected by a batch of database change events"""
+        if any(event['type'] in TEMPLATE_EVENTS for event in events):
+            self.refresh_templates()
+        # Only this user's reports matter: known ones, and new ones they (or
+        # another process, which does not say who) created
+        changed = set()
+        for event in events:
+            if event['type'] not in REPORT_EVENTS:
+                continue
+            report_id = event['report_id']
+            if report_id in self._reports or find_report_row(self.reports_table, report_id) >= 0:
+                changed.add(report_id)
+            elif event['type'] == REPORT_CREATED and event.get('user_id') in (None, self.user['id']):
+                changed.add(report_id)
+        if not changed:
+            return
+        loaded = {report['report_id']: report for report in get_user_reports(self.user['id'], changed)}
+        for report_id in changed:
+            report = loaded.get(report_id)
+            if report:
+                self._reports[report_id] = report
+            else:
+                self._reports.pop(report_id, None)
+            row = find_report_row(self.reports_table, report_id)
+            if report and self._report_matches_filter(report):
+                if row < 0:
+                    row = self._sorted_row_for(report)
+                    self.reports_table.insertRow(row)
+                self._fill_report_row(row, report)
+            elif row >= 0:
+                self.reports_table.removeRow(row)
+        reports = self._sorted_reports()
+        self.update_recent_reports_table(reports[:5])
+        self.refresh_dashboard_stats(reports)
+
+    @staticmethod
+    def _sort_key(report):
+        # Newest first, as returned by get_user_reports
+        return (report['created_at'] or '', report['report_id'])
+
+    def _sorted_reports(self):
+        return sorted(self._reports.values(), key=self._sort_key, reverse=True)
+
+    def _sorted_row_for(self, report):
+        """Row at which a new report keeps the reports table in get_user_reports order"""
+        key = self._sort_key(report)
+        for row in range(self.reports_table.rowCount()):
+            item = self.reports_table.item(row, 0)
+            shown = self._reports.get(int(item.text())) if item else None
+            if shown and self._sort_key(shown) < key:
+                return row
+        return self.reports_table.rowCount()
+    
+    def refresh_dashboard_stats(self, reports=None):
         """Refresh the dashboard statistics"""
-        reports = get_user_reports(self.user['id'])
+        if reports is None:
+            reports = get_user_reports(self.user['id'])
         
         # Count reports by status
         draft_count = sum(1 for r in reports if r['status'] == 'draft')
@@ -871,7 +948,7 @@ class UserDashboard(QWidget):
     
     def edit_report(self, report_id):
         """Edit a report"""
-        report = get_report(report_id)
+        report = load_report(report_id)
         if not report:
             QMessageBox.warning(self, "Error", "Report not found.")
             return
@@ -888,9 +965,12 @@ class UserDashboard(QWidget):
             excel_path = report['fields']['excel_file_path']
             
         if excel_path and os.path.exists(excel_path):
-            # Open the Excel file for editing
+            # Open the Excel file for editing (reports still sharing their
+            # template get a private copy first)
             import subprocess
             try:
+                excel_path = materialize_workbook(report_id, self.user['id'])
+                get_workbook_watcher().watch(report_id, excel_path)
                 if sys.platform == 'win32':
                     os.startfile(excel_path)
                 elif sys.platform == 'darwin':  # macOS
@@ -904,29 +984,24 @@ class UserDashboard(QWidget):
             except Exception as e:
                 QMessageBox.warning(self, "Error", f"Failed to open Excel file: {str(e)}")
         else:
-            # Get the active template and create a new copy for this report
+            # Get the active template and create a new workbook for this report
             from db.database import get_active_template
             active_template = get_active_template()
             
             if not active_template:
                 QMessageBox.warning(self, "No Template", "No active template found. Please contact an administrator.")
                 return
-                
-            # Create a directory for this user's reports if it doesn't exist
-            reports_dir = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'user_reports', str(self.user['id']))
-            os.makedirs(reports_dir, exist_ok=True)
+            if isinstance(active_template, list):
+                active_template = active_template[0]
             
             # Create a file name based on the report ID and original template name
-            file_name = f"report_{report_id}_{os.path.basename(active_template['file_path'])}"
-            file_path = os.path.join(reports_dir, file_name)
+            file_name = f"report_{report_id}_{active_template['name']}"
             
-            # Copy the template to the user's directory
-            import shutil
+            # Reference the template and give the report its private copy
             try:
-                shutil.copy2(active_template['file_path'], file_path)
-                
-                # Update the report with the new file path
-                add_report_data(report_id, "excel_file_path", file_path)
+                reference_template(report_id, active_template['file_path'])
+                file_path = materialize_workbook(report_id, self.user['id'], file_name)
+                get_workbook_watcher().watch(report_id, file_path)
                 
                 # Open the new file
                 import subprocess
@@ -945,12 +1020,11 @@ class UserDashboard(QWidget):
     
     def on_report_submitted(self, report_id):
         """Handle signal when a new report is submitted from the form"""
-        self.refresh_data()
         self.tab_widget.setCurrentIndex(2)  # Switch to My Reports tab
 
     def submit_report(self, report_id):
         """Submit a report for review"""
-        report = get_report(report_id)
+        report = load_report(report_id)
         if not report:
             QMessageBox.warning(self, "Error", "Report not found.")
             return
@@ -978,9 +1052,11 @@ class UserDashboard(QWidget):
             # Removed single user_signature field; using approval_logs to gather all signatures
             # Update report status
             update_report_status(report_id, 'submitted', user['id'])
+            get_workbook_watcher().unwatch(report_id)
+            release_unmodified_workbook(report_id)
+            queue_extraction(report_id)
             
             # Add approval log with signature information
             add_approval_log(report_id, user['id'], 'submit', f"Submission with digital signature: {signature}")
             
-            QMessageBox.information(self, "Success", "Report submitted successfully for review.")
-            self.refresh_data() 
\ No newline at end of file
+            QMessageBox.information(self, "Success", "Report submitted successfully for review.")
\ No newline at end of file
@@ -1,5 +1,9 @@
 import sys
 import os
+import logging
+import threading
+import time
+from collections import OrderedDict, deque
 from pathlib import Path
 from passlib.hash import bcrypt
 import datetime
@@ -9,18 +13,104 @@ parent_dir = str(Path(__file__).resolve().parent.parent)
 if parent_dir not in sys.path:
     sys.path.append(parent_dir)
 
-from db.database import get_user_by_username, add_user
+from db.database import get_user_by_username, add_user, update_user
+
+logger = logging.getLogger(__name__)
+
+def get_bcrypt_rounds():
+    """bcrypt cost factor for new password hashes, from BCRYPT_ROUNDS (default 12)"""
+    try:
+        return min(31, max(4, int(os.getenv('BCRYPT_ROUNDS', '12'))))
+    except ValueError:
+        logger.warning("Invalid BCRYPT_ROUNDS value, using 12")
+        return 12
+
+def _env_int(name, default):
+    try:
+        return max(1, int(os.getenv(name, str(default))))
+    except ValueError:
+        logger.warning(f"Invalid {name} value, using {default}")
+        return default
+
+class LoginThrottled(Exception):
+    """Raised by Auth.login when a username has failed too often recently"""
+
+    def __init__(self, username, retry_after):
+        super().__init__(f"Too many failed login attempts for {username}; retry in {retry_after:.0f}s")
+        self.username = username
+        self.retry_after = retry_after
+
+class LoginThrottle:
+    """
+    Per-username record of recent failed logins.
+
+    After max_attempts failures within window seconds, further attempts for
+    that username are rejected until the oldest failure leaves the window,
+    before any password hashing is done. Only max_users usernames are
+    tracked (least recently failed dropped first), so guessing random
+    usernames cannot grow it without bound.
+    """
+
+    def __init__(self, max_attempts=None, window=None, max_users=1024):
+        self.max_attempts = max_attempts or _env_int('LOGIN_MAX_ATTEMPTS', 5)
+        self.window = window or _env_int('LOGIN_THROTTLE_SECONDS', 60)
+        self.max_users = max_users
+        self._lock = threading.Lock()
+        self._failures = OrderedDict()
+
+    @staticmethod
+    def _key(username):
+        return username.strip().lower()
+
+    def retry_after(self, username, now=None):
+        """Seconds until username may try again, or 0 if it is not throttled"""
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            failures = self._failures.get(self._key(username))
+            if not failures:
+                return 0
+            while failures and failures[0] <= now - self.window:
+                failures.popleft()
+            if len(failures) < self.max_attempts:
+                return 0
+            return failures[0] + self.window - now
+
+    def record_failure(self, username, now=None):
+        now = time.monotonic() if now is None else now
+        key = self._key(username)
+        with self._lock:
+            failures = self._failures.pop(key, None) or deque(maxlen=self.max_attempts)
+            failures.append(now)
+            self._failures[key] = failures
+            while len(self._failures) > self.max_users:
+                self._failures.popitem(last=False)
+
+    def reset(self, username):
+        with self._lock:
+            self._failures.pop(self._key(username), None)
+
+# Shared by every login in this process
+login_throttle = LoginThrottle()
+
+# bcrypt is CPU-bound; cap how many verifications run at once
+_verify_slots = threading.BoundedSemaphore(2)
 
 class Auth:
     @staticmethod
     def hash_password(password):
-        """Hash a password for storing."""
-        return bcrypt.hash(password)
+        """Hash a password for storing (cost from BCRYPT_ROUNDS)."""
+        return bcrypt.using(rounds=get_bcrypt_rounds()).hash(password)
     
     @staticmethod
     def verify_password(stored_hash, provided_password):
         """Verify a stored password against one provided by user"""
-        return bcrypt.verify(provided_password, stored_hash)
+        with _verify_slots:
+            return bcrypt.verify(provided_password, stored_hash)
+    
+    @staticmethod
+    def needs_rehash(stored_hash):
+        """Whether a stored hash uses other parameters than the current BCRYPT_ROUNDS"""
+        return bcrypt.using(rounds=get_bcrypt_rounds()).needs_update(stored_hash)
     
     @staticmethod
     def register_user(username, password, role, email, emp_code="", designation=""):
@@ -34,18 +124,33 @@ class Auth:
     
     @staticmethod
     def login(username, password):
-        """Attempt to log in with username and password"""
+        """
+        Attempt to log in with username and password.
+        
+        Hashes made with other parameters than BCRYPT_ROUNDS are replaced
+        after a successful login. Bcrypt is slow by design, so call this off
+        the GUI thread (see ui/login_window.py).
+        
+        Raises:
+            LoginThrottled: If the username failed too often recently
+        """
+        retry_after = login_throttle.retry_after(username)
+        if retry_after > 0:
+            raise LoginThrottled(username, retry_after)
+        
         user = get_user_by_username(username)
         
-        if not user:
+        if not user or not Auth.verify_password(user['password_hash'], password):
+            login_throttle.record_failure(username)
             return None
         
-        if Auth.verify_password(user['password_hash'], password):
-            # Remove password hash from user data before returning
-            user.pop('password_hash', None)
-            return user
-        
-        return None
+        login_throttle.reset(username)
+        if Auth.needs_rehash(user['password_hash']):
+            if update_user(user['id'], password_hash=Auth.hash_password(password)):
+                logger.info(f"Rehashed the password of {username} with {get_bcrypt_rounds()} rounds")
+        # Remove password hash from user data before returning
+        user.pop('password_hash', None)
+        return user
     
     @staticmethod
     def is_admin(user):
@@ -60,4 +165,4 @@ class Auth:
     @staticmethod
     def is_regular_user(user):
         """Check if the user is a regular user"""
-        return user and user['role'] == 'user' 
\ No newline at end of file
+        return user and user['role'] == 'user' 
@@ -0,0 +1,70 @@
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Event types published by the db/database.py write helpers
+REPORT_CREATED = 'report_created'
+REPORT_UPDATED = 'report_updated'
+REPORT_STATUS_CHANGED = 'report_status_changed'
+REPORT_DELETED = 'report_deleted'
+USER_ADDED = 'user_added'
+USER_UPDATED = 'user_updated'
+USER_DELETED = 'user_deleted'
+TEMPLATE_ADDED = 'template_added'
+TEMPLATE_DELETED = 'template_deleted'
+
+REPORT_EVENTS = (REPORT_CREATED, REPORT_UPDATED, REPORT_STATUS_CHANGED, REPORT_DELETED)
+USER_EVENTS = (USER_ADDED, USER_UPDATED, USER_DELETED)
+TEMPLATE_EVENTS = (TEMPLATE_ADDED, TEMPLATE_DELETED)
+
+class EventBus:
+    """
+    In-process publish/subscribe bus for database changes.
+
+    Events are dicts with a 'type' key plus the IDs of the affected rows,
+    e.g. {'type': REPORT_STATUS_CHANGED, 'report_id': 7, 'status': 'approved_leader'}.
+    Changes made by other processes are published by db/change_watcher.py
+    with 'external': True.
+
+    Subscribers are called from the thread that made the change (the GUI
+    thread, an approval worker or an API request thread); UI code must
+    marshal events to the GUI thread (see ui/event_bridge.py).
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscribers = []
+
+    def subscribe(self, callback, event_types=None):
+        """
+        Register a callback for events of the given types (all events if None).
+
+        Returns:
+            callable: Function that removes the subscription
+        """
+        entry = (callback, frozenset(event_types) if event_types else None)
+        with self._lock:
+            self._subscribers.append(entry)
+
+        def unsubscribe():
+            with self._lock:
+                if entry in self._subscribers:
+                    self._subscribers.remove(entry)
+        return unsubscribe
+
+    def publish(self, event_type, **data):
+        """Deliver an event to every matching subscriber"""
+        event = dict(data, type=event_type)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback, event_types in subscribers:
+            if event_types is not None and event_type not in event_types:
+                continue
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Event subscriber failed for {event_type}: {e}")
+
+# Shared bus used by the database helpers and the UI
+event_bus = EventBus()
@@ -3,6 +3,8 @@ import sqlite3
 from datetime import datetime
 import os
 import sys
+import threading
+import time
 from pathlib import Path
 
 # Add parent directory to path
@@ -14,6 +16,100 @@ from db.database import get_db_connection, close_connection, get_user_by_id
 
 logger = logging.getLogger(__name__)
 
+class NotificationService:
+    """
+    In-process cache of unread notification counts with a change feed.
+
+    Counts are loaded once per user and then kept current by the write
+    functions in this module, so badges can be refreshed without querying
+    the table. Entries also expire after CACHE_TTL seconds to pick up writes
+    made by other processes (e.g. a standalone run_api.py).
+
+    Subscribers are called with an event dict
+    {'type': 'added' | 'read', 'user_id', 'unread_count', ...} from the
+    thread that made the change; UI code must marshal it to the GUI thread
+    (emitting a Qt signal does this automatically).
+    """
+
+    CACHE_TTL = 60
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._unread = {}
+        self._subscribers = []
+
+    def unread_count(self, user_id):
+        """Get the number of unread notifications for a user"""
+        with self._lock:
+            cached = self._unread.get(user_id)
+            if cached and time.monotonic() - cached[1] < self.CACHE_TTL:
+                return cached[0]
+        count = self._load_unread_count(user_id)
+        with self._lock:
+            self._unread[user_id] = (count, time.monotonic())
+        return count
+
+    def _load_unread_count(self, user_id):
+        conn, cursor = get_db_connection()
+        cursor.execute("SELECT COUNT(*) FROM notifications WHERE user_id = ? AND is_read = 0", (user_id,))
+        count = cursor.fetchone()[0]
+        close_connection(conn)
+        return count
+
+    def subscribe(self, callback):
+        """
+        Register a callback for notification changes.
+
+        Returns:
+            callable: Function that removes the subscription
+        """
+        with self._lock:
+            self._subscribers.append(callback)
+
+        def unsubscribe():
+            with self._lock:
+                if callback in self._subscribers:
+                    self._subscribers.remove(callback)
+        return unsubscribe
+
+    def invalidate(self, user_id=None):
+        """Drop cached counts for one user (or everyone) so they are reloaded"""
+        with self._lock:
+            if user_id is None:
+                self._unread.clear()
+            else:
+                self._unread.pop(user_id, None)
+
+    def _adjust(self, user_id, delta):
+        with self._lock:
+            cached = self._unread.get(user_id)
+            if cached:
+                self._unread[user_id] = (max(0, cached[0] + delta), cached[1])
+        return self.unread_count(user_id)
+
+    def notification_added(self, user_id, notification_id, subject):
+        """Record a new unread notification and notify subscribers"""
+        unread = self._adjust(user_id, 1)
+        self._publish({'type': 'added', 'user_id': user_id, 'unread_count': unread,
+                       'notification_id': notification_id, 'subject': subject})
+
+    def notifications_read(self, user_id, count):
+        """Record notifications marked as read and notify subscribers"""
+        unread = self._adjust(user_id, -count)
+        self._publish({'type': 'read', 'user_id': user_id, 'unread_count': unread, 'count': count})
+
+    def _publish(self, event):
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for callback in subscribers:
+            try:
+                callback(event)
+            except Exception as e:
+                logger.error(f"Notification subscriber failed: {e}")
+
+# Shared service used by the UI and the notification functions below
+notification_service = NotificationService()
+
 def send_report_notification(user_id, subject, message):
     """
     Send a notification to a user about a report event
@@ -29,29 +125,18 @@ def send_report_notification(user_id, subject, message):
     try:
         conn, cursor = get_db_connection()
         
-        # Check if we need to create the notifications table
-        cursor.execute('''
-        CREATE TABLE IF NOT EXISTS notifications (
-            id INTEGER PRIMARY KEY AUTOINCREMENT,
-            user_id INTEGER NOT NULL,
-            subject TEXT NOT NULL,
-            message TEXT NOT NULL,
-            is_read BOOLEAN DEFAULT 0,
-            created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
-            FOREIGN KEY (user_id) REFERENCES users (id)
-        )
-        ''')
-        
         # Insert the notification
         cursor.execute(
             "INSERT INTO notifications (user_id, subject, message) VALUES (?, ?, ?)",
             (user_id, subject, message)
         )
+        notification_id = cursor.lastrowid
         
         conn.commit()
         close_connection(conn)
         
         logger.info(f"Notification sent to user {user_id}: {subject}")
+        notification_service.notification_added(user_id, notification_id, subject)
         return True
         
     except Exception as e:
@@ -72,14 +157,6 @@ def get_user_notifications(user_id, include_read=False):
     try:
         conn, cursor = get_db_connection()
         
-        # Check if table exists
-        cursor.execute(
-            "SELECT name FROM sqlite_master WHERE type='table' AND name='notifications'"
-        )
-        if not cursor.fetchone():
-            close_connection(conn)
-            return []
-        
         if include_read:
             cursor.execute(
                 "SELECT * FROM notifications WHERE user_id = ? ORDER BY created_at DESC",
@@ -113,16 +190,133 @@ def mark_notification_as_read(notification_id):
     try:
         conn, cursor = get_db_connection()
         
+        cursor.execute("SELECT user_id FROM notifications WHERE id = ?", (notification_id,))
+        row = cursor.fetchone()
         cursor.execute(
-            "UPDATE notifications SET is_read = 1 WHERE id = ?",
+            "UPDATE notifications SET is_read = 1 WHERE id = ? AND is_read = 0",
             (notification_id,)
         )
+        marked = cursor.rowcount
         
         conn.commit()
         close_connection(conn)
         
+        if row and marked:
+            notification_service.notifications_read(row['user_id'], marked)
         return True
         
     except Exception as e:
         logger.error(f"Error marking notification as read: {e}")
-        return False 
\ No newline at end of file
+        return False 
+
+def mark_notifications_as_read(user_id, notification_ids=None, before=None):
+    """
+    Mark a user's notifications as read in a single statement
+    
+    Args:
+        user_id (int): The ID of the user
+        notification_ids (list): Only mark these notifications (optional)
+        before (str): Only mark notifications created at or before this
+            'YYYY-MM-DD HH:MM:SS' UTC timestamp (optional)
+    
+    Returns:
+        int: Number of notifications marked, or -1 on error
+    """
+    if notification_ids is not None and not notification_ids:
+        return 0
+    try:
+        conditions = ["user_id = ?", "is_read = 0"]
+        params = [user_id]
+        if notification_ids:
+            conditions.append(f"id IN ({', '.join('?' for _ in notification_ids)})")
+            params.extend(notification_ids)
+        if before:
+            conditions.append("created_at <= ?")
+            params.append(before)
+        
+        conn, cursor = get_db_connection()
+        cursor.execute(f"UPDATE notifications SET is_read = 1 WHERE {' AND '.join(conditions)}", params)
+        marked = cursor.rowcount
+        conn.commit()
+        close_connection(conn)
+        
+        if marked:
+            notification_service.notifications_read(user_id, marked)
+        return marked
+        
+    except Exception as e:
+        logger.error(f"Error marking notifications as read: {e}")
+        return -1
+
+def get_retention_settings():
+    """
+    Get notification retention settings from the environment
+    
+    Returns:
+        tuple: (retention_days, mode) where retention_days 0 disables pruning
+            and mode is 'archive' or 'delete'
+    """
+    try:
+        days = max(0, int(os.getenv('NOTIFICATION_RETENTION_DAYS', '90')))
+    except ValueError:
+        logger.warning("Invalid NOTIFICATION_RETENTION_DAYS value, using 90")
+        days = 90
+    mode = os.getenv('NOTIFICATION_RETENTION_MODE', 'archive').strip().lower()
+    if mode not in ('archive', 'delete'):
+        logger.warning(f"Invalid NOTIFICATION_RETENTION_MODE '{mode}', using 'archive'")
+        mode = 'archive'
+    return days, mode
+
+def prune_notifications(retention_days, mode='archive', chunk_size=500, pause=0.05):
+    """
+    Archive or delete read notifications older than retention_days
+    
+    Rows are removed in chunks of chunk_size, each in its own short
+    transaction, so the write lock is released between chunks and other
+    writers are never blocked for long.
+    
+    Args:
+        retention_days (int): Age in days after which read notifications are pruned
+        mode (str): 'archive' to copy rows to notifications_archive first, or 'delete'
+        chunk_size (int): Maximum rows removed per transaction
+        pause (float): Seconds to sleep between chunks
+    
+    Returns:
+        int: Number of notifications pruned
+    """
+    cutoff = f"-{int(retention_days)} days"
+    pruned = 0
+    while True:
+        conn, cursor = get_db_connection()
+        try:
+            cursor.execute('''
+            SELECT id FROM notifications
+            WHERE is_read = 1 AND created_at < datetime('now', ?)
+            ORDER BY id
+            LIMIT ?
+            ''', (cutoff, chunk_size))
+            ids = [row['id'] for row in cursor.fetchall()]
+            if not ids:
+                break
+            placeholders = ', '.join('?' for _ in ids)
+            if mode == 'archive':
+                cursor.execute(f'''
+                INSERT OR IGNORE INTO notifications_archive (id, user_id, subject, message, is_read, created_at)
+                SELECT id, user_id, subject, message, is_read, created_at
+                FROM notifications WHERE id IN ({placeholders})
+                ''', ids)
+            cursor.execute(f"DELETE FROM notifications WHERE id IN ({placeholders})", ids)
+            conn.commit()
+            pruned += len(ids)
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_connection(conn)
+        if len(ids) < chunk_size:
+            break
+        time.sleep(pause)
+    
+    if pruned:
+        logger.info(f"Pruned {pruned} read notification(s) older than {retention_days} days ({mode})")
+    return pruned
@@ -0,0 +1,130 @@
+import logging
+import os
+import sys
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import add_report_data
+from db.report_loader import load_report
+from utils.storage import file_sha256, get_store, remove_file
+
+logger = logging.getLogger(__name__)
+
+# Private report workbooks live in user_reports/<user_id>/
+USER_REPORTS_ROOT = os.path.join(parent_dir, 'user_reports')
+
+def get_user_reports_dir(user_id):
+    """Directory holding a user's private report workbooks"""
+    reports_dir = os.path.join(USER_REPORTS_ROOT, str(user_id))
+    os.makedirs(reports_dir, exist_ok=True)
+    return reports_dir
+
+def reference_template(report_id, template_path):
+    """
+    Point a report's workbook at its template without copying it.
+
+    The template is added to the content store if it is not stored yet, and
+    the report takes a reference to the blob. Until the workbook is opened for
+    editing, readers (PDF generation, reviewers, email attachments) use the
+    shared read-only template. The reference is held for the report's whole
+    life (it is released when the report is archived), so the template the
+    workbook was copied from stays available after the template itself is
+    deleted.
+
+    Returns:
+        str: The workbook path recorded for the report
+    """
+    store = get_store()
+    template_key = store.key_for_path(template_path)
+    if template_key:
+        store.retain(template_key)
+    else:
+        template_key = store.put(template_path)
+    workbook_path = store.path(template_key)
+    add_report_data(report_id, "template_key", template_key)
+    add_report_data(report_id, "excel_file_path", workbook_path)
+    return workbook_path
+
+def materialize_workbook(report_id, user_id, file_name=None):
+    """
+    Give a report a private, writable workbook before it is edited.
+
+    Reports still sharing their template get a copy in user_reports/<user_id>/
+    (a reflink clone where the filesystem supports it, otherwise a plain
+    copy); they keep their reference to the template blob, which maps the
+    copy's cells for extraction. Reports that already have a private
+    workbook are left alone. file_name defaults to
+    report_<id>.xlsx (with the template's extension).
+
+    Returns:
+        str: Path of the report's private workbook, or None if it has none
+    """
+    report = load_report(report_id, with_fields=True)
+    workbook_path = report.fields.get('excel_file_path') if report else None
+    if not workbook_path:
+        return None
+    store = get_store()
+    template_key = store.key_for_path(workbook_path)
+    if not template_key:
+        return workbook_path
+
+    file_name = file_name or f"report_{report_id}{os.path.splitext(workbook_path)[1]}"
+    private_path = os.path.join(get_user_reports_dir(user_id), file_name)
+    store.export(template_key, private_path)
+    add_report_data(report_id, "excel_file_path", private_path)
+    return private_path
+
+def workbook_in_use(path):
+    """
+    Whether Excel or LibreOffice has a workbook open, judged by the lock file
+    each keeps next to an open workbook (~$name, or ~$ over the first two
+    characters of longer names, and .~lock.name#).
+    """
+    directory, name = os.path.split(path)
+    lock_names = (f"~${name}", f"~${name[2:]}", f".~lock.{name}#")
+    return any(os.path.exists(os.path.join(directory, lock_name)) for lock_name in lock_names)
+
+def release_unmodified_workbook(report_id):
+    """
+    Return a report to sharing its template if its workbook was never changed.
+
+    Called when a report is saved or submitted: a private copy that is still
+    byte-for-byte the template (opened but not saved) is deleted and the
+    report points at the template blob it holds a reference to. Copies still open in an
+    editor are kept, since a later save there would otherwise recreate a
+    file nothing references. Callers must not release a workbook the
+    workbook watcher is still recording saves of.
+
+    Returns:
+        str: The shared template path now recorded for the report, or None if
+        the private copy was kept
+    """
+    report = load_report(report_id, with_fields=True)
+    if not report:
+        return None
+    workbook_path = report.fields.get('excel_file_path')
+    template_key = report.fields.get('template_key')
+    store = get_store()
+    if not workbook_path or not template_key or store.key_for_path(workbook_path):
+        return None
+    template = store.stat(template_key)
+    if template is None or not os.path.exists(workbook_path):
+        return None
+    if os.path.getsize(workbook_path) != template['size'] or file_sha256(workbook_path) != template['sha256']:
+        return None
+    if workbook_in_use(workbook_path):
+        logger.info(f"Keeping unmodified workbook of report {report_id}: still open in an editor")
+        return None
+
+    try:
+        # Also fails on Windows while the workbook is still open in Excel
+        remove_file(workbook_path)
+    except OSError as e:
+        logger.info(f"Keeping unmodified workbook of report {report_id}: {e}")
+        return None
+    add_report_data(report_id, "excel_file_path", template['path'])
+    return template['path']
@@ -0,0 +1,193 @@
+import hashlib
+import hmac
+import json
+import logging
+import os
+import secrets
+import sys
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import set_setting_if_missing, revoke_session, is_session_revoked
+from utils.events import event_bus, USER_UPDATED, USER_DELETED
+from utils.signing import _b64encode, _b64decode
+
+logger = logging.getLogger(__name__)
+
+# Claims copied from the user row into each token
+_USER_CLAIMS = ('username', 'role', 'emp_code', 'designation')
+
+_secret = None
+_secret_lock = threading.Lock()
+
+def get_session_secret():
+    """
+    Get the HMAC key used to sign session tokens.
+
+    SESSION_TOKEN_SECRET takes precedence; otherwise a random key is stored in
+    app_settings, so tokens issued by the desktop app are accepted by the API
+    server running against the same database. The key differs from the action
+    token key, so an emailed action link can never pass as a session.
+    """
+    global _secret
+    with _secret_lock:
+        if _secret is None:
+            configured = os.getenv('SESSION_TOKEN_SECRET', '').strip()
+            if configured:
+                _secret = configured.encode('utf-8')
+            else:
+                _secret = set_setting_if_missing('session_token_secret', secrets.token_hex(32)).encode('utf-8')
+        return _secret
+
+def get_session_ttl_seconds():
+    """Lifetime of session tokens from SESSION_TTL_HOURS (default 12)"""
+    try:
+        return max(60, int(float(os.getenv('SESSION_TTL_HOURS', '12')) * 3600))
+    except ValueError:
+        logger.warning("Invalid SESSION_TTL_HOURS value, using 12 hours")
+        return 12 * 3600
+
+def _sign(payload):
+    return _b64encode(hmac.new(get_session_secret(), payload.encode('ascii'), hashlib.sha256).digest())
+
+class SessionStore:
+    """
+    Recently verified session tokens of this process.
+
+    Verifying a token costs an HMAC, a JSON decode and a revocation lookup,
+    so the claims of recently verified tokens are kept (up to max_tokens)
+    and repeat requests are checked in memory. Revocations live in the
+    database (see revoke_session and update_user), so a sign-out or a user
+    change in the desktop app also applies to a separate API server: cached
+    tokens are looked up again once they are RECHECK_SECONDS old, and
+    dropped at once when this process sees the user change.
+    """
+
+    RECHECK_SECONDS = 5
+
+    def __init__(self, max_tokens=1024):
+        self.max_tokens = max_tokens
+        self._lock = threading.Lock()
+        self._verified = OrderedDict()   # token -> (claims, checked at)
+
+    def get(self, token):
+        """Claims of a token verified in the last RECHECK_SECONDS, or None"""
+        with self._lock:
+            cached = self._verified.get(token)
+            if cached is None:
+                return None
+            if time.monotonic() - cached[1] >= self.RECHECK_SECONDS:
+                del self._verified[token]
+                return None
+            self._verified.move_to_end(token)
+            return cached[0]
+
+    def put(self, token, claims):
+        with self._lock:
+            self._verified[token] = (claims, time.monotonic())
+            self._verified.move_to_end(token)
+            while len(self._verified) > self.max_tokens:
+                self._verified.popitem(last=False)
+
+    def forget(self, token=None, user_id=None):
+        """Drop a token, or every token of a user, so it is looked up again"""
+        with self._lock:
+            self._verified.pop(token, None)
+            if user_id is not None:
+                for cached_token, (claims, _) in list(self._verified.items()):
+                    if claims['uid'] == user_id:
+                        del self._verified[cached_token]
+
+    def on_user_event(self, event):
+        try:
+            self.forget(user_id=int(event.get('user_id')))
+        except (TypeError, ValueError):
+            pass
+
+# Shared store behind verify_session_token
+session_store = SessionStore()
+event_bus.subscribe(session_store.on_user_event, (USER_UPDATED, USER_DELETED))
+
+def issue_session_token(user, ttl_seconds=None):
+    """
+    Create a signed session token carrying the user's ID, role, employee
+    code and designation, so holders can be authorized (and their approvals
+    signed) without looking the user up again.
+
+    Returns:
+        str: The token
+    """
+    if ttl_seconds is None:
+        ttl_seconds = get_session_ttl_seconds()
+    now_ms = int(time.time() * 1000)
+    claims = {'uid': int(user['id'])}
+    for name in _USER_CLAIMS:
+        claims[name] = user.get(name) or ''
+    claims.update({
+        'iat': now_ms,
+        'exp': now_ms // 1000 + int(ttl_seconds),
+        'sid': secrets.token_urlsafe(12),
+    })
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+def verify_session_token(token):
+    """
+    Check a session token's signature, expiry and revocation.
+
+    Returns:
+        tuple: (claims dict, None) when valid, otherwise (None, error message)
+    """
+    claims = session_store.get(token)
+    if claims is None:
+        try:
+            payload, signature = token.split('.', 1)
+            # Non-ASCII input raises UnicodeEncodeError, a ValueError
+            expected = _sign(payload).encode('ascii')
+            signature = signature.encode('utf-8')
+        except (AttributeError, ValueError):
+            return None, "Malformed session token"
+        if not hmac.compare_digest(signature, expected):
+            return None, "Invalid session token"
+        try:
+            claims = json.loads(_b64decode(payload))
+        except ValueError:
+            return None, "Malformed session token"
+        if not isinstance(claims, dict) or not {'uid', 'iat', 'exp', 'sid'} <= claims.keys():
+            return None, "Malformed session token"
+        if claims['exp'] < time.time():
+            return None, "Session has expired"
+        if is_session_revoked(claims['sid'], claims['uid'], claims['iat']):
+            return None, "Session has been revoked"
+        session_store.put(token, claims)
+    elif claims['exp'] < time.time():
+        return None, "Session has expired"
+    return claims, None
+
+def revoke_session_token(token):
+    """
+    Revoke a session token (e.g. on logout).
+
+    Returns:
+        bool: True if the token was valid until now
+    """
+    claims, error = verify_session_token(token)
+    if error:
+        return False
+    revoke_session(claims['sid'], claims['exp'])
+    session_store.forget(token)
+    return True
+
+def session_user(claims):
+    """The user dict (id, username, role, emp_code, designation) carried by verified claims"""
+    user = {'id': claims['uid']}
+    for name in _USER_CLAIMS:
+        user[name] = claims.get(name, '')
+    return user
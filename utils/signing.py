@@ -0,0 +1,130 @@
+import base64
+import hashlib
+import hmac
+import json
+import os
+import secrets
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import set_setting_if_missing
+
+# Actions that can be carried by an emailed link
+APPROVE = 'approve'
+SEND_BACK = 'send_back'
+
+_ACTION_PATHS = {
+    APPROVE: '/api/report/approve',
+    SEND_BACK: '/api/report/send_back',
+}
+
+_secret = None
+_secret_lock = threading.Lock()
+
+def get_signing_secret():
+    """
+    Get the HMAC key used to sign action tokens.
+
+    ACTION_TOKEN_SECRET takes precedence; otherwise a random key is generated
+    on first use and stored in app_settings so links survive restarts.
+    """
+    global _secret
+    with _secret_lock:
+        if _secret is None:
+            configured = os.getenv('ACTION_TOKEN_SECRET', '').strip()
+            if configured:
+                _secret = configured.encode('utf-8')
+            else:
+                _secret = set_setting_if_missing('action_token_secret', secrets.token_hex(32)).encode('utf-8')
+        return _secret
+
+def get_token_ttl_seconds():
+    """Lifetime of action tokens from ACTION_TOKEN_TTL_HOURS (default 72)"""
+    try:
+        return int(float(os.getenv('ACTION_TOKEN_TTL_HOURS', '72')) * 3600)
+    except ValueError:
+        return 72 * 3600
+
+def unsigned_actions_allowed():
+    """Whether legacy report_id/admin_id links are still accepted (ALLOW_UNSIGNED_ACTIONS)"""
+    return os.getenv('ALLOW_UNSIGNED_ACTIONS', '0').strip().lower() in ('1', 'true', 'yes')
+
+def _b64encode(data):
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode('ascii')
+
+def _b64decode(text):
+    return base64.urlsafe_b64decode(text + '=' * (-len(text) % 4))
+
+def _sign(payload):
+    return _b64encode(hmac.new(get_signing_secret(), payload.encode('ascii'), hashlib.sha256).digest())
+
+def make_action_token(action, report_id, admin_id, ttl_seconds=None, nonce=None):
+    """
+    Create a signed, expiring, single-use token for an emailed report action.
+
+    Tokens sharing a nonce are used up together: once one of them has been
+    used, the others replay its response instead of acting.
+    """
+    if ttl_seconds is None:
+        ttl_seconds = get_token_ttl_seconds()
+    claims = {
+        'a': action,
+        'r': int(report_id),
+        'u': int(admin_id),
+        'exp': int(time.time()) + int(ttl_seconds),
+        'n': nonce or secrets.token_urlsafe(12),
+    }
+    payload = _b64encode(json.dumps(claims, separators=(',', ':')).encode('utf-8'))
+    return f"{payload}.{_sign(payload)}"
+
+def verify_action_token(token, expected_action):
+    """
+    Check an action token's signature, expiry and action.
+
+    Returns:
+        tuple: (claims dict, None) when valid, otherwise (None, error message)
+    """
+    try:
+        payload, signature = token.split('.', 1)
+        # Non-ASCII input raises UnicodeEncodeError, a ValueError
+        expected = _sign(payload).encode('ascii')
+        signature = signature.encode('utf-8')
+    except (AttributeError, ValueError):
+        return None, "Malformed action token"
+    if not hmac.compare_digest(signature, expected):
+        return None, "Invalid action token"
+    try:
+        claims = json.loads(_b64decode(payload))
+    except ValueError:
+        return None, "Malformed action token"
+    if claims.get('a') != expected_action:
+        return None, "Action token does not match this action"
+    if claims.get('exp', 0) < time.time():
+        return None, "Action link has expired"
+    return claims, None
+
+def make_action_url(api_base_url, action, report_id, admin_id, nonce=None):
+    """Build an emailed action link carrying a freshly signed token"""
+    return f"{api_base_url}{_ACTION_PATHS[action]}?token={make_action_token(action, report_id, admin_id, nonce=nonce)}"
+
+def make_action_urls(api_base_url, report_id, admin_id):
+    """
+    Build the approve and send-back links of one email.
+
+    Both links share a nonce, so only the first one used acts; a mail
+    scanner that fetches every link cannot approve a report and then
+    undo the approval by sending it back.
+
+    Returns:
+        tuple: (approve_url, send_back_url)
+    """
+    nonce = secrets.token_urlsafe(12)
+    return (make_action_url(api_base_url, APPROVE, report_id, admin_id, nonce),
+            make_action_url(api_base_url, SEND_BACK, report_id, admin_id, nonce))
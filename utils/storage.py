@@ -0,0 +1,321 @@
+import hashlib
+import logging
+import os
+import shutil
+import stat
+import sys
+import tempfile
+import threading
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import get_db_connection, close_connection
+
+logger = logging.getLogger(__name__)
+
+_CHUNK_SIZE = 1024 * 1024
+
+def get_storage_root():
+    """Directory holding stored blobs, from STORAGE_DIR (default <app>/storage)"""
+    return os.path.abspath(os.getenv('STORAGE_DIR') or os.path.join(parent_dir, 'storage'))
+
+def file_sha256(path):
+    """SHA-256 hex digest of a file, read in chunks"""
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(_CHUNK_SIZE), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _make_writable(path):
+    # Blobs are read-only; Windows refuses to delete read-only files
+    if os.name != 'nt':
+        return
+    try:
+        os.chmod(path, stat.S_IREAD | stat.S_IWRITE)
+    except OSError:
+        pass
+
+# ioctl request number of Linux FICLONE (_IOW(0x94, 9, int))
+_FICLONE = 0x40049409
+
+def _reflink(src, dest):
+    """Clone src to dest sharing data blocks; False if the filesystem cannot"""
+    if sys.platform.startswith('linux'):
+        try:
+            import fcntl
+            with open(src, 'rb') as source, open(dest, 'wb') as target:
+                fcntl.ioctl(target.fileno(), _FICLONE, source.fileno())
+            return True
+        except (ImportError, OSError):
+            return False
+    if sys.platform == 'darwin':
+        try:
+            import ctypes
+            libc = ctypes.CDLL(None, use_errno=True)
+            if os.path.exists(dest):
+                os.remove(dest)
+            return libc.clonefile(os.fsencode(src), os.fsencode(dest), 0) == 0
+        except (AttributeError, OSError):
+            return False
+    return False
+
+def clone_file(src, dest):
+    """
+    Copy src to dest as a writable file, using a reflink (copy-on-write
+    clone) on filesystems that support it (Btrfs, XFS, APFS) and a plain
+    copy elsewhere.
+
+    Returns:
+        bool: True if dest was cloned rather than copied
+    """
+    cloned = _reflink(src, dest)
+    if not cloned:
+        shutil.copyfile(src, dest)
+    # Clones keep the mode of read-only blobs
+    os.chmod(dest, stat.S_IMODE(os.stat(dest).st_mode) | stat.S_IREAD | stat.S_IWRITE)
+    return cloned
+
+def remove_file(path):
+    """Delete a file that may be a read-only hard link to a stored blob"""
+    _make_writable(path)
+    os.remove(path)
+
+class ContentStore:
+    """
+    Sharded, content-addressed file store with reference counts.
+
+    A blob is identified by its key, the SHA-256 of its content plus the
+    original file extension (e.g. '9f86d0...0a08.xlsx', so Excel and PDF
+    viewers still recognise stored files), and lives at
+    <root>/<sha[0:2]>/<sha[2:4]>/<key>. Storing identical content again only
+    increments the blob's refcount in storage_blobs; release() decrements it
+    and deletes the file when nothing references it any more.
+
+    Blobs are shared and made read-only. Code that needs an editable file
+    must export() a private copy; code that only reads (templates, PDFs) can
+    use path() or open() directly.
+
+    The desktop app and run_api.py may share a store, so refcount changes
+    and the blob files they govern are updated together while holding the
+    database write lock (BEGIN IMMEDIATE): a blob is only unlinked after
+    its refcount is seen at zero under that lock, and put() and retain()
+    cannot take a reference to a blob another process is deleting.
+    """
+
+    def __init__(self, root=None):
+        self.root = os.path.abspath(root) if root else get_storage_root()
+
+    @staticmethod
+    def _begin():
+        """Open a connection holding the database write lock"""
+        conn, cursor = get_db_connection()
+        try:
+            cursor.execute('BEGIN IMMEDIATE')
+        except Exception:
+            close_connection(conn)
+            raise
+        return conn, cursor
+
+    # Keys and paths
+    @staticmethod
+    def _split_key(key):
+        sha256, ext = os.path.splitext(os.path.basename(key))
+        if len(sha256) != 64 or any(c not in '0123456789abcdef' for c in sha256):
+            raise ValueError(f"Invalid storage key: {key!r}")
+        return sha256, ext
+
+    def path(self, key):
+        """Filesystem path of a blob (which may not exist)"""
+        sha256, _ = self._split_key(key)
+        return os.path.join(self.root, sha256[:2], sha256[2:4], os.path.basename(key))
+
+    def key_for_path(self, path):
+        """Key of the blob at path, or None if path is not inside this store"""
+        if not path:
+            return None
+        path = os.path.abspath(path)
+        if os.path.dirname(os.path.dirname(os.path.dirname(path))) != self.root:
+            return None
+        try:
+            key = os.path.basename(path)
+            return key if self.path(key) == path else None
+        except ValueError:
+            return None
+
+    # Writing
+    def put(self, source, ext=None):
+        """
+        Store a file (path) or bytes and take a reference to it.
+
+        Args:
+            source: Path of the file to store, or its content as bytes
+            ext (str): Extension for the key; defaults to the source file's
+
+        Returns:
+            str: Key of the stored blob
+        """
+        if ext is None:
+            ext = '' if isinstance(source, (bytes, bytearray)) else os.path.splitext(str(source))[1]
+        ext = ext.lower()
+
+        tmp_dir = os.path.join(self.root, 'tmp')
+        os.makedirs(tmp_dir, exist_ok=True)
+        fd, tmp_path = tempfile.mkstemp(dir=tmp_dir)
+        try:
+            # Hash while copying so the source is read only once
+            digest = hashlib.sha256()
+            size = 0
+            with os.fdopen(fd, 'wb') as tmp:
+                if isinstance(source, (bytes, bytearray)):
+                    digest.update(source)
+                    tmp.write(source)
+                    size = len(source)
+                else:
+                    with open(source, 'rb') as src:
+                        for chunk in iter(lambda: src.read(_CHUNK_SIZE), b''):
+                            digest.update(chunk)
+                            tmp.write(chunk)
+                            size += len(chunk)
+            key = digest.hexdigest() + ext
+            blob_path = self.path(key)
+            conn, cursor = self._begin()
+            try:
+                if os.path.exists(blob_path):
+                    os.remove(tmp_path)
+                else:
+                    os.makedirs(os.path.dirname(blob_path), exist_ok=True)
+                    os.chmod(tmp_path, stat.S_IREAD)
+                    os.replace(tmp_path, blob_path)
+                self._add_ref(cursor, key, size)
+                conn.commit()
+            except Exception:
+                conn.rollback()
+                raise
+            finally:
+                close_connection(conn)
+            return key
+        except Exception:
+            if os.path.exists(tmp_path):
+                _make_writable(tmp_path)
+                os.remove(tmp_path)
+            raise
+
+    @staticmethod
+    def _add_ref(cursor, key, size):
+        cursor.execute('''
+        INSERT OR IGNORE INTO storage_blobs (key, size, refcount) VALUES (?, ?, 0)
+        ''', (key, size))
+        cursor.execute('UPDATE storage_blobs SET refcount = refcount + 1 WHERE key = ?', (key,))
+
+    def retain(self, key):
+        """Take another reference to an existing blob"""
+        blob_path = self.path(key)
+        conn, cursor = self._begin()
+        try:
+            # Checked under the write lock, so no release can delete it meanwhile
+            if not os.path.exists(blob_path):
+                raise FileNotFoundError(blob_path)
+            self._add_ref(cursor, key, os.path.getsize(blob_path))
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_connection(conn)
+
+    def release(self, key):
+        """
+        Drop a reference to a blob, deleting it when none are left.
+
+        Returns:
+            int: Remaining references
+        """
+        conn, cursor = self._begin()
+        try:
+            cursor.execute('''
+            UPDATE storage_blobs SET refcount = refcount - 1
+            WHERE key = ? AND refcount > 0
+            ''', (key,))
+            cursor.execute('SELECT refcount FROM storage_blobs WHERE key = ?', (key,))
+            row = cursor.fetchone()
+            remaining = row['refcount'] if row else 0
+            if remaining == 0:
+                cursor.execute('DELETE FROM storage_blobs WHERE key = ?', (key,))
+                # Unlinked before commit: until then no other process can
+                # take a new reference to this blob
+                blob_path = self.path(key)
+                try:
+                    if os.path.exists(blob_path):
+                        _make_writable(blob_path)
+                        os.remove(blob_path)
+                except OSError as e:
+                    logger.warning(f"Could not remove unreferenced blob {key}: {e}")
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            close_connection(conn)
+        return remaining
+
+    # Reading
+    def open(self, key):
+        """Open a blob for reading in binary mode"""
+        return open(self.path(key), 'rb')
+
+    def stat(self, key):
+        """
+        Get information about a blob.
+
+        Returns:
+            dict: key, sha256, size, refcount, created_at and path, or None if not stored
+        """
+        conn, cursor = get_db_connection()
+        cursor.execute('SELECT * FROM storage_blobs WHERE key = ?', (key,))
+        row = cursor.fetchone()
+        close_connection(conn)
+        blob_path = self.path(key)
+        if not row or not os.path.exists(blob_path):
+            return None
+        info = dict(row)
+        info['sha256'] = self._split_key(key)[0]
+        info['path'] = blob_path
+        return info
+
+    def export(self, key, dest, link=False):
+        """
+        Place a blob's content at dest.
+
+        With link=True dest becomes a hard link to the (read-only) blob where
+        the filesystem allows it, costing no extra space; otherwise dest is a
+        private, writable copy (a reflink clone where supported, see clone_file).
+        """
+        blob_path = self.path(key)
+        if os.path.exists(dest):
+            if link and os.path.samefile(dest, blob_path):
+                return dest
+            remove_file(dest)
+        if link:
+            try:
+                os.link(blob_path, dest)
+                return dest
+            except OSError:
+                pass
+        clone_file(blob_path, dest)
+        return dest
+
+_store = None
+_store_lock = threading.Lock()
+
+def get_store():
+    """Get the shared content store"""
+    global _store
+    with _store_lock:
+        if _store is None or _store.root != get_storage_root():
+            _store = ContentStore()
+        return _store
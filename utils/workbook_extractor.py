@@ -0,0 +1,206 @@
+import logging
+import os
+import queue
+import re
+import sys
+import threading
+from collections import OrderedDict
+from datetime import date, datetime, time
+from pathlib import Path
+
+import openpyxl
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import set_report_fields
+from db.report_loader import load_report
+from utils.storage import get_store
+
+logger = logging.getLogger(__name__)
+
+_PLACEHOLDER = re.compile(r'^\s*\{\{\s*(.+?)\s*\}\}\s*$')
+
+# Fields managed by the application rather than read from the workbook
+RESERVED_FIELDS = frozenset({'report_title', 'excel_file_path', 'template_key', 'signatures'})
+
+_maps_lock = threading.Lock()
+_placeholder_maps = OrderedDict()
+_MAP_CACHE_SIZE = 16
+
+def _file_identity(path):
+    # Stored templates never change; other files are keyed by mtime and size
+    key = get_store().key_for_path(path)
+    if key:
+        return key
+    stat = os.stat(path)
+    return (os.path.realpath(path), stat.st_mtime_ns, stat.st_size)
+
+def get_placeholder_map(template_path):
+    """
+    Map each {{field_name}} placeholder of a template to its cell.
+
+    Like ExcelHandler, only the active sheet is scanned. Maps are cached per
+    template file, so extracting many reports of one template reads it once.
+
+    Returns:
+        dict: field name -> (sheet title, cell coordinate)
+    """
+    identity = _file_identity(template_path)
+    with _maps_lock:
+        cached = _placeholder_maps.get(identity)
+        if cached is not None:
+            _placeholder_maps.move_to_end(identity)
+            return cached
+
+    workbook = openpyxl.load_workbook(template_path, read_only=True, data_only=True)
+    try:
+        sheet = workbook.active
+        placeholders = {}
+        for row in sheet.iter_rows():
+            for cell in row:
+                if not isinstance(cell.value, str) or '{{' not in cell.value:
+                    continue
+                match = _PLACEHOLDER.match(cell.value)
+                if match and match.group(1) not in RESERVED_FIELDS:
+                    placeholders.setdefault(match.group(1), (sheet.title, cell.coordinate))
+    finally:
+        workbook.close()
+
+    with _maps_lock:
+        _placeholder_maps[identity] = placeholders
+        while len(_placeholder_maps) > _MAP_CACHE_SIZE:
+            _placeholder_maps.popitem(last=False)
+    return placeholders
+
+def _cell_text(value):
+    if value is None:
+        return None
+    if isinstance(value, (datetime, date, time)):
+        return value.isoformat()
+    if isinstance(value, float) and value.is_integer():
+        return str(int(value))
+    text = str(value).strip()
+    return text or None
+
+def extract_workbook_fields(workbook_path, placeholders):
+    """
+    Read the values users typed over a template's placeholders.
+
+    Cells that still hold their placeholder (or are empty) are left out.
+
+    Returns:
+        dict: field name -> value as text
+    """
+    by_sheet = {}
+    for field_name, (sheet_title, coordinate) in placeholders.items():
+        by_sheet.setdefault(sheet_title, []).append((field_name, coordinate))
+
+    values = {}
+    workbook = openpyxl.load_workbook(workbook_path, read_only=True, data_only=True)
+    try:
+        for sheet_title, cells in by_sheet.items():
+            sheet = workbook[sheet_title] if sheet_title in workbook.sheetnames else workbook.active
+            for field_name, coordinate in cells:
+                text = _cell_text(sheet[coordinate].value)
+                if text is None or _PLACEHOLDER.match(text):
+                    continue
+                values[field_name] = text
+    finally:
+        workbook.close()
+    return values
+
+def _template_path_for(fields):
+    # Only the template the workbook was copied from maps its cells; guessing
+    # (e.g. the active template) could read or clear the wrong fields
+    template_key = fields.get('template_key')
+    if template_key:
+        path = get_store().path(template_key)
+        if os.path.exists(path):
+            return path
+    return None
+
+def extract_report_fields(report_id):
+    """
+    Copy the values of a report's workbook into report_data.
+
+    The workbook is compared cell by cell with its template's placeholder
+    map; captured values are upserted and fields cleared in the workbook are
+    removed, all in one transaction. Reports still sharing their template
+    have nothing to extract, and reports whose template is not recorded
+    (created before template keys) are skipped.
+
+    Returns:
+        list: Names of the fields that changed
+    """
+    report = load_report(report_id, with_fields=True)
+    if not report:
+        return []
+    fields = report.fields
+    workbook_path = fields.get('excel_file_path')
+    if not workbook_path or not os.path.exists(workbook_path) or get_store().key_for_path(workbook_path):
+        return []
+    template_path = _template_path_for(fields)
+    if not template_path:
+        logger.warning(f"Template of report {report_id} is unknown, not extracting its workbook")
+        return []
+
+    placeholders = get_placeholder_map(template_path)
+    values = extract_workbook_fields(workbook_path, placeholders)
+    changed = set_report_fields(report_id, values, removed=placeholders.keys())
+    if changed:
+        logger.info(f"Extracted {len(changed)} changed field(s) from the workbook of report {report_id}")
+    return changed
+
+class WorkbookExtractor:
+    """
+    Extracts report workbooks on a background thread.
+
+    Reports submitted while an extraction for them is already queued are
+    extracted once, so repeated saves do not pile up work.
+    """
+
+    def __init__(self):
+        self._queue = queue.Queue()
+        self._pending = set()
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def submit(self, report_id):
+        """Queue a report for extraction"""
+        with self._lock:
+            if report_id in self._pending:
+                return
+            self._pending.add(report_id)
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._run, daemon=True, name="WorkbookExtractor")
+                self._thread.start()
+        self._queue.put(report_id)
+
+    def _run(self):
+        while True:
+            report_id = self._queue.get()
+            with self._lock:
+                self._pending.discard(report_id)
+            try:
+                extract_report_fields(report_id)
+            except Exception:
+                logger.error(f"Failed to extract the workbook of report {report_id}", exc_info=True)
+            finally:
+                self._queue.task_done()
+
+    def wait(self):
+        """Block until every queued extraction has finished"""
+        self._queue.join()
+
+_extractor = WorkbookExtractor()
+
+def queue_extraction(report_id):
+    """Extract a report's workbook into report_data in the background"""
+    _extractor.submit(report_id)
+
+def wait_for_extractions():
+    """Block until queued extractions have finished"""
+    _extractor.wait()
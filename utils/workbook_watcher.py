@@ -0,0 +1,345 @@
+import logging
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+
+# Add the parent directory to the path to allow imports
+parent_dir = str(Path(__file__).resolve().parent.parent)
+if parent_dir not in sys.path:
+    sys.path.append(parent_dir)
+
+from db.database import add_report_artifact, get_artifact_by_path
+from utils.storage import file_sha256
+from utils.workbook_extractor import queue_extraction
+
+logger = logging.getLogger(__name__)
+
+def _env_seconds(name, default, minimum):
+    try:
+        return max(minimum, float(os.getenv(name, str(default))))
+    except ValueError:
+        logger.warning(f"Invalid {name} value, using {default} seconds")
+        return float(default)
+
+def get_debounce_delay():
+    """Seconds a workbook must stay unchanged before a save is recorded, from WORKBOOK_SAVE_DEBOUNCE (default 2)"""
+    return _env_seconds('WORKBOOK_SAVE_DEBOUNCE', 2, 0.1)
+
+def get_watch_poll_interval():
+    """Seconds between checks when inotify is unavailable, from WORKBOOK_POLL_INTERVAL (default 2)"""
+    return _env_seconds('WORKBOOK_POLL_INTERVAL', 2, 0.1)
+
+# inotify event masks (linux/inotify.h)
+_IN_MODIFY = 0x00000002
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+_IN_CREATE = 0x00000100
+_IN_NONBLOCK = 0o4000
+_IN_CLOEXEC = 0o2000000
+_EVENT_HEADER = struct.Struct('iIII')
+
+class _Inotify:
+    """
+    Minimal inotify binding over ctypes.
+
+    Directories are watched rather than files: Excel and LibreOffice save by
+    writing a temporary file and renaming it over the workbook, which would
+    silently end a watch on the file itself.
+    """
+
+    MASK = _IN_MODIFY | _IN_CLOSE_WRITE | _IN_MOVED_TO | _IN_CREATE
+
+    def __init__(self):
+        import ctypes
+        import ctypes.util
+        self._libc = ctypes.CDLL(ctypes.util.find_library('c') or None, use_errno=True)
+        self.fd = self._libc.inotify_init1(_IN_NONBLOCK | _IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self._wake_r, self._wake_w = os.pipe()
+        self._get_errno = ctypes.get_errno
+
+    def add_watch(self, directory):
+        wd = self._libc.inotify_add_watch(self.fd, os.fsencode(directory), self.MASK)
+        if wd < 0:
+            raise OSError(self._get_errno(), f"Cannot watch {directory}")
+        return wd
+
+    def rm_watch(self, wd):
+        self._libc.inotify_rm_watch(self.fd, wd)
+
+    def wake(self):
+        os.write(self._wake_w, b'x')
+
+    def read(self, timeout):
+        """Wait up to timeout seconds; returns a list of (wd, file name)"""
+        readable, _, _ = select.select([self.fd, self._wake_r], [], [], timeout)
+        if self._wake_r in readable:
+            os.read(self._wake_r, 4096)
+        if self.fd not in readable:
+            return []
+        try:
+            data = os.read(self.fd, 64 * 1024)
+        except BlockingIOError:
+            return []
+        events = []
+        offset = 0
+        while offset + _EVENT_HEADER.size <= len(data):
+            wd, _mask, _cookie, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            events.append((wd, os.fsdecode(name)))
+        return events
+
+    def close(self):
+        for fd in (self.fd, self._wake_r, self._wake_w):
+            try:
+                os.close(fd)
+            except OSError:
+                pass
+
+def _signature(path):
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_size, stat.st_mtime_ns)
+
+def record_workbook_save(report_id, path):
+    """
+    Record a saved version of a report workbook and extract its fields.
+
+    The workbook is hashed and its 'excel' artifact updated with the next
+    version number; saves that did not change the content (Excel rewrites
+    the file on autosave) are ignored.
+
+    Returns:
+        int: The version recorded, or None if the content was unchanged
+    """
+    try:
+        size = os.path.getsize(path)
+        sha256 = file_sha256(path)
+    except OSError as e:
+        # Still being written or replaced; the next event will retry
+        logger.debug(f"Workbook of report {report_id} not readable yet: {e}")
+        return None
+    previous = get_artifact_by_path(path)
+    if previous and previous['sha256'] == sha256:
+        return None
+    version = (previous['version'] or 0) + 1 if previous else 1
+    add_report_artifact(report_id, 'excel', path, size, sha256, version)
+    queue_extraction(report_id)
+    logger.info(f"Recorded version {version} of the workbook of report {report_id}")
+    return version
+
+class WorkbookWatcher:
+    """
+    Watches report workbooks open in Excel/LibreOffice and records each save.
+
+    Uses inotify on Linux and falls back to polling file stats elsewhere;
+    either way all file access happens on the watcher's daemon thread, never
+    the GUI thread. Bursts of writes are debounced: a save is recorded once
+    the file has been quiet for the debounce delay, after which its fields
+    are extracted in the background (see utils/workbook_extractor.py).
+    """
+
+    def __init__(self, debounce=None, interval=None, use_inotify=None):
+        self.debounce = debounce or get_debounce_delay()
+        self.interval = interval or get_watch_poll_interval()
+        if use_inotify is None:
+            use_inotify = sys.platform.startswith('linux')
+        self._inotify = None
+        if use_inotify:
+            try:
+                self._inotify = _Inotify()
+            except (OSError, AttributeError) as e:
+                logger.info(f"inotify unavailable, polling workbooks instead: {e}")
+        self._lock = threading.Lock()
+        self._watched = {}      # path -> report_id
+        self._signatures = {}   # path -> (size, mtime_ns) last recorded
+        self._seen = {}         # path -> (size, mtime_ns) last polled
+        self._due = {}          # path -> monotonic time the save is recorded
+        self._dirs = {}         # directory -> [wd, number of watched files]
+        self._by_wd = {}        # wd -> directory
+        self._stop = threading.Event()
+        self._wake = threading.Event()
+        self._thread = None
+
+    @property
+    def backend(self):
+        return 'inotify' if self._inotify else 'polling'
+
+    def watch(self, report_id, path):
+        """Start recording saves of a report's workbook"""
+        path = os.path.realpath(path)
+        directory = os.path.dirname(path)
+        with self._lock:
+            if self._watched.get(path) == report_id:
+                return
+            self._unwatch_path(path)
+            for watched_path, watched_id in list(self._watched.items()):
+                if watched_id == report_id:
+                    self._unwatch_path(watched_path)
+            self._watched[path] = report_id
+            self._signatures[path] = self._seen[path] = _signature(path)
+            if self._inotify:
+                entry = self._dirs.get(directory)
+                if entry is None:
+                    try:
+                        wd = self._inotify.add_watch(directory)
+                    except OSError as e:
+                        logger.warning(f"Failed to watch {directory}: {e}")
+                        wd = None
+                    entry = self._dirs[directory] = [wd, 0]
+                    if wd is not None:
+                        self._by_wd[wd] = directory
+                entry[1] += 1
+        self._notify()
+
+    def unwatch(self, report_id):
+        """Stop watching a report's workbook (pending saves are dropped)"""
+        with self._lock:
+            for path, watched_id in list(self._watched.items()):
+                if watched_id == report_id:
+                    self._unwatch_path(path)
+
+    def _unwatch_path(self, path):
+        if self._watched.pop(path, None) is None:
+            return
+        self._signatures.pop(path, None)
+        self._seen.pop(path, None)
+        self._due.pop(path, None)
+        directory = os.path.dirname(path)
+        entry = self._dirs.get(directory)
+        if entry is None:
+            return
+        entry[1] -= 1
+        if entry[1] <= 0:
+            del self._dirs[directory]
+            if entry[0] is not None:
+                self._by_wd.pop(entry[0], None)
+                self._inotify.rm_watch(entry[0])
+
+    def watched(self):
+        """Paths currently watched, mapped to their report IDs"""
+        with self._lock:
+            return dict(self._watched)
+
+    def _notify(self):
+        if self._inotify:
+            self._inotify.wake()
+        else:
+            self._wake.set()
+
+    def _mark_changed(self, path):
+        # Every write pushes the deadline back so a burst is recorded once
+        if path in self._watched:
+            self._due[path] = time.monotonic() + self.debounce
+
+    def _collect_changes(self, timeout):
+        if self._inotify:
+            events = self._inotify.read(timeout)
+            with self._lock:
+                for wd, name in events:
+                    directory = self._by_wd.get(wd)
+                    if directory and name:
+                        self._mark_changed(os.path.join(directory, name))
+            return
+        self._wake.wait(timeout)
+        self._wake.clear()
+        with self._lock:
+            paths = list(self._watched)
+        signatures = {path: _signature(path) for path in paths}
+        with self._lock:
+            for path, signature in signatures.items():
+                if path in self._watched and signature is not None and signature != self._seen.get(path):
+                    self._seen[path] = signature
+                    self._mark_changed(path)
+
+    def process_due(self, now=None):
+        """
+        Record the saves whose debounce delay has passed.
+
+        Returns:
+            list: Report IDs for which a new version was recorded
+        """
+        now = time.monotonic() if now is None else now
+        with self._lock:
+            due = [(path, self._watched[path]) for path, deadline in self._due.items() if deadline <= now]
+            for path, _ in due:
+                del self._due[path]
+        recorded = []
+        for path, report_id in due:
+            signature = _signature(path)
+            with self._lock:
+                if path not in self._watched or signature is None or signature == self._signatures.get(path):
+                    continue
+                self._signatures[path] = signature
+            try:
+                if record_workbook_save(report_id, path) is not None:
+                    recorded.append(report_id)
+            except Exception:
+                logger.error(f"Failed to record the workbook save of report {report_id}", exc_info=True)
+        return recorded
+
+    def _next_timeout(self):
+        with self._lock:
+            deadlines = list(self._due.values())
+        timeout = self.interval
+        if deadlines:
+            timeout = min(timeout, max(0.0, min(deadlines) - time.monotonic()))
+        return timeout
+
+    def run(self):
+        """Watch on the calling thread until stop() is called"""
+        logger.info(f"Workbook watcher started ({self.backend})")
+        while not self._stop.is_set():
+            try:
+                self._collect_changes(self._next_timeout())
+                self.process_due()
+            except Exception:
+                logger.error("Error watching report workbooks", exc_info=True)
+                self._stop.wait(self.interval)
+        if self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+    def start(self):
+        """Watch on a background daemon thread"""
+        self._thread = threading.Thread(target=self.run, daemon=True, name="WorkbookWatcher")
+        self._thread.start()
+        return self
+
+    def stop(self, timeout=5):
+        """Stop watching and release the inotify descriptor"""
+        self._stop.set()
+        self._notify()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        elif self._inotify:
+            self._inotify.close()
+            self._inotify = None
+
+_watcher = None
+_watcher_lock = threading.Lock()
+
+def get_workbook_watcher():
+    """Get the shared workbook watcher, starting it on first use"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is None:
+            _watcher = WorkbookWatcher().start()
+        return _watcher
+
+def stop_workbook_watcher():
+    """Stop the shared watcher if it was started"""
+    global _watcher
+    with _watcher_lock:
+        if _watcher is not None:
+            _watcher.stop()
+            _watcher = None